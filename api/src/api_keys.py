@@ -0,0 +1,184 @@
+"""Accepted API key set with background refresh from Vault.
+
+Keys are read from Vault at startup and then re-read every
+ARECIBO_API_KEY_REFRESH_SEC (jittered) on a daemon thread, so a rotated key
+is accepted without a restart. Each refresh swaps the whole set in one
+assignment; requests see either the old set or the new one.
+
+If ARECIBO_API_KEY_CACHE_FILE is set, every successful read is written
+there (mode 0600). At startup Vault gets ARECIBO_VAULT_STARTUP_TIMEOUT_SEC
+to answer; if it is slower or failing and the cache file has keys, the API
+starts with those and the refresher replaces them once Vault answers. The
+timed-out fetch keeps running; VaultClient serializes reads, so the first
+refresh waits for it instead of sharing the hvac client.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Callable, Iterable
+
+logger = logging.getLogger("arecibo.api_keys")
+
+DEFAULT_API_KEY_REFRESH_SEC = 300
+DEFAULT_VAULT_STARTUP_TIMEOUT_SEC = 5.0
+# First retry after a failed refresh; doubles up to the refresh interval.
+REFRESH_RETRY_SEC = 5.0
+REFRESH_JITTER = 0.1
+
+
+def parse_keys(raw: str) -> frozenset[str]:
+    return frozenset(item.strip() for item in raw.split(",") if item.strip())
+
+
+def vault_key_fetcher(vault_client, path: str, field: str) -> Callable[[], frozenset[str]]:
+    """Return a callable reading the comma-separated key set from Vault."""
+    return lambda: parse_keys(vault_client.read_secret(path, field) or "")
+
+
+class ApiKeySet:
+    """The API keys currently accepted by ``X-API-Key`` auth."""
+
+    def __init__(self, keys: Iterable[str]) -> None:
+        self._keys = frozenset(keys)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def replace(self, keys: Iterable[str]) -> bool:
+        """Swap in a new key set; return whether it differs from the old one."""
+        new_keys = frozenset(keys)
+        changed = new_keys != self._keys
+        self._keys = new_keys
+        return changed
+
+
+def read_key_cache(path: str | Path) -> frozenset[str]:
+    try:
+        return parse_keys(Path(path).read_text(encoding="utf-8"))
+    except OSError:
+        return frozenset()
+
+
+def write_key_cache(path: str | Path, keys: Iterable[str]) -> None:
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        handle.write(",".join(sorted(keys)))
+    os.replace(tmp, path)
+
+
+def load_startup_keys(
+    fetch: Callable[[], frozenset[str]],
+    cache_file: str | None,
+    timeout_sec: float = DEFAULT_VAULT_STARTUP_TIMEOUT_SEC,
+) -> tuple[frozenset[str], bool]:
+    """Return (keys, from_cache) for startup.
+
+    Waits at most ``timeout_sec`` for ``fetch`` when cached keys exist to
+    fall back to; otherwise waits for it to finish. Keys are empty if
+    neither source has any.
+    """
+    cached = read_key_cache(cache_file) if cache_file else frozenset()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="arecibo-vault-startup")
+    future = executor.submit(fetch)
+    executor.shutdown(wait=False)
+    try:
+        keys = future.result(timeout=timeout_sec if cached else None)
+    except FutureTimeoutError:
+        logger.warning(
+            "api_keys_vault_slow",
+            extra={"fields": {"timeoutSec": timeout_sec, "cachedKeys": len(cached)}},
+        )
+        return cached, True
+    except Exception:
+        logger.exception("api_keys_vault_error")
+        keys = frozenset()
+    if keys:
+        if cache_file:
+            try:
+                write_key_cache(cache_file, keys)
+            except OSError:
+                logger.exception("api_keys_cache_write_error")
+        return keys, False
+    return cached, bool(cached)
+
+
+class ApiKeyRefresher:
+    """Re-fetch the API key set on a daemon thread and swap it in.
+
+    Runs every ``interval_sec`` with ±10% jitter, so replicas do not hit
+    Vault in lockstep. A failed or empty fetch keeps the current keys and
+    is retried after REFRESH_RETRY_SEC, doubling up to ``interval_sec``.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], frozenset[str]],
+        keys: ApiKeySet,
+        interval_sec: float,
+        *,
+        cache_file: str | None = None,
+        refresh_now: bool = False,
+    ) -> None:
+        self._fetch = fetch
+        self._keys = keys
+        self._interval = interval_sec
+        self._cache_file = cache_file
+        self._refresh_now = refresh_now
+        self._retry_sec = REFRESH_RETRY_SEC
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="api-key-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def refresh_once(self) -> bool:
+        """Fetch and swap in the key set; return whether the fetch succeeded."""
+        try:
+            keys = self._fetch()
+        except Exception:
+            logger.exception("api_keys_refresh_error")
+            return False
+        if not keys:
+            logger.warning("api_keys_refresh_empty")
+            return False
+        if self._keys.replace(keys):
+            logger.info("api_keys_rotated", extra={"fields": {"keyCount": len(keys)}})
+        if self._cache_file:
+            try:
+                write_key_cache(self._cache_file, keys)
+            except OSError:
+                logger.exception("api_keys_cache_write_error")
+        return True
+
+    def next_delay(self, succeeded: bool) -> float:
+        if succeeded:
+            self._retry_sec = REFRESH_RETRY_SEC
+            base = self._interval
+        else:
+            base = min(self._retry_sec, self._interval)
+            self._retry_sec = min(self._retry_sec * 2, self._interval)
+        return base * random.uniform(1 - REFRESH_JITTER, 1 + REFRESH_JITTER)
+
+    def _loop(self) -> None:
+        delay = 0.0 if self._refresh_now else self.next_delay(True)
+        while not self._stop.wait(delay):
+            delay = self.next_delay(self.refresh_once())
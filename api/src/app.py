@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import asyncio
 import ipaddress
 import logging
 import os
@@ -9,16 +8,22 @@ import uuid
 from contextlib import asynccontextmanager
 
 from fastapi import Depends, FastAPI, HTTPException, Header, Request, status
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
+from .api_keys import ApiKeyRefresher, ApiKeySet, vault_key_fetcher
 from .config import Settings
 from .logging_json import configure_logging
-from .policy_store import PolicyStore
+from .event_filter import EventShedder
+from .policy_store import PolicyStore, utc_now
+from .query_executor import QueryExecutor
 from .query_routes import create_query_router
 from .schemas import schema_registry
+from .telemetry_catalog import PartitionCatalog
+from .telemetry_compaction import run_compaction
 from .telemetry_reader import TelemetryReader
-from .telemetry_retention import get_retention_days, run_retention
+from .telemetry_retention import RetentionPolicy, RetentionScheduler
 from .telemetry_store import TelemetryStore
+from .vault_client import get_vault_client
 
 
 logger = logging.getLogger("arecibo.api")
@@ -112,6 +117,70 @@ def _go_dark_directives_if_enabled(
     return []
 
 
+def _policy_changed_directives(policy_store: PolicyStore, payload: dict) -> list[dict]:
+    """POLICY_CHANGED when the heartbeat reports a stale policyVersion."""
+    identity = payload["identity"]
+    try:
+        service_name = _validate_policy_key_part(identity["serviceName"], "serviceName")
+        container_name = _validate_policy_key_part(identity["environment"], "environment")
+    except ValueError:
+        return []
+    reported = payload["status"].get("policyVersion")
+    if not reported:
+        return []
+    try:
+        cached = policy_store.get_cached(service_name, container_name)
+    except (OSError, ValueError):
+        # A broken policy file must not fail heartbeat ingest.
+        logger.exception(
+            "policy_load_failed",
+            extra={"fields": {"serviceName": service_name, "environment": container_name}},
+        )
+        return []
+    if cached is None:
+        return []
+    current = cached.policy.get("policyVersion")
+    if not current or reported == current:
+        return []
+    return [{"type": "POLICY_CHANGED", "value": current}]
+
+
+def _apply_event_policy(
+    policy_store: PolicyStore,
+    shedder: EventShedder,
+    payload: dict,
+) -> list[dict]:
+    """Events of the batch that its service/environment policy keeps.
+
+    The batch is keyed like its storage partition, by the first event's tags.
+    If the policy cannot be loaded or its sampling fields are invalid, every
+    event is kept.
+    """
+    events = payload["events"]
+    tags = events[0].get("tags", {})
+    try:
+        service_name = _validate_policy_key_part(tags.get("serviceName", ""), "serviceName")
+        container_name = _validate_policy_key_part(tags.get("environment", ""), "environment")
+    except ValueError:
+        return events
+    fields = {"serviceName": service_name, "environment": container_name}
+    try:
+        cached = policy_store.get_cached(service_name, container_name)
+    except (OSError, ValueError):
+        # Fail open: a broken policy file must not drop or reject events.
+        logger.exception("policy_load_failed", extra={"fields": fields})
+        return events
+    if cached is None:
+        return events
+    if cached.event_filter is None:
+        logger.warning(
+            "event_filter_invalid",
+            extra={"fields": {**fields, "error": cached.event_filter_error}},
+        )
+        return events
+    return shedder.filter_events(service_name, container_name, cached.event_filter, events)
+
+
 def _validate_policy_key_part(value: str, field_name: str) -> str:
     clean = value.strip()
     if not clean:
@@ -167,20 +236,58 @@ def create_app() -> FastAPI:
         configure_logging()
         settings = Settings.from_env()
         app.state.settings = settings
+        app.state.api_keys = ApiKeySet(settings.api_keys)
+        key_refresher = None
+        vault_client = get_vault_client()
+        if vault_client.configured:
+            key_refresher = ApiKeyRefresher(
+                vault_key_fetcher(
+                    vault_client, settings.vault_path, settings.vault_api_keys_field,
+                ),
+                app.state.api_keys,
+                settings.api_key_refresh_sec,
+                cache_file=settings.api_key_cache_file,
+                refresh_now=settings.api_keys_from_cache,
+            )
+            key_refresher.start()
         app.state.policy_store = PolicyStore(
             settings.policy_ttl_sec,
             settings.policy_root_dir,
         )
+        app.state.event_shedder = EventShedder()
         telemetry_dir = settings.telemetry_root_dir
-        app.state.telemetry_store = TelemetryStore(telemetry_dir)
-        app.state.telemetry_reader = TelemetryReader(telemetry_dir)
-        # Run retention in background so it doesn't block startup
-        retention_days = get_retention_days()
-        loop = asyncio.get_event_loop()
-        loop.run_in_executor(
-            None, lambda: run_retention(telemetry_dir, retention_days=retention_days),
+        catalog = PartitionCatalog(telemetry_dir)
+        app.state.partition_catalog = catalog
+        app.state.telemetry_store = TelemetryStore(telemetry_dir, catalog=catalog)
+        catalog.refresh()
+        app.state.telemetry_reader = TelemetryReader(
+            telemetry_dir,
+            scan_workers=settings.query_scan_workers,
+            catalog=catalog,
         )
+        app.state.query_executor = QueryExecutor(
+            max_workers=settings.query_workers,
+            timeout_sec=settings.query_timeout_sec,
+            max_queued=settings.query_max_queued,
+        )
+        # Run retention, then compaction, in background so they don't block
+        # startup, and again every interval for as long as the API is up.
+        retention_policy = RetentionPolicy.from_env()
+
+        def _maintain_telemetry() -> None:
+            retention_policy.run(telemetry_dir, catalog=catalog)
+            run_compaction(telemetry_dir)
+
+        retention_scheduler = RetentionScheduler(
+            _maintain_telemetry, retention_policy.interval_sec,
+        )
+        retention_scheduler.start()
         yield
+        retention_scheduler.stop()
+        if key_refresher is not None:
+            key_refresher.stop()
+        app.state.query_executor.shutdown()
+        app.state.telemetry_reader.close()
 
     app = FastAPI(title="Arecibo API", version="0.1.0", lifespan=lifespan)
 
@@ -201,7 +308,7 @@ def create_app() -> FastAPI:
                     error={"code": "unauthorized", "message": "Missing X-API-Key."},
                 ),
             )
-        if x_api_key not in app.state.settings.api_keys:
+        if x_api_key not in app.state.api_keys:
             raise HTTPException(
                 status_code=401,
                 detail=_result(
@@ -252,6 +359,16 @@ def create_app() -> FastAPI:
     async def get_health():
         return {"ok": True, "version": app.version}
 
+    @app.get("/stats")
+    async def get_stats(
+        _: str = Depends(_auth_dependency),
+    ):
+        return {
+            "queryExecutor": app.state.query_executor.stats(),
+            "partitionCatalog": app.state.partition_catalog.stats(),
+            "eventShedding": app.state.event_shedder.stats(),
+        }
+
     @app.post("/announce", status_code=status.HTTP_202_ACCEPTED)
     async def post_announce(
         payload: dict,
@@ -295,6 +412,7 @@ def create_app() -> FastAPI:
         serviceName: str,
         environment: str,
         request: Request,
+        waitSec: int = 0,
         _: str = Depends(_auth_dependency),
     ):
         policy_store: PolicyStore = app.state.policy_store
@@ -310,7 +428,15 @@ def create_app() -> FastAPI:
             _validated_response_or_500("result", payload)
             return JSONResponse(status_code=400, content=payload)
 
-        policy = policy_store.lookup_policy(service_name, container_name)
+        cached = policy_store.get_cached(service_name, container_name)
+        if_none_match = request.headers.get("if-none-match")
+        wait_sec = min(max(waitSec, 0), app.state.settings.policy_max_wait_sec)
+        # Long-poll: the caller is current, so park until the policy changes.
+        if wait_sec and cached is not None and cached.matches(if_none_match):
+            cached = await policy_store.wait_for_change(
+                service_name, container_name, if_none_match, wait_sec,
+            )
+        policy = cached.policy if cached is not None else None
         if not policy:
             payload = _result(
                 request.state.request_id,
@@ -341,12 +467,11 @@ def create_app() -> FastAPI:
             _validated_response_or_500("result", payload)
             return JSONResponse(status_code=403, content=payload)
 
-        response_payload = policy_store.build_policy_response(
-            service_name,
-            container_name,
-            policy,
-        )
-        _validated_response_or_500("policy_response", response_payload)
+        cache_headers = {
+            "ETag": cached.etag,
+            "Cache-Control": f"private, max-age={cached.response['ttlSec']}",
+        }
+        not_modified = cached.matches(if_none_match)
         logger.info(
             "policy_fetched",
             extra={
@@ -354,11 +479,21 @@ def create_app() -> FastAPI:
                     "requestId": request.state.request_id,
                     "serviceName": service_name,
                     "environment": container_name,
-                    "transponderSessionId": response_payload["transponderSessionId"],
+                    "transponderSessionId": cached.response["transponderSessionId"],
+                    "notModified": not_modified,
                 }
             },
         )
-        return response_payload
+        # The caller already holds this version; it restarts its TTL from now.
+        if not_modified:
+            return Response(status_code=304, headers=cache_headers)
+
+        response_payload = {**cached.response, "fetchedAt": utc_now()}
+        # The prebuilt part only changes with the policy; validate it once.
+        if not cached.response_valid:
+            _validated_response_or_500("policy_response", response_payload)
+            cached.response_valid = True
+        return JSONResponse(content=response_payload, headers=cache_headers)
 
     @app.put("/policy")
     async def put_policy(
@@ -442,6 +577,107 @@ def create_app() -> FastAPI:
         _validated_response_or_500("result", ok_payload)
         return ok_payload
 
+    @app.get("/policies")
+    async def list_policies(
+        request: Request,
+        serviceName: str | None = None,
+        _: str = Depends(_auth_dependency),
+    ):
+        service_name = None
+        if serviceName is not None:
+            try:
+                service_name = _validate_policy_key_part(serviceName, "serviceName")
+            except ValueError as exc:
+                error_payload = _result(
+                    request.state.request_id,
+                    status_value="rejected",
+                    error={"code": "invalid_policy_key", "message": str(exc)},
+                )
+                _validated_response_or_500("result", error_payload)
+                return JSONResponse(status_code=400, content=error_payload)
+
+        policy_store: PolicyStore = app.state.policy_store
+        policies = [
+            {
+                "serviceName": svc,
+                "environment": container,
+                "etag": cached.etag,
+                "policy": cached.policy,
+            }
+            for svc, container, cached in policy_store.list_policies(service_name)
+        ]
+        response_payload = {
+            "schemaVersion": "1.0.0",
+            "fetchedAt": utc_now(),
+            "ttlSec": policy_store.policy_ttl_sec,
+            "policies": policies,
+        }
+        _validated_response_or_500("policy_list", response_payload)
+        return response_payload
+
+    @app.put("/policies")
+    async def put_policies(
+        payload: dict,
+        request: Request,
+        _: str = Depends(_auth_dependency),
+    ):
+        _validated_or_400(request, "policy_bulk_request", payload)
+        items = []
+        seen = set()
+        for index, policy in enumerate(payload["policies"]):
+            try:
+                service_name = _validate_policy_key_part(
+                    policy["serviceName"], f"policies[{index}].serviceName",
+                )
+                container_name = _validate_policy_key_part(
+                    policy["environment"], f"policies[{index}].environment",
+                )
+                if (service_name, container_name) != (policy["serviceName"], policy["environment"]):
+                    raise ValueError(
+                        f"policies[{index}] serviceName/environment must not have "
+                        "surrounding whitespace."
+                    )
+            except ValueError as exc:
+                error_payload = _result(
+                    request.state.request_id,
+                    status_value="rejected",
+                    error={"code": "invalid_policy_key", "message": str(exc)},
+                )
+                _validated_response_or_500("result", error_payload)
+                return JSONResponse(status_code=400, content=error_payload)
+            if (service_name, container_name) in seen:
+                error_payload = _result(
+                    request.state.request_id,
+                    status_value="rejected",
+                    error={
+                        "code": "duplicate_policy",
+                        "message": (
+                            f"policies[{index}] repeats service '{service_name}' "
+                            f"in container '{container_name}'."
+                        ),
+                    },
+                )
+                _validated_response_or_500("result", error_payload)
+                return JSONResponse(status_code=400, content=error_payload)
+            seen.add((service_name, container_name))
+            items.append((service_name, container_name, policy))
+
+        policy_store: PolicyStore = app.state.policy_store
+        policy_store.put_policies(items)
+        logger.info(
+            "policies_written",
+            extra={
+                "fields": {
+                    "requestId": request.state.request_id,
+                    "count": len(items),
+                    "services": sorted({svc for svc, _container, _policy in items}),
+                }
+            },
+        )
+        ok_payload = _result(request.state.request_id, status_value="ok")
+        _validated_response_or_500("result", ok_payload)
+        return ok_payload
+
     @app.post("/heartbeat", status_code=status.HTTP_202_ACCEPTED)
     async def post_heartbeat(
         payload: dict,
@@ -481,6 +717,7 @@ def create_app() -> FastAPI:
 
         app.state.telemetry_store.store_heartbeat(payload)
         directives = _go_dark_directives_if_enabled(app.state.settings, "heartbeat")
+        directives += _policy_changed_directives(app.state.policy_store, payload)
         response_payload = _result(
             request.state.request_id,
             status_value="directive" if directives else "ok",
@@ -523,7 +760,21 @@ def create_app() -> FastAPI:
             },
         )
 
-        app.state.telemetry_store.store_events_batch(payload)
+        kept = _apply_event_policy(app.state.policy_store, app.state.event_shedder, payload)
+        if kept:
+            app.state.telemetry_store.store_events_batch({**payload, "events": kept})
+        if len(kept) < event_count:
+            logger.info(
+                "events_shed",
+                extra={
+                    "fields": {
+                        "requestId": request.state.request_id,
+                        "batchId": payload["batchId"],
+                        "eventCount": event_count,
+                        "keptCount": len(kept),
+                    }
+                },
+            )
         directives = _go_dark_directives_if_enabled(app.state.settings, "events")
         response_payload = _result(
             request.state.request_id,
@@ -3,38 +3,65 @@ from __future__ import annotations
 import os
 from dataclasses import dataclass
 
+from .api_keys import (
+    DEFAULT_API_KEY_REFRESH_SEC,
+    DEFAULT_VAULT_STARTUP_TIMEOUT_SEC,
+    load_startup_keys,
+    parse_keys,
+    vault_key_fetcher,
+)
 from .vault_client import get_vault_client
 
 
 @dataclass(frozen=True)
 class Settings:
     api_keys: set[str]
+    # True when Vault was slow or failing at startup and api_keys came from the cache file.
+    api_keys_from_cache: bool
+    api_key_cache_file: str | None
+    api_key_refresh_sec: int
+    vault_path: str
+    vault_api_keys_field: str
     force_go_dark: bool
     force_go_dark_on: set[str]
     policy_ttl_sec: int
     policy_root_dir: str
+    policy_max_wait_sec: int
     telemetry_root_dir: str
+    query_workers: int
+    query_timeout_sec: float
+    query_max_queued: int
+    query_scan_workers: int
 
     @classmethod
     def from_env(cls) -> "Settings":
         vault_path = os.getenv("ARECIBO_VAULT_PATH", "arecibo/config")
         vault_key = os.getenv("ARECIBO_API_KEYS_FIELD", "arecibo_api_keys")
-        keys_raw: str | None = None
+        cache_file = os.getenv("ARECIBO_API_KEY_CACHE_FILE", "").strip() or None
+        refresh_sec = max(30, int(os.getenv(
+            "ARECIBO_API_KEY_REFRESH_SEC", str(DEFAULT_API_KEY_REFRESH_SEC),
+        )))
+        from_cache = False
 
         vault_client = get_vault_client()
         if vault_client.configured:
-            keys_raw = vault_client.get_secret(vault_path, vault_key)
-            if not keys_raw:
+            startup_timeout = float(os.getenv(
+                "ARECIBO_VAULT_STARTUP_TIMEOUT_SEC", str(DEFAULT_VAULT_STARTUP_TIMEOUT_SEC),
+            ))
+            keys, from_cache = load_startup_keys(
+                vault_key_fetcher(vault_client, vault_path, vault_key),
+                cache_file,
+                startup_timeout,
+            )
+            if not keys:
                 raise RuntimeError(
                     "Vault is configured but no API key material found at "
                     f"secret/{vault_path} field {vault_key}."
                 )
-
-        if not keys_raw:
+        else:
             # Local dev/test fallback only when Vault is not configured.
-            keys_raw = os.getenv("ARECIBO_API_KEYS", "local-dev-key")
+            keys = parse_keys(os.getenv("ARECIBO_API_KEYS", "local-dev-key"))
 
-        keys = {item.strip() for item in keys_raw.split(",") if item.strip()}
         if not keys:
             raise RuntimeError("Arecibo API key set is empty.")
 
@@ -48,6 +75,7 @@ class Settings:
 
         ttl_raw = os.getenv("ARECIBO_POLICY_TTL_SEC", "60")
         policy_ttl_sec = max(5, int(ttl_raw))
+        policy_max_wait_sec = max(0, int(os.getenv("ARECIBO_POLICY_MAX_WAIT_SEC", "300")))
 
         policy_root_dir = (
             os.getenv("ARECIBO_POLICY_ROOT", "/data/policies").strip()
@@ -58,11 +86,30 @@ class Settings:
             or "/data/telemetry"
         )
 
+        query_workers = max(1, int(os.getenv("ARECIBO_QUERY_WORKERS", "4")))
+        query_timeout_sec = max(1.0, float(os.getenv("ARECIBO_QUERY_TIMEOUT_SEC", "30")))
+        query_max_queued = max(0, int(os.getenv("ARECIBO_QUERY_MAX_QUEUED", "64")))
+        # Opt-in: each worker is a separate process in every API replica.
+        query_scan_workers = min(
+            max(1, int(os.getenv("ARECIBO_QUERY_SCAN_WORKERS", "1"))),
+            os.cpu_count() or 1,
+        )
+
         return cls(
-            api_keys=keys,
+            api_keys=set(keys),
+            api_keys_from_cache=from_cache,
+            api_key_cache_file=cache_file,
+            api_key_refresh_sec=refresh_sec,
+            vault_path=vault_path,
+            vault_api_keys_field=vault_key,
             force_go_dark=force_go_dark,
             force_go_dark_on=force_on,
             policy_ttl_sec=policy_ttl_sec,
             policy_root_dir=policy_root_dir,
+            policy_max_wait_sec=policy_max_wait_sec,
             telemetry_root_dir=telemetry_root_dir,
+            query_workers=query_workers,
+            query_timeout_sec=query_timeout_sec,
+            query_max_queued=query_max_queued,
+            query_scan_workers=query_scan_workers,
         )
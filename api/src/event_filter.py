@@ -0,0 +1,176 @@
+"""Server-side enforcement of policy sampling for event batches.
+
+Transponders are expected to honor their policy, but an old or
+misconfigured build may send everything. Before a batch is written the API
+applies the current policy for the batch's service/environment:
+
+  - ``enabled: false`` sheds every event;
+  - ``eventOverrides[type].drop`` sheds that type;
+  - ``eventOverrides[type].sampleRate`` (else ``defaultSampleRate``) keeps
+    that fraction of events. Events with a traceId are sampled by a hash of
+    it, so a trace is kept or shed as a whole;
+  - ``eventOverrides[type].maxPerMinute`` caps kept events of that type per
+    service/environment per UTC minute.
+
+An EventFilter is compiled once per policy version (see PolicyStore), so the
+per-event check is a dict lookup and a comparison. EventShedder keeps the
+rate-limit windows, reset every minute, and the counters reported under
+``/stats``, with per-partition counts capped at MAX_SHED_PARTITIONS. A policy
+whose sampling fields are invalid gets no filter, and its batches are
+stored unfiltered.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import random
+import threading
+import time
+
+SHED_REASONS = ("disabled", "dropped", "sampled", "rateLimited")
+
+# Service/environment names come from clients, so per-partition shed counts
+# are capped; partitions past the cap are counted under OTHER_PARTITION.
+MAX_SHED_PARTITIONS = 1000
+OTHER_PARTITION = "*"
+
+
+def _rate(value: object, where: str) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 <= value <= 1:
+        raise ValueError(f"{where} must be a number from 0 to 1.")
+    return float(value)
+
+
+class EventFilter:
+    """A policy's sampling rules compiled for per-event checks.
+
+    Raises ValueError if the sampling fields are not schema-valid, so a
+    hand-edited policy file cannot make the per-event checks misbehave.
+    """
+
+    __slots__ = ("enabled", "default_rate", "rates", "limits", "passes_all")
+
+    def __init__(self, policy: dict) -> None:
+        enabled = policy.get("enabled", True)
+        if not isinstance(enabled, bool):
+            raise ValueError("enabled must be a boolean.")
+        self.enabled = enabled
+        self.default_rate = _rate(policy.get("defaultSampleRate", 1.0), "defaultSampleRate")
+        self.rates: dict[str, float] = {}
+        self.limits: dict[str, int] = {}
+        overrides = policy.get("eventOverrides") or {}
+        if not isinstance(overrides, dict):
+            raise ValueError("eventOverrides must be an object.")
+        for event_type, override in overrides.items():
+            where = f"eventOverrides.{event_type}"
+            if not isinstance(override, dict):
+                raise ValueError(f"{where} must be an object.")
+            drop = override.get("drop", False)
+            if not isinstance(drop, bool):
+                raise ValueError(f"{where}.drop must be a boolean.")
+            if drop:
+                self.rates[event_type] = 0.0
+            elif "sampleRate" in override:
+                self.rates[event_type] = _rate(override["sampleRate"], f"{where}.sampleRate")
+            if "maxPerMinute" in override:
+                limit = override["maxPerMinute"]
+                if isinstance(limit, bool) or not isinstance(limit, int) or limit < 0:
+                    raise ValueError(f"{where}.maxPerMinute must be a non-negative integer.")
+                self.limits[event_type] = limit
+        # Most policies keep everything; their batches skip the per-event loop.
+        self.passes_all = (
+            self.enabled
+            and self.default_rate >= 1.0
+            and all(rate >= 1.0 for rate in self.rates.values())
+            and not self.limits
+        )
+
+    def shed_reason(self, event: dict) -> str | None:
+        """Why ``event`` is shed by rate or drop, or None to keep it."""
+        if not self.enabled:
+            return "disabled"
+        rate = self.rates.get(event.get("type"), self.default_rate)
+        if rate >= 1.0:
+            return None
+        if rate <= 0.0:
+            return "dropped" if event.get("type") in self.rates else "sampled"
+        trace_id = event.get("traceId")
+        if trace_id:
+            digest = hashlib.blake2b(trace_id.encode("utf-8"), digest_size=8).digest()
+            fraction = int.from_bytes(digest, "big") / 2**64
+        else:
+            fraction = random.random()
+        return None if fraction < rate else "sampled"
+
+
+class EventShedder:
+    """Apply EventFilters to batches and count what was shed."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # (service, environment, type) -> events kept in the current minute
+        self._minute = 0
+        self._windows: dict[tuple[str, str, str], int] = {}
+        self._accepted = 0
+        self._by_reason = dict.fromkeys(SHED_REASONS, 0)
+        self._by_partition: dict[str, int] = {}
+
+    def filter_events(
+        self,
+        service_name: str,
+        environment: str,
+        event_filter: EventFilter,
+        events: list[dict],
+        *,
+        now: float | None = None,
+    ) -> list[dict]:
+        """Return the events ``event_filter`` keeps, counting the rest."""
+        if event_filter.passes_all:
+            with self._lock:
+                self._accepted += len(events)
+            return events
+
+        minute = int((time.time() if now is None else now) // 60)
+        kept = []
+        shed = dict.fromkeys(SHED_REASONS, 0)
+        with self._lock:
+            if minute > self._minute:
+                # Windows only count the current minute; older ones are done.
+                self._minute = minute
+                self._windows.clear()
+            for event in events:
+                reason = event_filter.shed_reason(event)
+                limit = event_filter.limits.get(event.get("type"))
+                if reason is None and limit is not None:
+                    key = (service_name, environment, event["type"])
+                    count = self._windows.get(key, 0)
+                    if count >= limit:
+                        reason = "rateLimited"
+                    else:
+                        self._windows[key] = count + 1
+                if reason is None:
+                    kept.append(event)
+                else:
+                    shed[reason] += 1
+            self._accepted += len(kept)
+            for reason, count in shed.items():
+                self._by_reason[reason] += count
+            dropped = len(events) - len(kept)
+            if dropped:
+                partition = f"{service_name}/{environment}"
+                if (
+                    partition not in self._by_partition
+                    and len(self._by_partition) >= MAX_SHED_PARTITIONS
+                ):
+                    partition = OTHER_PARTITION
+                self._by_partition[partition] = self._by_partition.get(partition, 0) + dropped
+        return kept
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "eventsAccepted": self._accepted,
+                "eventsShed": sum(self._by_reason.values()),
+                "shedByReason": dict(self._by_reason),
+                "shedByPartition": dict(self._by_partition),
+            }
@@ -1,71 +1,304 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import json
 import os
+import threading
+import time
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Callable
+
+from .event_filter import EventFilter
 
 
 def utc_now() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
+def _file_stamp(path: Path) -> tuple[int, int, int] | None:
+    """Identity of a policy file's current contents, or None if it is missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+@dataclass
+class CachedPolicy:
+    """A parsed policy with its response prebuilt, minus ``fetchedAt``."""
+
+    policy: dict
+    # Content hash of the policy and TTL; changes whenever either does.
+    version: str
+    response: dict
+    # Set once the prebuilt response has passed schema validation.
+    response_valid: bool = False
+    # None when the sampling fields are invalid; event_filter_error says why.
+    event_filter: EventFilter | None = field(init=False, repr=False)
+    event_filter_error: str | None = field(init=False, default=None, repr=False)
+
+    def __post_init__(self) -> None:
+        try:
+            self.event_filter = EventFilter(self.policy)
+        except ValueError as exc:
+            self.event_filter = None
+            self.event_filter_error = str(exc)
+
+    @property
+    def etag(self) -> str:
+        """Strong ETag for the policy response."""
+        return f'"{self.version}"'
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """Whether an If-None-Match header names this version (weak comparison)."""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == self.etag:
+                return True
+        return False
+
+
+def _version(cached: CachedPolicy | None) -> str | None:
+    return cached.version if cached is not None else None
+
+
+@dataclass
+class _CacheEntry:
+    stamp: tuple[int, int, int] | None
+    checked_at: float
+    cached: CachedPolicy | None
+
+
 @dataclass
 class PolicyStore:
     policy_ttl_sec: int
     policy_root_dir: str
+    # Policy files edited outside this process are noticed within this long.
+    check_interval_sec: float = 1.0
+    _cache: dict[tuple[str, str], _CacheEntry] = field(
+        default_factory=dict, init=False, repr=False,
+    )
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    # Serializes writers so a bulk swap never interleaves with another write.
+    _write_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False,
+    )
+    _watchers: dict[tuple[str, str], set[Callable[[], None]]] = field(
+        default_factory=dict, init=False, repr=False,
+    )
 
     def _policy_path(self, service_name: str, container_name: str) -> Path:
         return Path(self.policy_root_dir) / service_name / f"{container_name}.json"
 
-    def lookup_policy(self, service_name: str, container_name: str) -> dict | None:
+    def _cached_policy(self, service_name: str, container_name: str, policy: dict) -> CachedPolicy:
+        canonical = json.dumps(
+            {"policy": policy, "ttlSec": self.policy_ttl_sec},
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        return CachedPolicy(
+            policy=policy,
+            version=hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32],
+            response={
+                "schemaVersion": "1.0.0",
+                "transponderSessionId": self.get_session_id(service_name, container_name),
+                "ttlSec": self.policy_ttl_sec,
+                "policy": policy,
+            },
+        )
+
+    def _load(self, service_name: str, container_name: str) -> _CacheEntry:
         path = self._policy_path(service_name, container_name)
-        if not path.exists():
-            return None
-        with path.open("r", encoding="utf-8") as handle:
-            raw = json.load(handle)
-        if not isinstance(raw, dict):
-            raise ValueError(
-                f"Policy file {path} must contain a JSON object."
-            )
-        return raw
+        # Stat before reading: a write racing the read leaves a stale stamp,
+        # so the next check reloads.
+        stamp = _file_stamp(path)
+        cached = None
+        if stamp is not None:
+            with path.open("r", encoding="utf-8") as handle:
+                raw = json.load(handle)
+            if not isinstance(raw, dict):
+                raise ValueError(
+                    f"Policy file {path} must contain a JSON object."
+                )
+            cached = self._cached_policy(service_name, container_name, raw)
+        return _CacheEntry(stamp, time.monotonic(), cached)
+
+    def get_cached(self, service_name: str, container_name: str) -> CachedPolicy | None:
+        """Return the cached policy, re-reading the file only if it changed.
+
+        Within ``check_interval_sec`` of the last check this is a dict
+        lookup; after that one stat decides whether to reload.
+        """
+        key = (service_name, container_name)
+        entry = self._cache.get(key)
+        now = time.monotonic()
+        if entry is not None and now - entry.checked_at < self.check_interval_sec:
+            return entry.cached
+        if entry is not None:
+            stamp = _file_stamp(self._policy_path(service_name, container_name))
+            if stamp == entry.stamp:
+                entry.checked_at = now
+                return entry.cached
+        previous = entry.cached if entry is not None else None
+        entry = self._load(service_name, container_name)
+        with self._lock:
+            self._cache[key] = entry
+        if _version(previous) != _version(entry.cached):
+            self._notify([key])
+        return entry.cached
+
+    def lookup_policy(self, service_name: str, container_name: str) -> dict | None:
+        cached = self.get_cached(service_name, container_name)
+        return cached.policy if cached is not None else None
+
+    def list_policies(
+        self, service_name: str | None = None,
+    ) -> list[tuple[str, str, CachedPolicy]]:
+        """Return (service, container, cached policy) for every stored policy.
+
+        Limited to one service when ``service_name`` is given; sorted by key.
+        """
+        root = Path(self.policy_root_dir)
+        if service_name is not None:
+            service_dirs = [root / service_name]
+        else:
+            service_dirs = sorted(root.iterdir()) if root.is_dir() else []
+        found = []
+        for service_dir in service_dirs:
+            if not service_dir.is_dir():
+                continue
+            for path in sorted(service_dir.glob("*.json")):
+                cached = self.get_cached(service_dir.name, path.stem)
+                if cached is not None:
+                    found.append((service_dir.name, path.stem, cached))
+        return found
 
     def put_policy(self, service_name: str, container_name: str, policy: dict) -> None:
-        path = self._policy_path(service_name, container_name)
-        os.makedirs(path.parent, exist_ok=True)
-        tmp = path.with_suffix(".json.tmp")
-        with tmp.open("w", encoding="utf-8") as handle:
-            json.dump(policy, handle, indent=2, sort_keys=True)
-            handle.write("\n")
-        tmp.replace(path)
+        self.put_policies([(service_name, container_name, policy)])
+
+    def put_policies(self, items: list[tuple[str, str, dict]]) -> None:
+        """Store several policies, each file replaced atomically.
+
+        Every file is staged next to its target first; only once all are
+        written are they renamed into place, so a failure while staging
+        leaves every stored policy untouched. The renames are one per file,
+        not one for the batch: if one fails, the policies renamed before it
+        are stored and the rest keep their old contents.
+        """
+        with self._write_lock:
+            staged = []
+            try:
+                for service_name, container_name, policy in items:
+                    path = self._policy_path(service_name, container_name)
+                    os.makedirs(path.parent, exist_ok=True)
+                    tmp = path.with_suffix(".json.tmp")
+                    text = json.dumps(policy, indent=2, sort_keys=True)
+                    with tmp.open("w", encoding="utf-8") as handle:
+                        handle.write(text)
+                        handle.write("\n")
+                    staged.append((service_name, container_name, path, tmp, text))
+            except BaseException:
+                for _service, _container, _path, tmp, _text in staged:
+                    tmp.unlink(missing_ok=True)
+                raise
+            entries = {}
+            try:
+                for service_name, container_name, path, tmp, text in staged:
+                    tmp.replace(path)
+                    entries[(service_name, container_name)] = _CacheEntry(
+                        _file_stamp(path),
+                        time.monotonic(),
+                        self._cached_policy(service_name, container_name, json.loads(text)),
+                    )
+            finally:
+                for _service, _container, _path, tmp, _text in staged:
+                    tmp.unlink(missing_ok=True)
+                with self._lock:
+                    self._cache.update(entries)
+                self._notify(list(entries))
 
     def delete_policy(self, service_name: str, container_name: str) -> bool:
         path = self._policy_path(service_name, container_name)
         if not path.exists():
             return False
         path.unlink()
+        with self._lock:
+            self._cache[(service_name, container_name)] = _CacheEntry(None, time.monotonic(), None)
+        self._notify([(service_name, container_name)])
         return True
 
-    def get_session_id(
+    def watch(self, service_name: str, container_name: str, callback: Callable[[], None]) -> None:
+        """Call ``callback`` whenever this policy is written, deleted or reloaded.
+
+        Callbacks run on the writing thread and must not block.
+        """
+        with self._lock:
+            self._watchers.setdefault((service_name, container_name), set()).add(callback)
+
+    def unwatch(self, service_name: str, container_name: str, callback: Callable[[], None]) -> None:
+        key = (service_name, container_name)
+        with self._lock:
+            callbacks = self._watchers.get(key)
+            if callbacks is not None:
+                callbacks.discard(callback)
+                if not callbacks:
+                    del self._watchers[key]
+
+    def _notify(self, keys: list[tuple[str, str]]) -> None:
+        with self._lock:
+            callbacks = [cb for key in keys for cb in self._watchers.get(key, ())]
+        for callback in callbacks:
+            callback()
+
+    async def wait_for_change(
         self,
         service_name: str,
         container_name: str,
-    ) -> str:
-        raw = f"arecibo:{service_name}:{container_name}"
-        return str(uuid.uuid5(uuid.NAMESPACE_URL, raw))
+        if_none_match: str,
+        timeout_sec: float,
+    ) -> CachedPolicy | None:
+        """Park until the policy no longer matches ``if_none_match``.
+
+        Returns the current policy once it changes (None if deleted) or when
+        ``timeout_sec`` passes. Writes through this store wake waiters at
+        once; files edited on disk are noticed on the next
+        ``check_interval_sec`` recheck.
+        """
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(changed.set)
 
-    def build_policy_response(
+        deadline = loop.time() + timeout_sec
+        self.watch(service_name, container_name, wake)
+        try:
+            while True:
+                changed.clear()
+                cached = self.get_cached(service_name, container_name)
+                remaining = deadline - loop.time()
+                if cached is None or not cached.matches(if_none_match) or remaining <= 0:
+                    return cached
+                try:
+                    await asyncio.wait_for(
+                        changed.wait(), min(remaining, max(self.check_interval_sec, 0.05)),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.unwatch(service_name, container_name, wake)
+
+    def get_session_id(
         self,
         service_name: str,
         container_name: str,
-        policy: dict,
-    ) -> dict:
-        return {
-            "schemaVersion": "1.0.0",
-            "transponderSessionId": self.get_session_id(service_name, container_name),
-            "fetchedAt": utc_now(),
-            "ttlSec": self.policy_ttl_sec,
-            "policy": policy,
-        }
+    ) -> str:
+        raw = f"arecibo:{service_name}:{container_name}"
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, raw))
@@ -0,0 +1,155 @@
+"""Bounded worker pool for telemetry query execution.
+
+Query handlers are ``async def`` but telemetry scans are blocking file I/O and
+CPU work. Running them on the event loop stalls ingest for every transponder
+while a long dashboard query runs, so handlers dispatch scans here instead.
+
+The pool has a fixed number of worker threads, a bounded wait queue and a
+per-query timeout. Counters are kept for queue depth, wait time and outcomes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+logger = logging.getLogger("arecibo.query_executor")
+
+DEFAULT_QUERY_WORKERS = 4
+DEFAULT_QUERY_TIMEOUT_SEC = 30.0
+DEFAULT_QUERY_MAX_QUEUED = 64
+
+
+class QueryQueueFullError(Exception):
+    """Raised when the wait queue is at capacity."""
+
+
+class QueryTimeoutError(Exception):
+    """Raised when a query does not finish within the timeout."""
+
+
+class QueryExecutor:
+    """Run blocking query callables on a bounded thread pool."""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_QUERY_WORKERS,
+        timeout_sec: float = DEFAULT_QUERY_TIMEOUT_SEC,
+        max_queued: int = DEFAULT_QUERY_MAX_QUEUED,
+    ) -> None:
+        self.max_workers = max_workers
+        self.timeout_sec = timeout_sec
+        self.max_queued = max_queued
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="arecibo-query",
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._started = 0
+        self._counters = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timedOut": 0,
+            "rejected": 0,
+        }
+        self._wait_total_sec = 0.0
+        self._wait_max_sec = 0.0
+        self._run_total_sec = 0.0
+
+    def _call(self, enqueued_at: float, fn: Callable[..., Any], args, kwargs) -> Any:
+        started = time.monotonic()
+        waited = started - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._started += 1
+            self._wait_total_sec += waited
+            self._wait_max_sec = max(self._wait_max_sec, waited)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._run_total_sec += time.monotonic() - started
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run ``fn`` on the pool and await its result.
+
+        Raises QueryQueueFullError if more than ``max_queued`` queries would
+        be waiting with no idle worker to take them, and
+        QueryTimeoutError if the query exceeds ``timeout_sec``. A query that
+        times out while still queued is cancelled; one that is already running
+        finishes in the background and its result is discarded.
+        """
+        with self._lock:
+            # Submitted tasks an idle worker is about to take are not waiting.
+            idle = self.max_workers - self._running
+            if self._queued - idle >= self.max_queued:
+                self._counters["rejected"] += 1
+                raise QueryQueueFullError(
+                    f"query queue is full ({self.max_queued} waiting)"
+                )
+            self._queued += 1
+            self._counters["submitted"] += 1
+
+        enqueued_at = time.monotonic()
+        future = self._pool.submit(self._call, enqueued_at, fn, args, kwargs)
+        try:
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                timeout=self.timeout_sec,
+            )
+        except asyncio.TimeoutError:
+            if future.cancel():
+                with self._lock:
+                    self._queued -= 1
+            with self._lock:
+                self._counters["timedOut"] += 1
+            logger.warning(
+                "query_timeout",
+                extra={"fields": {
+                    "query": getattr(fn, "__name__", repr(fn)),
+                    "timeoutSec": self.timeout_sec,
+                }},
+            )
+            raise QueryTimeoutError(
+                f"query exceeded {self.timeout_sec:g}s timeout"
+            ) from None
+        except Exception:
+            with self._lock:
+                self._counters["failed"] += 1
+            raise
+        with self._lock:
+            self._counters["completed"] += 1
+        return result
+
+    def stats(self) -> dict:
+        """Snapshot of pool configuration, queue depth and outcome counters."""
+        with self._lock:
+            started = self._started
+            finished = started - self._running
+            return {
+                "maxWorkers": self.max_workers,
+                "maxQueued": self.max_queued,
+                "timeoutSec": self.timeout_sec,
+                "queued": self._queued,
+                "running": self._running,
+                **self._counters,
+                "avgWaitMs": (
+                    round(self._wait_total_sec / started * 1000, 3) if started > 0 else 0.0
+                ),
+                "maxWaitMs": round(self._wait_max_sec * 1000, 3),
+                "avgRunMs": (
+                    round(self._run_total_sec / finished * 1000, 3) if finished > 0 else 0.0
+                ),
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,59 @@
 """Query route handlers for Grafana datasource consumption.
 
 Implements the observability query endpoints defined in openapi.yml.
-All endpoints are GET with query parameters, authenticated via X-API-Key.
+All endpoints are GET with query parameters, authenticated via X-API-Key,
+except POST /query/batch which runs several of them over one shared scan.
 """
 
 from __future__ import annotations
 
+import json
 from datetime import datetime, timedelta, timezone
+from typing import Iterator
 
-from fastapi import APIRouter, Depends, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 
+from .query_executor import QueryExecutor, QueryQueueFullError, QueryTimeoutError
+from .schemas import schema_registry
 from .telemetry_reader import TelemetryReader
 
+# Rows encoded per chunk when streaming a response body.
+_STREAM_CHUNK_ROWS = 256
+
+# Batch query name -> (reader query name, parameter defaults matching the GET route).
+_BATCH_QUERIES: dict[str, tuple[str, dict]] = {
+    "fleet-health": ("fleet_health", {"maxRows": 1000}),
+    "heartbeat-freshness": (
+        "heartbeat_freshness",
+        {"maxRows": 1000, "stalenessThresholdSec": 300},
+    ),
+    "event-throughput": ("event_throughput", {"maxRows": 1000, "bucketWidthSec": 60}),
+    "go-dark-status": ("go_dark_status", {"maxRows": 1000}),
+    "container-metrics": (
+        "container_metrics",
+        {"maxRows": 10000, "bucketWidthSec": 30, "rollup": "container"},
+    ),
+    "recent-events": ("recent_events", {"maxRows": 100}),
+}
+
+# Batch query parameter -> reader keyword argument.
+_BATCH_PARAM_NAMES = {
+    "serviceName": "service_name",
+    "environment": "environment",
+    "maxRows": "max_rows",
+    "cursor": "cursor",
+    "stalenessThresholdSec": "staleness_threshold_sec",
+    "bucketWidthSec": "bucket_width_sec",
+    "instanceId": "instance_id",
+    "rollup": "rollup",
+    "severity": "severity",
+    "type": "event_type",
+    "tag": "tags",
+    "approximate": "approximate",
+    "stat": "stat",
+}
+
 
 def _parse_time_range(
     start: str | None,
@@ -38,10 +80,147 @@ def _parse_time_range(
     return start_dt, end_dt
 
 
+def _parse_tags(values: list[str] | None) -> tuple[tuple[str, str], ...] | None:
+    """Parse `key=value` tag filters; raises ValueError on a malformed one."""
+    if not values:
+        return None
+    tags = []
+    for value in values:
+        key, sep, tag_value = value.partition("=")
+        if not sep or not key:
+            raise ValueError(f"tag filter must be key=value, got {value!r}")
+        tags.append((key, tag_value))
+    return tuple(tags)
+
+
 def _clamp(value: int, minimum: int, maximum: int) -> int:
     return max(minimum, min(maximum, value))
 
 
+def _encode_rows(rows: Iterator[dict], separator: bytes) -> Iterator[bytes]:
+    """Encode rows lazily, yielding about _STREAM_CHUNK_ROWS rows per chunk."""
+    chunk: list[bytes] = []
+    for row in rows:
+        chunk.append(json.dumps(row, separators=(",", ":")).encode())
+        if len(chunk) >= _STREAM_CHUNK_ROWS:
+            yield separator.join(chunk)
+            chunk = []
+    if chunk:
+        yield separator.join(chunk)
+
+
+def _json_stream(meta: dict, rows: Iterator[dict]) -> Iterator[bytes]:
+    """Stream the regular {"data": [...], "meta": {...}} document in chunks."""
+    yield b'{"data":['
+    first = True
+    for chunk in _encode_rows(rows, b","):
+        if not first:
+            yield b","
+        yield chunk
+        first = False
+    yield b'],"meta":' + json.dumps(meta, separators=(",", ":")).encode() + b"}"
+
+
+def _ndjson_stream(rows: Iterator[dict]) -> Iterator[bytes]:
+    for chunk in _encode_rows(rows, b"\n"):
+        yield chunk + b"\n"
+
+
+def _streaming_response(fmt: str, meta: dict, rows: Iterator[dict]) -> StreamingResponse:
+    """Build a chunked response for `format=json-stream` or `format=ndjson`.
+
+    The scan has already run. Building and encoding the rows happens as the
+    response body is sent. NDJSON bodies carry rows only, so
+    totalRows and the next cursor are sent as X-Total-Rows / X-Next-Cursor
+    headers.
+    """
+    if fmt == "ndjson":
+        headers = {"X-Total-Rows": str(meta["totalRows"])}
+        if meta.get("cursor"):
+            headers["X-Next-Cursor"] = meta["cursor"]
+        return StreamingResponse(
+            _ndjson_stream(rows),
+            media_type="application/x-ndjson",
+            headers=headers,
+        )
+    return StreamingResponse(_json_stream(meta, rows), media_type="application/json")
+
+
+async def _execute(request: Request, fn, *args, **kwargs):
+    """Run a blocking reader call on the query pool, mapping pool errors to results."""
+    executor: QueryExecutor = request.app.state.query_executor
+    try:
+        return await executor.run(fn, *args, **kwargs)
+    except QueryQueueFullError as exc:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "result": {
+                    "status": "throttled",
+                    "requestId": request.state.request_id,
+                    "retryAfterSec": 1,
+                    "error": {"code": "query_queue_full", "message": str(exc)},
+                }
+            },
+        ) from exc
+    except QueryTimeoutError as exc:
+        raise HTTPException(
+            status_code=504,
+            detail={
+                "result": {
+                    "status": "retryable",
+                    "requestId": request.state.request_id,
+                    "error": {"code": "query_timeout", "message": str(exc)},
+                }
+            },
+        ) from exc
+
+
+def _rejected(request: Request, message: str) -> HTTPException:
+    return HTTPException(
+        status_code=400,
+        detail={
+            "result": {
+                "status": "rejected",
+                "requestId": request.state.request_id,
+                "error": {"code": "validation_error", "message": message},
+            }
+        },
+    )
+
+
+def _plan_batch(payload: dict) -> list[tuple[str, dict]]:
+    """Translate batch sub-queries into reader (query name, kwargs) pairs."""
+    default_start, default_end = _parse_time_range(payload.get("start"), payload.get("end"))
+    planned = []
+    for sub in payload["queries"]:
+        reader_name, defaults = _BATCH_QUERIES[sub["query"]]
+        params = {**defaults, **sub.get("params", {})}
+        kwargs = {
+            _BATCH_PARAM_NAMES[name]: value
+            for name, value in params.items()
+            if name not in ("start", "end")
+        }
+        if "tags" in kwargs:
+            kwargs["tags"] = _parse_tags(kwargs["tags"])
+        if sub["query"] != "go-dark-status":
+            if "start" in params or "end" in params:
+                kwargs["start"], kwargs["end"] = _parse_time_range(
+                    params.get("start", payload.get("start")),
+                    params.get("end", payload.get("end")),
+                )
+            else:
+                kwargs["start"], kwargs["end"] = default_start, default_end
+        planned.append((reader_name, kwargs))
+    return planned
+
+
+def _project(result: dict, fields: list[str] | None) -> list[dict]:
+    if not fields:
+        return result["data"]
+    return [{k: row[k] for k in fields if k in row} for row in result["data"]]
+
+
 def create_query_router(auth_dependency) -> APIRouter:
     """Create the query router with the given auth dependency."""
     router = APIRouter(prefix="/query", tags=["observability"])
@@ -58,15 +237,19 @@ def create_query_router(auth_dependency) -> APIRouter:
         serviceName: str | None = Query(default=None),
         environment: str | None = Query(default=None),
         maxRows: int = Query(default=1000, ge=1, le=10000),
+        approximate: bool | None = Query(default=None),
     ):
         start_dt, end_dt = _parse_time_range(start, end)
         reader = _get_reader(request)
-        return reader.query_fleet_health(
+        return await _execute(
+            request,
+            reader.query_fleet_health,
             start=start_dt,
             end=end_dt,
             service_name=serviceName,
             environment=environment,
             max_rows=maxRows,
+            approximate=approximate,
         )
 
     @router.get("/heartbeat-freshness")
@@ -83,7 +266,9 @@ def create_query_router(auth_dependency) -> APIRouter:
     ):
         start_dt, end_dt = _parse_time_range(start, end)
         reader = _get_reader(request)
-        return reader.query_heartbeat_freshness(
+        return await _execute(
+            request,
+            reader.query_heartbeat_freshness,
             start=start_dt,
             end=end_dt,
             staleness_threshold_sec=stalenessThresholdSec,
@@ -106,7 +291,9 @@ def create_query_router(auth_dependency) -> APIRouter:
     ):
         start_dt, end_dt = _parse_time_range(start, end)
         reader = _get_reader(request)
-        return reader.query_event_throughput(
+        return await _execute(
+            request,
+            reader.query_event_throughput,
             start=start_dt,
             end=end_dt,
             bucket_width_sec=bucketWidthSec,
@@ -124,7 +311,9 @@ def create_query_router(auth_dependency) -> APIRouter:
         maxRows: int = Query(default=1000, ge=1, le=10000),
     ):
         reader = _get_reader(request)
-        return reader.query_go_dark_status(
+        return await _execute(
+            request,
+            reader.query_go_dark_status,
             service_name=serviceName,
             environment=environment,
             max_rows=maxRows,
@@ -145,10 +334,12 @@ def create_query_router(auth_dependency) -> APIRouter:
         ),
         bucketWidthSec: int = Query(default=30, ge=10, le=86400),
         maxRows: int = Query(default=10000, ge=1, le=10000),
+        stat: str = Query(default="sum", pattern="^(sum|p50|p95|p99|max)$"),
+        format: str = Query(default="json", pattern="^(json|json-stream|ndjson)$"),
     ):
         start_dt, end_dt = _parse_time_range(start, end)
         reader = _get_reader(request)
-        return reader.query_container_metrics(
+        kwargs = dict(
             start=start_dt,
             end=end_dt,
             bucket_width_sec=bucketWidthSec,
@@ -157,7 +348,12 @@ def create_query_router(auth_dependency) -> APIRouter:
             instance_id=instanceId,
             rollup=rollup,
             max_rows=maxRows,
+            stat=stat,
         )
+        if format == "json":
+            return await _execute(request, reader.query_container_metrics, **kwargs)
+        meta, rows = await _execute(request, reader.stream_container_metrics, **kwargs)
+        return _streaming_response(format, meta, rows)
 
     @router.get("/recent-events")
     async def get_recent_events(
@@ -171,10 +367,17 @@ def create_query_router(auth_dependency) -> APIRouter:
         cursor: str | None = Query(default=None),
         severity: str | None = Query(default=None),
         type: str | None = Query(default=None),
+        includeTotal: bool = Query(default=True),
+        tag: list[str] | None = Query(default=None),
+        format: str = Query(default="json", pattern="^(json|json-stream|ndjson)$"),
     ):
         start_dt, end_dt = _parse_time_range(start, end)
+        try:
+            tags = _parse_tags(tag)
+        except ValueError as exc:
+            raise _rejected(request, str(exc)) from exc
         reader = _get_reader(request)
-        return reader.query_recent_events(
+        kwargs = dict(
             start=start_dt,
             end=end_dt,
             service_name=serviceName,
@@ -183,6 +386,55 @@ def create_query_router(auth_dependency) -> APIRouter:
             cursor=cursor,
             severity=severity,
             event_type=type,
+            include_total=includeTotal,
+            tags=tags,
         )
+        if format == "json":
+            return await _execute(request, reader.query_recent_events, **kwargs)
+        meta, rows = await _execute(request, reader.stream_recent_events, **kwargs)
+        return _streaming_response(format, meta, rows)
+
+    @router.get("/trace-events")
+    async def get_trace_events(
+        request: Request,
+        _: str = Depends(auth_dependency),
+        traceId: str = Query(min_length=1),
+        maxRows: int = Query(default=1000, ge=1, le=10000),
+    ):
+        reader = _get_reader(request)
+        return await _execute(
+            request,
+            reader.query_trace_events,
+            trace_id=traceId,
+            max_rows=maxRows,
+        )
+
+    @router.post("/batch")
+    async def post_query_batch(
+        payload: dict,
+        request: Request,
+        _: str = Depends(auth_dependency),
+    ):
+        errors = schema_registry.validate("query_batch_request", payload)
+        if errors:
+            raise _rejected(request, "; ".join(errors))
+        ids = [sub["id"] for sub in payload["queries"]]
+        if len(set(ids)) != len(ids):
+            raise _rejected(request, "queries[].id values must be unique")
+
+        reader = _get_reader(request)
+        results = await _execute(request, reader.query_batch, _plan_batch(payload))
+        return {
+            "results": [
+                {
+                    "id": sub["id"],
+                    "query": sub["query"],
+                    "data": _project(result, sub.get("fields")),
+                    "meta": result["meta"],
+                }
+                for sub, result in zip(payload["queries"], results)
+            ],
+            "meta": {"totalQueries": len(results)},
+        }
 
     return router
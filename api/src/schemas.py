@@ -1,14 +1,32 @@
+"""JSON schema registry for request and response validation.
+
+Validators are built on first use, not at import, so the app serves
+``/health`` without importing jsonschema or reading any schema file.
+
+``python -m src.schemas`` (run in the image build) writes
+schemas.bundle.json next to ``schemas/``: every schema, already parsed and
+stripped of ``$id``, plus the size and mtime of each source file. The
+registry loads the bundle in one read when those still match a stat of the
+schema files and falls back to reading ``schemas/`` when it is missing or
+stale.
+"""
+
 from __future__ import annotations
 
 import json
+import logging
+import os
+import threading
 from pathlib import Path
 from typing import Any
 
-from jsonschema import Draft202012Validator, RefResolver
 
+logger = logging.getLogger("arecibo.schemas")
 
 ROOT = Path(__file__).resolve().parents[2]
 SCHEMA_DIR = ROOT / "schemas"
+SCHEMA_BUNDLE = ROOT / "schemas.bundle.json"
+BUNDLE_VERSION = 2
 
 
 def _load_schema(path: Path) -> dict[str, Any]:
@@ -33,16 +51,73 @@ def _strip_ids(value: Any) -> Any:
     return value
 
 
+def _schema_files() -> list[Path]:
+    return sorted(SCHEMA_DIR.rglob("*.json"))
+
+
+def _file_stamps() -> dict[str, list[int]]:
+    """Relative path -> [size, mtime_ns] of every schema file; stats, no reads."""
+    stamps = {}
+    for path in _schema_files():
+        stat = path.stat()
+        stamps[path.relative_to(SCHEMA_DIR).as_posix()] = [stat.st_size, stat.st_mtime_ns]
+    return stamps
+
+
+def build_bundle() -> dict[str, Any]:
+    return {
+        "version": BUNDLE_VERSION,
+        "files": _file_stamps(),
+        "schemas": {
+            path.relative_to(SCHEMA_DIR).as_posix(): _load_schema(path)
+            for path in _schema_files()
+        },
+    }
+
+
+def write_bundle(path: Path = SCHEMA_BUNDLE) -> None:
+    tmp = path.with_name(f".{path.name}.tmp")
+    with tmp.open("w", encoding="utf-8") as handle:
+        json.dump(build_bundle(), handle, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _read_bundle(path: Path) -> dict[str, dict[str, Any]] | None:
+    """Return the bundle's store keyed by schema file URI, or None if unusable."""
+    try:
+        with path.open("r", encoding="utf-8") as handle:
+            bundle = json.load(handle)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError):
+        logger.warning("schema_bundle_unreadable", extra={"fields": {"path": str(path)}})
+        return None
+    if bundle.get("version") != BUNDLE_VERSION or bundle.get("files") != _file_stamps():
+        logger.warning("schema_bundle_stale", extra={"fields": {"path": str(path)}})
+        return None
+    base = SCHEMA_DIR.resolve()
+    return {(base / rel).as_uri(): schema for rel, schema in bundle["schemas"].items()}
+
+
 class SchemaRegistry:
-    def __init__(self) -> None:
-        self._validators: dict[str, Draft202012Validator] = {}
+    def __init__(self, bundle_path: Path | None = SCHEMA_BUNDLE) -> None:
+        self._bundle_path = bundle_path
+        self._lock = threading.Lock()
+        self._paths: dict[str, Path] = {}
+        self._validators: dict[str, Any] = {}
         self._schemas: dict[str, dict[str, Any]] = {}
-        self._store = self._build_store()
+        self._store: dict[str, dict[str, Any]] | None = None
+        self._validator_cls: Any = None
+        self._resolver_cls: Any = None
         self._register_defaults()
 
     def _build_store(self) -> dict[str, dict[str, Any]]:
+        if self._bundle_path is not None:
+            bundled = _read_bundle(self._bundle_path)
+            if bundled is not None:
+                return bundled
         store: dict[str, dict[str, Any]] = {}
-        for path in SCHEMA_DIR.rglob("*.json"):
+        for path in _schema_files():
             store[path.resolve().as_uri()] = _load_schema(path)
         return store
 
@@ -53,6 +128,11 @@ class SchemaRegistry:
             "policy_response",
             SCHEMA_DIR / "policy" / "policy-response.1.0.0.json",
         )
+        self.register("policy_list", SCHEMA_DIR / "policy" / "policy-list.1.0.0.json")
+        self.register(
+            "policy_bulk_request",
+            SCHEMA_DIR / "policy" / "policy-bulk-request.1.0.0.json",
+        )
         self.register("announce", SCHEMA_DIR / "ingest" / "announce.1.0.0.json")
         self.register(
             "heartbeat",
@@ -66,24 +146,57 @@ class SchemaRegistry:
             "query_container_metrics",
             SCHEMA_DIR / "query" / "container-metrics.1.0.0.json",
         )
+        self.register(
+            "query_trace_events",
+            SCHEMA_DIR / "query" / "trace-events.1.0.0.json",
+        )
+        self.register(
+            "query_batch_request",
+            SCHEMA_DIR / "query" / "batch-request.1.0.0.json",
+        )
 
     def register(self, name: str, path: Path) -> None:
-        schema_uri = path.resolve().as_uri()
-        schema = self._store[schema_uri]
-        resolver = RefResolver(base_uri=schema_uri, referrer=schema, store=self._store)
-        validator = Draft202012Validator(
-            schema,
-            resolver=resolver,
-        )
-        self._validators[name] = validator
-        self._schemas[name] = schema
+        with self._lock:
+            self._paths[name] = path
+            self._validators.pop(name, None)
+
+    def _validator(self, name: str) -> Any:
+        validator = self._validators.get(name)
+        if validator is not None:
+            return validator
+        path = self._paths[name]
+        with self._lock:
+            if self._store is None:
+                # Deferred: importing jsonschema dominates the registry's cost.
+                from jsonschema import Draft202012Validator, RefResolver
+
+                self._validator_cls = Draft202012Validator
+                self._resolver_cls = RefResolver
+                self._store = self._build_store()
+
+            schema_uri = path.resolve().as_uri()
+            schema = self._store[schema_uri]
+            resolver = self._resolver_cls(base_uri=schema_uri, referrer=schema, store=self._store)
+            validator = self._validator_cls(
+                schema,
+                resolver=resolver,
+            )
+            self._validators[name] = validator
+            self._schemas[name] = schema
+        return validator
 
     def validate(self, name: str, payload: Any) -> list[str]:
-        validator = self._validators[name]
+        validator = self._validator(name)
         return [error.message for error in validator.iter_errors(payload)]
 
     def schema(self, name: str) -> dict[str, Any]:
+        self._validator(name)
         return self._schemas[name]
 
 
 schema_registry = SchemaRegistry()
+
+
+if __name__ == "__main__":
+    write_bundle()
+    print(f"wrote {SCHEMA_BUNDLE}")
@@ -0,0 +1,170 @@
+"""Mergeable approximate summaries for long-window queries.
+
+Sketches have a fixed size regardless of how many values they absorb, merge
+losslessly with sketches of the same parameters, and serialize to plain JSON
+so they can be persisted next to the partitions they summarize.
+"""
+
+from __future__ import annotations
+
+import base64
+import hashlib
+import math
+
+DEFAULT_HLL_PRECISION = 12
+DEFAULT_DDSKETCH_ACCURACY = 0.01
+
+# DDSketch values at or below this are counted in the zero bucket.
+_DDSKETCH_MIN_INDEXABLE = 1e-9
+
+
+class HyperLogLog:
+    """Distinct-value counter (Flajolet et al. 2007).
+
+    ``2**precision`` one-byte registers; the standard error is about
+    1.04 / sqrt(2**precision), 1.6% at the default precision. Small
+    cardinalities use linear counting and are close to exact.
+    """
+
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision: int = DEFAULT_HLL_PRECISION, registers: bytes | None = None) -> None:
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        size = 1 << precision
+        if registers is None:
+            self.registers = bytearray(size)
+        elif len(registers) != size:
+            raise ValueError(f"expected {size} registers, got {len(registers)}")
+        else:
+            self.registers = bytearray(registers)
+
+    def add(self, value: str) -> None:
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+        h = int.from_bytes(digest, "big")
+        width = 64 - self.precision
+        index = h >> width
+        rank = width - (h & ((1 << width) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: HyperLogLog) -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / math.fsum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_json(self) -> dict:
+        return {
+            "p": self.precision,
+            "r": base64.b64encode(bytes(self.registers)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> HyperLogLog:
+        """Rebuild a sketch from to_json output; raises ValueError if malformed."""
+        try:
+            return cls(int(data["p"]), base64.b64decode(data["r"], validate=True))
+        except (KeyError, TypeError, ValueError) as exc:
+            raise ValueError(f"invalid HyperLogLog: {exc}") from exc
+
+
+class DDSketch:
+    """Quantile sketch with relative-error guarantees (Masson et al. 2019).
+
+    Non-negative values fall into logarithmic bins of ratio gamma; any
+    quantile is returned within ``relative_accuracy`` of a true value.
+    Merging adds bin counts, so a merged sketch equals one built from the
+    union of the inputs. The exact min and max are kept alongside.
+    """
+
+    __slots__ = ("relative_accuracy", "_gamma", "_log_gamma", "bins", "zero_count", "min", "max")
+
+    def __init__(self, relative_accuracy: float = DEFAULT_DDSKETCH_ACCURACY) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def count(self) -> int:
+        return self.zero_count + sum(self.bins.values())
+
+    def add(self, value: float) -> None:
+        if value < 0:
+            raise ValueError("DDSketch values must be non-negative")
+        if value > _DDSKETCH_MIN_INDEXABLE:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        else:
+            self.zero_count += 1
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: DDSketch) -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge DDSketches of different accuracy")
+        for key, n in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + n
+        self.zero_count += other.zero_count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float | None:
+        """Value at quantile ``q`` in [0, 1]; None for an empty sketch."""
+        count = self.count
+        if count == 0:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        rank = q * (count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self._gamma ** key / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_json(self) -> dict:
+        return {
+            "a": self.relative_accuracy,
+            "z": self.zero_count,
+            "b": {str(key): n for key, n in self.bins.items()},
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> DDSketch:
+        """Rebuild a sketch from to_json output; raises ValueError if malformed."""
+        try:
+            sketch = cls(float(data["a"]))
+            sketch.zero_count = int(data["z"])
+            sketch.bins = {int(key): int(n) for key, n in data["b"].items()}
+            if sketch.count:
+                sketch.min = float(data["min"])
+                sketch.max = float(data["max"])
+        except (KeyError, TypeError, ValueError, AttributeError) as exc:
+            raise ValueError(f"invalid DDSketch: {exc}") from exc
+        return sketch
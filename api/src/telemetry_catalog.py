@@ -0,0 +1,158 @@
+"""Telemetry partition catalog.
+
+In-memory index of the date/service/environment partitions under
+data/telemetry/, so queries can plan a scan without listing and stat-ing
+directories on every request.
+
+The catalog is bootstrapped with os.scandir at startup, updated by
+TelemetryStore when it creates a partition and by retention when it prunes
+a date or a service within one. This process is the only writer of the
+telemetry tree; partitions created by other means are picked up on the
+next refresh().
+
+Layout (matches telemetry_store.py):
+  data/telemetry/{YYYY-MM-DD}/{serviceName}/{environment}/{type}.jsonl
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import re
+import threading
+from datetime import date
+from pathlib import Path
+
+from .telemetry_store import _safe_name
+
+logger = logging.getLogger("arecibo.telemetry_catalog")
+
+_DATE_DIR_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def _is_date_dir(name: str) -> bool:
+    if not _DATE_DIR_RE.fullmatch(name):
+        return False
+    try:
+        date.fromisoformat(name)
+    except ValueError:
+        return False
+    return True
+
+
+def _subdirs(path: str) -> list[str]:
+    try:
+        with os.scandir(path) as it:
+            return [entry.name for entry in it if entry.is_dir()]
+    except OSError:
+        return []
+
+
+class PartitionCatalog:
+    """Date -> (serviceName, environment) partitions present on disk."""
+
+    def __init__(self, base_dir: str | Path) -> None:
+        self._base = Path(base_dir)
+        self._lock = threading.Lock()
+        self._partitions: dict[str, set[tuple[str, str]]] = {}
+        self._dates: list[str] = []
+        # date -> sorted partitions, rebuilt lazily after a change
+        self._sorted: dict[str, list[tuple[str, str]]] = {}
+
+    @property
+    def base_dir(self) -> Path:
+        return self._base
+
+    def refresh(self) -> None:
+        """Rebuild the catalog from disk."""
+        partitions: dict[str, set[tuple[str, str]]] = {}
+        base = str(self._base)
+        for date_str in _subdirs(base):
+            if not _is_date_dir(date_str):
+                continue
+            date_path = os.path.join(base, date_str)
+            pairs = partitions[date_str] = set()
+            for svc in _subdirs(date_path):
+                # "@" directories hold indexes, not partitions.
+                if svc.startswith("@"):
+                    continue
+                for env in _subdirs(os.path.join(date_path, svc)):
+                    pairs.add((svc, env))
+        with self._lock:
+            self._partitions = partitions
+            self._dates = sorted(partitions)
+            self._sorted = {}
+        logger.info(
+            "partition_catalog_refreshed",
+            extra={"fields": {
+                "dates": len(partitions),
+                "partitions": sum(len(p) for p in partitions.values()),
+            }},
+        )
+
+    def add(self, date_str: str, service_dir: str, env_dir: str) -> None:
+        """Record a partition directory that now exists."""
+        pairs = self._partitions.get(date_str)
+        if pairs is not None and (service_dir, env_dir) in pairs:
+            return
+        with self._lock:
+            pairs = self._partitions.get(date_str)
+            if pairs is None:
+                pairs = self._partitions[date_str] = set()
+                bisect.insort(self._dates, date_str)
+            pairs.add((service_dir, env_dir))
+            self._sorted.pop(date_str, None)
+
+    def remove_date(self, date_str: str) -> None:
+        """Forget every partition of a pruned date."""
+        with self._lock:
+            if self._partitions.pop(date_str, None) is None:
+                return
+            self._dates.remove(date_str)
+            self._sorted.pop(date_str, None)
+
+    def remove_service(self, date_str: str, service_dir: str) -> None:
+        """Forget a pruned service's partitions for one date."""
+        with self._lock:
+            pairs = self._partitions.get(date_str)
+            if pairs is None:
+                return
+            pairs.difference_update([pair for pair in pairs if pair[0] == service_dir])
+            self._sorted.pop(date_str, None)
+
+    def dates(self, start: date | None = None, end: date | None = None) -> list[str]:
+        """Sorted date strings, optionally within [start, end]."""
+        with self._lock:
+            dates = self._dates
+            lo = bisect.bisect_left(dates, start.isoformat()) if start else 0
+            hi = bisect.bisect_right(dates, end.isoformat()) if end else len(dates)
+            return dates[lo:hi]
+
+    def partitions(
+        self,
+        date_str: str,
+        service_filter: str | None = None,
+        env_filter: str | None = None,
+    ) -> list[tuple[str, str, Path]]:
+        """Return sorted (serviceName, environment, path) partitions for a date."""
+        with self._lock:
+            pairs = self._sorted.get(date_str)
+            if pairs is None:
+                pairs = self._sorted[date_str] = sorted(self._partitions.get(date_str, ()))
+        service_filter = _safe_name(service_filter) if service_filter else None
+        env_filter = _safe_name(env_filter) if env_filter else None
+        date_dir = self._base / date_str
+        return [
+            (svc, env, date_dir / svc / env)
+            for svc, env in pairs
+            if (not service_filter or svc == service_filter)
+            and (not env_filter or env == env_filter)
+        ]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "dates": len(self._dates),
+                "partitions": sum(len(p) for p in self._partitions.values()),
+            }
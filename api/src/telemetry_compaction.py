@@ -0,0 +1,350 @@
+"""Telemetry compaction module.
+
+Rewrites sealed telemetry partitions so their files are ordered and free of
+retry duplicates. Appends land in arrival order, so a day's files interleave
+instances, hold records out of timestamp order and repeat payloads that a
+transponder re-sent after a timeout.
+
+A partition is sealed once its date is over (UTC) and none of its files has
+changed for COMPACTION_GRACE_SEC. Compacting it:
+  - sorts announce and heartbeat records by (sentAt, instanceId) and event
+    batches by receivedAt, which keeps the newest-first events scan valid;
+  - drops records whose payload exactly repeats an earlier one;
+  - rebuilds events.idx.jsonl and the date's @traces buckets, whose byte
+    offsets the rewrite invalidates. The old events index is removed before
+    events.jsonl is swapped, so until the new one is written readers scan
+    the file instead of seeking to stale offsets;
+  - swaps every file in with os.replace. Readers holding the old file keep
+    reading it; new opens see the compacted file;
+  - writes fleet.summary.json for approximate fleet-health queries. Queries
+    only read summaries, so sealed partitions keep a single writer.
+
+A .compacted.json marker records the sizes written; the partition is only
+compacted again if they change.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+from .telemetry_index import (
+    EVENTS_INDEX_FILE,
+    TRACE_INDEX_DIR,
+    evict_event_indexes,
+    index_entry,
+    trace_bucket,
+    trace_ids,
+)
+from .telemetry_reader import (
+    ANNOUNCE_FILE,
+    EVENTS_FILE,
+    HEARTBEAT_FILE,
+    _fleet_summary,
+    _parse_epoch,
+    write_fleet_summary,
+)
+
+logger = logging.getLogger("arecibo.telemetry_compaction")
+
+COMPACTION_MARKER = ".compacted.json"
+# Files untouched for this long in a past date are considered sealed.
+COMPACTION_GRACE_SEC = 300
+
+_SOURCES = (ANNOUNCE_FILE, HEARTBEAT_FILE, EVENTS_FILE)
+
+
+def _record_time(rec: dict) -> int | float | None:
+    payload = rec.get("payload")
+    sent_at = payload.get("sentAt") if isinstance(payload, dict) else None
+    value = sent_at or rec.get("receivedAt")
+    return _parse_epoch(value) if value else None
+
+
+def _identity_key(rec: dict) -> tuple:
+    """Sort announce/heartbeat records by (sentAt, instanceId)."""
+    payload = rec.get("payload")
+    identity = payload.get("identity", {}) if isinstance(payload, dict) else {}
+    ts = _record_time(rec)
+    inst = identity.get("instanceId") if isinstance(identity, dict) else None
+    return (ts is None, ts or 0, str(inst or ""))
+
+
+def _received_key(rec: dict) -> tuple:
+    """Sort event batches by receivedAt."""
+    received = rec.get("receivedAt")
+    ts = _parse_epoch(received) if received else None
+    return (ts is None, ts or 0)
+
+
+_SORT_KEYS: dict[str, Callable[[dict], tuple]] = {
+    ANNOUNCE_FILE: _identity_key,
+    HEARTBEAT_FILE: _identity_key,
+    EVENTS_FILE: _received_key,
+}
+
+
+def _plan_file(filepath: Path, sort_key: Callable[[dict], tuple]) -> tuple[list[tuple], int, int]:
+    """Return (sorted (key, offset, length) entries, duplicates, malformed) for a file."""
+    entries = []
+    seen: set[bytes] = set()
+    duplicates = malformed = 0
+    with open(filepath, "rb") as f:
+        offset = 0
+        for line in f:
+            length = len(line)
+            if line.strip():
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    rec = None
+                if not isinstance(rec, dict):
+                    malformed += 1
+                else:
+                    canonical = json.dumps(
+                        rec.get("payload"), sort_keys=True, separators=(",", ":"),
+                    ).encode("utf-8")
+                    digest = hashlib.blake2b(canonical, digest_size=16).digest()
+                    if digest in seen:
+                        duplicates += 1
+                    else:
+                        seen.add(digest)
+                        entries.append((sort_key(rec), offset, length))
+            offset += length
+    # Ties keep file order, so an already ordered file is left as is.
+    entries.sort(key=lambda entry: (entry[0], entry[1]))
+    return entries, duplicates, malformed
+
+
+def _write_sorted(filepath: Path, entries: list[tuple]) -> list[tuple[int, bytes]]:
+    """Rewrite ``filepath`` in ``entries`` order; return (new offset, line) pairs."""
+    tmp = filepath.with_name(f".{filepath.name}.compact")
+    written = []
+    with open(filepath, "rb") as src, open(tmp, "wb") as dst:
+        for _key, offset, length in entries:
+            src.seek(offset)
+            line = src.read(length)
+            if not line.endswith(b"\n"):
+                line += b"\n"
+            written.append((dst.tell(), line))
+            dst.write(line)
+        dst.flush()
+        os.fsync(dst.fileno())
+    os.replace(tmp, filepath)
+    return written
+
+
+def _write_jsonl_atomic(filepath: Path, records: list[dict]) -> None:
+    tmp = filepath.with_name(f".{filepath.name}.compact")
+    with open(tmp, "wb") as f:
+        for record in records:
+            f.write((json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8"))
+    os.replace(tmp, filepath)
+
+
+def _read_marker(partition_dir: Path) -> dict | None:
+    try:
+        with open(partition_dir / COMPACTION_MARKER, "r", encoding="utf-8") as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return marker if isinstance(marker, dict) else None
+
+
+def _source_sizes(partition_dir: Path) -> dict[str, int]:
+    sizes = {}
+    for source in _SOURCES:
+        try:
+            sizes[source] = os.stat(partition_dir / source).st_size
+        except FileNotFoundError:
+            continue
+    return sizes
+
+
+def _is_sealed(partition_dir: Path, now_epoch: float, grace_sec: int) -> bool:
+    for source in _SOURCES:
+        try:
+            if now_epoch - os.stat(partition_dir / source).st_mtime < grace_sec:
+                return False
+        except FileNotFoundError:
+            continue
+    return True
+
+
+def compact_partition(partition_dir: Path) -> dict:
+    """Sort and de-duplicate one partition's files in place.
+
+    Returns counts of files rewritten, duplicates and malformed lines dropped,
+    and whether events.jsonl was rewritten (its trace index then needs a
+    rebuild).
+    """
+    result = {"rewritten": 0, "duplicates": 0, "malformed": 0, "eventsRewritten": False}
+    for source in _SOURCES:
+        filepath = partition_dir / source
+        if not filepath.is_file():
+            continue
+        entries, duplicates, malformed = _plan_file(filepath, _SORT_KEYS[source])
+        result["duplicates"] += duplicates
+        result["malformed"] += malformed
+        in_order = all(entries[i][1] < entries[i + 1][1] for i in range(len(entries) - 1))
+        if in_order and not duplicates and not malformed:
+            continue
+        if source == EVENTS_FILE:
+            # A same-size rewrite would still pass the index's size check.
+            (partition_dir / EVENTS_INDEX_FILE).unlink(missing_ok=True)
+            evict_event_indexes(partition_dir)
+        written = _write_sorted(filepath, entries)
+        result["rewritten"] += 1
+        if source == EVENTS_FILE:
+            result["eventsRewritten"] = True
+            index = []
+            for offset, line in written:
+                payload = json.loads(line).get("payload")
+                index.append(index_entry(
+                    payload if isinstance(payload, dict) else {}, offset, offset + len(line),
+                ))
+            _write_jsonl_atomic(partition_dir / EVENTS_INDEX_FILE, index)
+    write_fleet_summary(partition_dir)
+
+    marker_tmp = partition_dir / f".{COMPACTION_MARKER}.tmp"
+    with open(marker_tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "sources": _source_sizes(partition_dir),
+            "compactedAt": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        }, f)
+    os.replace(marker_tmp, partition_dir / COMPACTION_MARKER)
+    return result
+
+
+def rebuild_trace_index(date_dir: Path) -> int:
+    """Rewrite a date's @traces buckets from its events files; return entries written."""
+    buckets: dict[str, list[dict]] = {}
+    for svc_dir in sorted(date_dir.iterdir()):
+        if svc_dir.name.startswith("@") or not svc_dir.is_dir():
+            continue
+        for env_dir in sorted(svc_dir.iterdir()):
+            events = env_dir / EVENTS_FILE
+            if not events.is_file():
+                continue
+            with open(events, "rb") as f:
+                offset = 0
+                for line in f:
+                    try:
+                        payload = json.loads(line).get("payload")
+                    except (ValueError, AttributeError):
+                        payload = None
+                    if isinstance(payload, dict):
+                        for trace_id in trace_ids(payload):
+                            buckets.setdefault(trace_bucket(trace_id), []).append({
+                                "t": trace_id, "s": svc_dir.name, "e": env_dir.name, "o": offset,
+                            })
+                    offset += len(line)
+
+    trace_dir = date_dir / TRACE_INDEX_DIR
+    if buckets:
+        trace_dir.mkdir(exist_ok=True)
+    for name, entries in buckets.items():
+        _write_jsonl_atomic(trace_dir / name, entries)
+    if trace_dir.is_dir():
+        for stale in trace_dir.iterdir():
+            if stale.name not in buckets and not stale.name.startswith("."):
+                stale.unlink(missing_ok=True)
+    return sum(len(entries) for entries in buckets.values())
+
+
+def run_compaction(
+    base_dir: str | Path,
+    *,
+    now: datetime | None = None,
+    grace_sec: int = COMPACTION_GRACE_SEC,
+) -> dict:
+    """Compact every sealed, not yet compacted partition under base_dir.
+
+    Args:
+        base_dir: Root telemetry directory (e.g. data/telemetry/).
+        now: Override current time for deterministic testing.
+        grace_sec: Minimum age of a partition's newest write before it is compacted.
+
+    Returns:
+        Summary dict with scanned, compacted, skipped, duplicate and error counts.
+    """
+    base = Path(base_dir)
+    if now is None:
+        now = datetime.now(timezone.utc)
+    today = now.date()
+    now_epoch = now.timestamp()
+
+    summary = {"scanned": 0, "compacted": 0, "skipped": 0, "duplicates": 0, "errors": 0}
+    if not base.is_dir():
+        return summary
+
+    started = time.monotonic()
+    for date_dir in sorted(base.iterdir()):
+        try:
+            partition_date = datetime.strptime(date_dir.name, "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        if not date_dir.is_dir() or partition_date >= today:
+            continue
+        events_rewritten = False
+        for svc_dir in sorted(date_dir.iterdir()):
+            if svc_dir.name.startswith("@") or not svc_dir.is_dir():
+                continue
+            for partition_dir in sorted(svc_dir.iterdir()):
+                if not partition_dir.is_dir():
+                    continue
+                summary["scanned"] += 1
+                sizes = _source_sizes(partition_dir)
+                marker = _read_marker(partition_dir)
+                # Downsampled partitions have no raw files left to compact.
+                if not sizes or (marker is not None and marker.get("sources") == sizes):
+                    # Rebuild a summary that was deleted or predates this pass.
+                    if sizes and _fleet_summary(partition_dir) is None:
+                        try:
+                            write_fleet_summary(partition_dir)
+                        except OSError:
+                            logger.exception(
+                                "fleet_summary_write_failed",
+                                extra={"fields": {"partition": str(partition_dir)}},
+                            )
+                    summary["skipped"] += 1
+                    continue
+                if not _is_sealed(partition_dir, now_epoch, grace_sec):
+                    summary["skipped"] += 1
+                    continue
+                try:
+                    result = compact_partition(partition_dir)
+                except Exception:
+                    logger.exception(
+                        "compaction_error",
+                        extra={"fields": {"partition": str(partition_dir)}},
+                    )
+                    summary["errors"] += 1
+                    continue
+                summary["compacted"] += 1
+                summary["duplicates"] += result["duplicates"]
+                events_rewritten = events_rewritten or result["eventsRewritten"]
+        if events_rewritten:
+            try:
+                rebuild_trace_index(date_dir)
+            except Exception:
+                logger.exception(
+                    "compaction_trace_index_error",
+                    extra={"fields": {"date": date_dir.name}},
+                )
+                summary["errors"] += 1
+
+    logger.info(
+        "compaction_complete",
+        extra={"fields": {
+            **summary,
+            "durationMs": round((time.monotonic() - started) * 1000, 1),
+        }},
+    )
+    return summary
@@ -0,0 +1,187 @@
+"""Indexes over stored event batches.
+
+Each partition's events.jsonl gets an events.idx.jsonl sidecar, appended by
+TelemetryStore right after every batch record:
+
+  {"o": <byte offset>, "e": <end offset>, "type": [...], "severity": [...], "tag": ["key=value", ...]}
+
+listing the distinct event types, severities and tags in that batch. The
+reader loads the sidecar into posting lists (term -> record offsets) and
+reads only the batches that can match a filtered event query.
+
+Entries chain: each "o" is the previous entry's "e". The index covers
+events.jsonl up to the end of the chain; anything after it (a failed index
+write, a partition written before indexing existed) is scanned as usual.
+
+Trace index: every date directory also gets an @traces/ directory of hashed
+buckets, one JSONL file per bucket, mapping each traceId seen that day to
+the batches that carry it:
+
+  data/telemetry/{YYYY-MM-DD}/@traces/{bucket}.jsonl
+  {"t": <traceId>, "s": <service dir>, "e": <environment dir>, "o": <byte offset>}
+
+so a trace lookup reads one small bucket per date and then seeks straight to
+the matching batches, across services. The "@" prefix cannot occur in a
+sanitized service name, so partition listings skip it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import zlib
+from pathlib import Path
+from typing import Iterable
+
+logger = logging.getLogger("arecibo.telemetry_index")
+
+EVENTS_INDEX_FILE = "events.idx.jsonl"
+TRACE_INDEX_DIR = "@traces"
+
+_TRACE_BUCKETS = 256
+
+# Index dimensions, in the order they are written.
+INDEX_DIMENSIONS = ("type", "severity", "tag")
+
+_INDEX_CACHE: dict[str, EventIndex] = {}
+_INDEX_CACHE_MAX = 256
+_INDEX_CACHE_LOCK = threading.Lock()
+
+
+def index_entry(payload: dict, offset: int, end: int) -> dict:
+    """Build the sidecar entry for one events batch stored at [offset, end)."""
+    types: set[str] = set()
+    severities: set[str] = set()
+    tags: set[str] = set()
+    for event in payload.get("events", []):
+        if not isinstance(event, dict):
+            continue
+        # Same defaults the reader applies when filtering.
+        types.add(str(event.get("type", "")))
+        severities.add(str(event.get("severity", "info")))
+        event_tags = event.get("tags")
+        if isinstance(event_tags, dict):
+            tags.update(f"{k}={v}" for k, v in event_tags.items())
+    return {
+        "o": offset,
+        "e": end,
+        "type": sorted(types),
+        "severity": sorted(severities),
+        "tag": sorted(tags),
+    }
+
+
+def trace_bucket(trace_id: str) -> str:
+    """Bucket file name for a traceId."""
+    return f"{zlib.crc32(trace_id.encode('utf-8')) % _TRACE_BUCKETS:02x}.jsonl"
+
+
+def trace_ids(payload: dict) -> list[str]:
+    """Distinct traceIds in an events batch, in first-seen order."""
+    seen: dict[str, None] = {}
+    for event in payload.get("events", []):
+        if isinstance(event, dict):
+            trace_id = event.get("traceId")
+            if isinstance(trace_id, str) and trace_id:
+                seen.setdefault(trace_id, None)
+    return list(seen)
+
+
+class EventIndex:
+    """Posting lists for one events file, extended as the sidecar grows."""
+
+    def __init__(self, path: Path, inode: int) -> None:
+        self.path = path
+        self.inode = inode
+        self.postings: dict[tuple[str, str], list[int]] = {}
+        self.covered = 0
+        self._loaded = 0
+        self._broken = False
+        self._lock = threading.Lock()
+
+    def _extend(self, size: int) -> None:
+        """Index sidecar bytes appended since the last load."""
+        if self._broken or size <= self._loaded:
+            return
+        try:
+            with open(self.path, "rb") as f:
+                f.seek(self._loaded)
+                data = f.read(size - self._loaded)
+        except OSError:
+            logger.exception("event_index_read_error", extra={"fields": {"path": str(self.path)}})
+            return
+        # A line still being written is picked up on a later load.
+        complete = data.rfind(b"\n") + 1
+        for line in data[:complete].split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+                offset, end = entry["o"], entry["e"]
+            except (ValueError, KeyError, TypeError):
+                self._broken = True
+                break
+            if offset != self.covered or end <= offset:
+                self._broken = True
+                break
+            for dim in INDEX_DIMENSIONS:
+                for value in entry.get(dim, ()):
+                    self.postings.setdefault((dim, value), []).append(offset)
+            self.covered = end
+        self._loaded += complete
+
+    def lookup(self, term_sets: Iterable[tuple[tuple[str, str], ...]]) -> tuple[list[int], int]:
+        """Return (offsets, covered) for records matching any of ``term_sets``.
+
+        A record matches a term set when it carries every term in it. Offsets
+        are ascending and all lie below ``covered``, the end of the indexed
+        part of the events file.
+        """
+        with self._lock:
+            covered = self.covered
+            matched: set[int] = set()
+            for terms in term_sets:
+                lists = [self.postings.get(term, []) for term in terms]
+                if not lists:
+                    continue
+                lists.sort(key=len)
+                offsets = set(lists[0])
+                for other in lists[1:]:
+                    if not offsets:
+                        break
+                    offsets.intersection_update(other)
+                matched |= offsets
+        return sorted(o for o in matched if o < covered), covered
+
+
+def evict_event_indexes(root: Path) -> None:
+    """Drop cached indexes for events files under ``root`` (a pruned directory)."""
+    prefix = os.path.join(str(root), "")
+    with _INDEX_CACHE_LOCK:
+        for key in [key for key in _INDEX_CACHE if key.startswith(prefix)]:
+            del _INDEX_CACHE[key]
+
+
+def load_event_index(events_path: Path) -> EventIndex | None:
+    """Return the index for an events file, or None if it has no usable index."""
+    index_path = events_path.with_name(EVENTS_INDEX_FILE)
+    try:
+        index_stat = os.stat(index_path)
+        events_size = os.stat(events_path).st_size
+    except OSError:
+        return None
+    key = str(index_path)
+    with _INDEX_CACHE_LOCK:
+        index = _INDEX_CACHE.get(key)
+        if index is None or index.inode != index_stat.st_ino or index._loaded > index_stat.st_size:
+            if len(_INDEX_CACHE) >= _INDEX_CACHE_MAX:
+                _INDEX_CACHE.clear()
+            index = _INDEX_CACHE[key] = EventIndex(index_path, index_stat.st_ino)
+    with index._lock:
+        index._extend(index_stat.st_size)
+        # The events file was rewritten underneath the index; don't trust it.
+        if index.covered > events_size:
+            return None
+    return index
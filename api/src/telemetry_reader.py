@@ -4,6 +4,21 @@ Partition-aware reads from the telemetry file storage for query endpoints.
 Leverages the date/service/environment partition structure to skip irrelevant
 directories and avoid full-scan reads.
 
+Each query is an aggregator that is fed records from a partition scan. A
+single scan can feed several aggregators at once, which is how batched
+queries share one pass over the data.
+
+Aggregator state is a mergeable partial: a fresh copy can be fed a single
+partition (in a worker process) and merged back into the parent in
+partition order, giving the same result as a serial scan.
+
+Filtered event queries consult the events.idx.jsonl sidecar (see
+telemetry_index.py) and read only the batches that can match.
+
+Partitions past the raw retention tier hold only a rollup.json (see
+telemetry_rollup.py); aggregators that can answer from it fold it in via
+``feed_rollup`` and the rest see nothing from that partition.
+
 Layout (matches telemetry_store.py):
   data/telemetry/{YYYY-MM-DD}/{serviceName}/{environment}/{type}.jsonl
 """
@@ -11,22 +26,123 @@ Layout (matches telemetry_store.py):
 from __future__ import annotations
 
 import base64
+import bisect
+import copy
+import heapq
+import itertools
 import json
 import logging
-from datetime import datetime, timedelta, timezone
+import multiprocessing
+import os
+import re
+import threading
+import time
+from array import array
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from json.decoder import scanstring
+from operator import itemgetter
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, NamedTuple
 
+from .sketches import DDSketch, HyperLogLog
+from .telemetry_catalog import PartitionCatalog
+from .telemetry_index import TRACE_INDEX_DIR, load_event_index, trace_bucket
 from .telemetry_store import _safe_name
 
+try:
+    import numpy as np
+except ImportError:  # optional: bucketing falls back to pure Python
+    np = None
+
 logger = logging.getLogger("arecibo.telemetry_reader")
 
+ANNOUNCE_FILE = "announce.jsonl"
+HEARTBEAT_FILE = "heartbeat.jsonl"
+EVENTS_FILE = "events.jsonl"
+
+# Per-partition fleet-health summary (instance sketch and last-seen times).
+FLEET_SUMMARY_FILE = "fleet.summary.json"
+
+# Downsampled partition summary written by telemetry_rollup.py.
+ROLLUP_FILE = "rollup.json"
+ROLLUP_VERSION = 1
+
+# Fleet-health windows longer than this count instances approximately by default.
+FLEET_APPROX_MIN_DAYS = 7
+
+# Below this many partitions a scan stays in-process; pool overhead dominates.
+PARALLEL_MIN_PARTITIONS = 4
+
+# Block size for reading JSONL files from the end.
+_REVERSE_BLOCK_SIZE = 64 * 1024
+
+# Record key holding (date, byte offset) for aggregators that want positions.
+# Projection keeps only requested fields, so stored data never carries it.
+_RECORD_POSITION = "@position"
 
-def _parse_ts(ts_str: str) -> datetime | None:
-    """Parse an RFC 3339 UTC timestamp (trailing Z)."""
+# Buffered event offsets are folded into bucket counts at this size.
+_VECTOR_FLUSH_EVENTS = 1 << 16
+
+# How far an event ts may run ahead of its batch's receivedAt (transponder
+# clock skew). The newest-first scan relies on ts <= receivedAt + this bound.
+_EVENT_TS_SKEW_SEC = 300
+
+
+# Parsed timestamps by string. Heartbeats and event batches repeat the same
+# second-resolution strings, so most lookups hit; cleared when full.
+_EPOCH_MEMO: dict[str, int | float] = {}
+_EPOCH_MEMO_MAX = 1 << 16
+_UNIX_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Parsed rollups by path, validated by mtime and size; cleared when full.
+_ROLLUP_CACHE: dict[str, tuple[int, int, dict]] = {}
+_ROLLUP_CACHE_MAX = 1024
+
+
+def _parse_epoch(ts_str: str) -> int | float | None:
+    """Parse an RFC 3339 timestamp to epoch seconds.
+
+    The mandated ``YYYY-MM-DDTHH:MM:SSZ`` form is decoded by slicing straight
+    to an integer. Other valid forms (fractional seconds, numeric offsets) go
+    through ``datetime.fromisoformat``. Returns None for anything unparseable
+    or without a UTC offset.
+    """
+    if not isinstance(ts_str, str):
+        return None
+    epoch = _EPOCH_MEMO.get(ts_str)
+    if epoch is not None:
+        return epoch
     try:
-        return datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
-    except (ValueError, AttributeError):
+        if (
+            len(ts_str) == 20
+            and ts_str[19] == "Z"
+            and ts_str[4] == ts_str[7] == "-"
+            and ts_str[10] == "T"
+            and ts_str[13] == ts_str[16] == ":"
+        ):
+            digits = ts_str[0:4] + ts_str[5:7] + ts_str[8:10] + ts_str[11:13] + ts_str[14:16] + ts_str[17:19]
+            if not (digits.isascii() and digits.isdigit()):
+                return None
+            hour, minute, second = int(digits[8:10]), int(digits[10:12]), int(digits[12:14])
+            if hour > 23 or minute > 59 or second > 59:
+                return None
+            day = date(int(digits[0:4]), int(digits[4:6]), int(digits[6:8])).toordinal()
+            epoch = (day - _UNIX_EPOCH_ORDINAL) * 86400 + hour * 3600 + minute * 60 + second
+        else:
+            dt = datetime.fromisoformat(ts_str.replace("Z", "+00:00"))
+            if dt.tzinfo is None:
+                return None
+            epoch = dt.timestamp()
+            if epoch.is_integer():
+                epoch = int(epoch)
+    except ValueError:
         return None
+    if len(_EPOCH_MEMO) >= _EPOCH_MEMO_MAX:
+        _EPOCH_MEMO.clear()
+    _EPOCH_MEMO[ts_str] = epoch
+    return epoch
 
 
 def _format_ts(dt: datetime) -> str:
@@ -34,30 +150,1894 @@ def _format_ts(dt: datetime) -> str:
     return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-def _encode_cursor(offset: int) -> str:
-    return base64.urlsafe_b64encode(json.dumps({"o": offset}).encode()).decode()
+def _format_epoch(epoch: int | float) -> str:
+    """Format epoch seconds as RFC 3339 UTC with trailing Z."""
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch))
 
 
-def _decode_cursor(cursor: str | None) -> int:
+def _encode_cursor(after: list, total: int | None = None) -> str:
+    """Encode a keyset cursor: the sort key of the last row returned.
+
+    ``total`` carries the first page's totalRows so later pages need not
+    recount it.
+    """
+    data: dict = {"k": after}
+    if total is not None:
+        data["t"] = total
+    return base64.urlsafe_b64encode(
+        json.dumps(data, separators=(",", ":")).encode()
+    ).decode()
+
+
+_NUMBER = (int, float)
+
+
+def _decode_cursor(
+    cursor: str | None, key_types: tuple[tuple[type, ...], ...]
+) -> tuple[tuple | None, int | None]:
+    """Return (last row key, carried total); (None, None) starts from page 1.
+
+    ``key_types`` gives the allowed types of each key element. A cursor
+    whose key does not match it is treated as absent, so a crafted cursor
+    cannot make key comparisons fail.
+    """
     if not cursor:
-        return 0
+        return None, None
     try:
         data = json.loads(base64.urlsafe_b64decode(cursor))
-        return max(0, int(data.get("o", 0)))
+        after = data["k"]
+        total = data.get("t")
     except Exception:
-        return 0
+        return None, None
+    if (
+        not isinstance(after, list)
+        or len(after) != len(key_types)
+        # type() rather than isinstance() so booleans are not taken as ints.
+        or not all(type(value) in types for value, types in zip(after, key_types))
+        or (total is not None and type(total) is not int)
+    ):
+        return None, None
+    return tuple(after), total
+
+
+# C-accelerated value scanner from the stdlib decoder; used to decode kept
+# leaves and to step over unprojected values without retaining them.
+_scan_once = json.JSONDecoder().scan_once
+_WS = re.compile(r"[ \t\n\r]*")
+
+# Lines at least this long are decoded by walking the projection, so skipped
+# values (event payloads) are dropped one at a time instead of the whole
+# record being materialized. Shorter lines are faster to decode whole in C
+# and project afterwards.
+_STREAM_DECODE_MIN_CHARS = 256 * 1024
+
+
+@lru_cache(maxsize=64)
+def _compile_projection(fields: tuple[str, ...]) -> dict:
+    """Turn dotted paths into a nested key tree.
+
+    ``payload.events[].ts`` keeps ``ts`` from every element of the
+    ``payload.events`` array. A None leaf keeps the whole value.
+    """
+    tree: dict = {}
+    for path in fields:
+        node = tree
+        parts = path.split(".")
+        for i, part in enumerate(parts):
+            is_array = part.endswith("[]")
+            key = part[:-2] if is_array else part
+            if i == len(parts) - 1:
+                # Keeping the whole value supersedes any narrower paths.
+                node[key] = None
+                break
+            if key in node and node[key] is None:
+                break
+            node = node.setdefault(key, {})
+            if is_array:
+                if "[]" in node and node["[]"] is None:
+                    break
+                node = node.setdefault("[]", {})
+    return tree
+
+
+def _decode_projected(s: str, idx: int, tree: dict) -> tuple[object, int]:
+    """Decode the JSON value at ``s[idx]``, keeping only keys in ``tree``."""
+    idx = _WS.match(s, idx).end()
+    ch = s[idx:idx + 1]
+    if ch == "{":
+        obj = {}
+        idx = _WS.match(s, idx + 1).end()
+        if s[idx:idx + 1] == "}":
+            return obj, idx + 1
+        while True:
+            if s[idx:idx + 1] != '"':
+                raise ValueError("expected object key")
+            key, idx = scanstring(s, idx + 1)
+            idx = _WS.match(s, idx).end()
+            if s[idx:idx + 1] != ":":
+                raise ValueError("expected ':'")
+            idx = _WS.match(s, idx + 1).end()
+            if key in tree:
+                sub = tree[key]
+                if sub is None:
+                    obj[key], idx = _scan_once(s, idx)
+                else:
+                    obj[key], idx = _decode_projected(s, idx, sub)
+            else:
+                _skipped, idx = _scan_once(s, idx)
+            idx = _WS.match(s, idx).end()
+            ch = s[idx:idx + 1]
+            if ch == "}":
+                return obj, idx + 1
+            if ch != ",":
+                raise ValueError("expected ',' or '}'")
+            idx = _WS.match(s, idx + 1).end()
+    if ch == "[" and "[]" in tree:
+        items = []
+        element = tree["[]"]
+        idx = _WS.match(s, idx + 1).end()
+        if s[idx:idx + 1] == "]":
+            return items, idx + 1
+        while True:
+            item, idx = _decode_projected(s, idx, element)
+            items.append(item)
+            idx = _WS.match(s, idx).end()
+            ch = s[idx:idx + 1]
+            if ch == "]":
+                return items, idx + 1
+            if ch != ",":
+                raise ValueError("expected ',' or ']'")
+            idx += 1
+    # Shape differs from the projection: keep the value as is.
+    return _scan_once(s, idx)
+
+
+def _project(value: object, tree: dict) -> object:
+    """Project an already decoded value to ``tree``."""
+    if isinstance(value, dict):
+        out = {}
+        for key, sub in tree.items():
+            if key in value:
+                out[key] = value[key] if sub is None else _project(value[key], sub)
+        return out
+    if isinstance(value, list) and "[]" in tree:
+        element = tree["[]"]
+        return [_project(item, element) for item in value]
+    return value
+
+
+def _decode_line(line: str, tree: dict | None) -> dict | None:
+    """Decode one JSONL record, projected to ``tree`` when given."""
+    try:
+        if tree is None:
+            rec = json.loads(line)
+        elif len(line) < _STREAM_DECODE_MIN_CHARS:
+            rec = _project(json.loads(line), tree)
+        else:
+            rec, _end = _decode_projected(line, 0, tree)
+    except (ValueError, StopIteration):
+        return None
+    return rec if isinstance(rec, dict) else None
+
+
+def _read_jsonl(filepath: Path, fields: tuple[str, ...] | None = None) -> Iterator[dict]:
+    """Yield records from a JSONL file one at a time.
+
+    With ``fields`` (dotted paths, see _compile_projection) only those fields
+    are kept; everything else is dropped as soon as the line is decoded, and
+    very long lines never materialize it at all. Memory held across records
+    follows the projection rather than the payload size.
+    """
+    tree = _compile_projection(fields) if fields is not None else None
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                rec = _decode_line(line, tree)
+                if rec is not None:
+                    yield rec
+    except FileNotFoundError:
+        return
+    except OSError:
+        logger.exception("read_jsonl_error", extra={"fields": {"path": str(filepath)}})
+
+
+def _iter_lines_reverse(filepath: Path, start: int = 0) -> Iterator[tuple[int, bytes]]:
+    """Yield (byte offset, line) for non-blank lines, last line first.
+
+    The file is read backwards in fixed-size blocks, so stopping early only
+    costs the blocks actually consumed. Only lines at or after ``start``, which
+    must be a line boundary, are read.
+    """
+    try:
+        f = open(filepath, "rb")
+    except FileNotFoundError:
+        return
+    except OSError:
+        logger.exception("read_jsonl_error", extra={"fields": {"path": str(filepath)}})
+        return
+    with f:
+        pos = f.seek(0, os.SEEK_END)
+        tail = b""
+        while pos > start:
+            size = min(_REVERSE_BLOCK_SIZE, pos - start)
+            pos -= size
+            f.seek(pos)
+            lines = (f.read(size) + tail).split(b"\n")
+            # lines[0] may continue in the previous block; carry it over.
+            tail = lines[0]
+            offset = pos + len(tail) + 1
+            starts = []
+            for line in lines[1:]:
+                starts.append(offset)
+                offset += len(line) + 1
+            for line_start, line in zip(reversed(starts), reversed(lines[1:])):
+                if line.strip():
+                    yield line_start, line
+        if tail.strip():
+            yield start, tail
+
+
+def _read_lines_at(filepath: Path, offsets: Iterator[int]) -> Iterator[tuple[int, bytes]]:
+    """Yield (byte offset, line) for the lines starting at ``offsets``."""
+    try:
+        f = open(filepath, "rb")
+    except FileNotFoundError:
+        return
+    except OSError:
+        logger.exception("read_jsonl_error", extra={"fields": {"path": str(filepath)}})
+        return
+    with f:
+        for offset in offsets:
+            f.seek(offset)
+            line = f.readline()
+            if line.strip():
+                yield offset, line
+
+
+def _read_jsonl_at(
+    filepath: Path,
+    fields: tuple[str, ...] | None = None,
+    offsets: Iterable[int] = (),
+    start: int = 0,
+) -> Iterator[tuple[int, dict]]:
+    """Yield (byte offset, record) for the lines at ``offsets``, then for
+    every line from ``start`` on.
+    """
+    tree = _compile_projection(fields) if fields is not None else None
+    for offset, line in _read_lines_at(filepath, offsets):
+        rec = _decode_line(line.decode("utf-8", "replace"), tree)
+        if rec is not None:
+            yield offset, rec
+    try:
+        with open(filepath, "rb") as f:
+            offset = f.seek(start)
+            for line in f:
+                line_start = offset
+                offset += len(line)
+                if not line.strip():
+                    continue
+                rec = _decode_line(line.decode("utf-8", "replace"), tree)
+                if rec is not None:
+                    yield line_start, rec
+    except FileNotFoundError:
+        return
+    except OSError:
+        logger.exception("read_jsonl_error", extra={"fields": {"path": str(filepath)}})
+
+
+def _read_indexed(
+    filepath: Path,
+    offsets: list[int],
+    covered: int,
+    fields: tuple[str, ...] | None = None,
+) -> Iterator[dict]:
+    """Yield the records at ``offsets`` and every record from ``covered`` on."""
+    for _offset, rec in _read_jsonl_at(filepath, fields, offsets, covered):
+        yield rec
+
+
+def _with_positions(
+    records: Iterator[tuple[int, dict]], date_str: str
+) -> Iterator[dict]:
+    """Yield records with their (date, byte offset) under _RECORD_POSITION."""
+    for offset, rec in records:
+        rec[_RECORD_POSITION] = (date_str, offset)
+        yield rec
+
+
+def _to_int(value: object) -> int | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return int(value)
+    return None
+
+
+def _to_float(value: object) -> float | None:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+class _HeartbeatPoint(NamedTuple):
+    ts: int | float
+    rx: int | None
+    tx: int | None
+    containerMemoryCurrentBytes: int | None
+    containerMemoryMaxBytes: int | None
+    transponderRssBytes: int | None
+    primaryAppRssBytes: int | None
+    transponderCpuUserSec: float | None
+    transponderCpuSystemSec: float | None
+    transponderUptimeSec: int | None
+
+
+def _merge_latest(target: dict, other: dict) -> None:
+    """Merge latest-per-key partials, keeping the earlier-scanned entry on ties."""
+    for key, info in other.items():
+        existing = target.get(key)
+        if existing is None or info["ts"] > existing["ts"]:
+            target[key] = info
+
+
+class _Aggregator:
+    """Base class for a query fed by a partition scan.
+
+    Subclasses declare which partition files they consume in ``sources`` and
+    the record fields they read in ``fields``, and fold records into their
+    state via ``feed``; ``result`` builds the response.
+    A ``None`` start/end means the query is not bounded by date. Records are
+    compared in epoch seconds against ``start_ts``/``end_ts``.
+
+    Mutable state is created in ``_init_state`` so ``spawn`` can produce an
+    empty copy with the same parameters, and ``merge`` folds another partial
+    into this one. Partials must be merged in partition scan order.
+    """
+
+    sources: tuple[str, ...] = ()
+    # Record fields read by ``feed`` (dotted paths); None decodes everything.
+    fields: tuple[str, ...] | None = None
+    # Event index terms ((dimension, value) pairs, see telemetry_index.py) a
+    # batch must carry for ``feed`` to keep anything from it; None reads all.
+    index_terms: tuple[tuple[str, str], ...] | None = None
+
+    def __init__(
+        self,
+        start: datetime | None,
+        end: datetime | None,
+        service_name: str | None,
+        environment: str | None,
+    ) -> None:
+        self.start = start
+        self.end = end
+        self.start_ts = start.timestamp() if start is not None else None
+        self.end_ts = end.timestamp() if end is not None else None
+        self.service_filter = _safe_name(service_name) if service_name else None
+        self.env_filter = _safe_name(environment) if environment else None
+
+    def wants_date(self, d: date) -> bool:
+        if self.start is None or self.end is None:
+            return True
+        return self.start.date() <= d <= self.end.date()
+
+    def wants_partition(self, svc_dir: str, env_dir: str) -> bool:
+        if self.service_filter and svc_dir != self.service_filter:
+            return False
+        if self.env_filter and env_dir != self.env_filter:
+            return False
+        return True
+
+    def _init_state(self) -> None:
+        raise NotImplementedError
+
+    def spawn(self) -> "_Aggregator":
+        """Return an empty partial with the same query parameters."""
+        clone = copy.copy(self)
+        clone._init_state()
+        return clone
+
+    # Whether fed records carry their (date, byte offset) under _RECORD_POSITION.
+    wants_positions = False
+
+    def feed(self, source: str, svc_name: str, env_name: str, rec: dict) -> None:
+        raise NotImplementedError
+
+    def merge(self, other: "_Aggregator") -> None:
+        raise NotImplementedError
+
+    def end_partition(self) -> None:
+        """Called once each partition has been fed; partials may compact here."""
+
+    def feed_summary(self, partition_dir: Path, svc_name: str, env_name: str) -> bool:
+        """Fold a persisted partition summary in instead of reading records.
+
+        Returns True if the partition was fully accounted for.
+        """
+        return False
+
+    def feed_rollup(self, rollup: dict, svc_name: str, env_name: str) -> None:
+        """Fold a downsampled partition in; its raw records no longer exist."""
+
+    def result(self) -> dict:
+        raise NotImplementedError
+
+
+class _FleetHealthAggregator(_Aggregator):
+    """Instance count and last-seen times per service/environment.
+
+    With ``approximate`` (the default for windows over FLEET_APPROX_MIN_DAYS)
+    instances are counted in a HyperLogLog sketch instead of a set, and
+    finished days strictly inside the window are read from the partition's
+    persisted summary (see _fleet_summary) rather than from its records.
+    Memory and time then stay flat as the window grows.
+    """
+
+    sources = (ANNOUNCE_FILE, HEARTBEAT_FILE)
+    fields = ("receivedAt", "payload.sentAt", "payload.identity.instanceId")
+
+    def __init__(
+        self, start, end, service_name=None, environment=None, max_rows=1000,
+        approximate=None,
+    ):
+        super().__init__(start, end, service_name, environment)
+        self.max_rows = max_rows
+        if approximate is None:
+            approximate = (
+                start is not None and end is not None
+                and end - start > timedelta(days=FLEET_APPROX_MIN_DAYS)
+            )
+        self.approximate = approximate
+        self._init_state()
+
+    def _init_state(self):
+        # Key: (serviceName, environment)
+        self.aggregates: dict[tuple[str, str], dict] = {}
+
+    def _slot(self, key: tuple[str, str]) -> dict:
+        return self.aggregates.setdefault(key, {
+            "instances": HyperLogLog() if self.approximate else set(),
+            "lastAnnouncedAt": None,
+            "lastHeartbeatAt": None,
+        })
+
+    def feed_summary(self, partition_dir, svc_name, env_name):
+        if not self.approximate or self.start is None or self.end is None:
+            return False
+        d = date.fromisoformat(partition_dir.parent.parent.name)
+        # Whole days only, and only days that can no longer receive data.
+        if not self.start.date() < d < min(self.end.date(), _utc_today()):
+            return False
+        summary = _fleet_summary(partition_dir)
+        if summary is None:
+            return False
+        for field in ("lastAnnouncedAt", "lastHeartbeatAt"):
+            ts = summary[field]
+            # The summary keeps the day's latest time; if that falls outside
+            # the window the in-window latest is unknown, so read the records.
+            if ts is not None and not self.start_ts <= ts <= self.end_ts:
+                return False
+        agg = self._slot((svc_name, env_name))
+        agg["instances"].merge(summary["instances"])
+        for field in ("lastAnnouncedAt", "lastHeartbeatAt"):
+            ts = summary[field]
+            if ts is not None and (agg[field] is None or ts > agg[field]):
+                agg[field] = ts
+        return True
+
+    def feed_rollup(self, rollup, svc_name, env_name):
+        for info in rollup["instances"]:
+            seen = [ts for ts in (info["lastAnnouncedAt"], info["lastHeartbeatAt"]) if ts is not None]
+            # An instance counts if its first-to-last span that day meets the window.
+            if self.start_ts is not None and (
+                info["first"] > self.end_ts or max(seen, default=info["first"]) < self.start_ts
+            ):
+                continue
+            agg = self._slot((svc_name, env_name))
+            agg["instances"].add(info["i"])
+            for field in ("lastAnnouncedAt", "lastHeartbeatAt"):
+                ts = info[field]
+                if ts is None or (
+                    self.start_ts is not None and not self.start_ts <= ts <= self.end_ts
+                ):
+                    continue
+                if agg[field] is None or ts > agg[field]:
+                    agg[field] = ts
+
+    def feed(self, source, svc_name, env_name, rec):
+        agg = self._slot((svc_name, env_name))
+        field = "lastAnnouncedAt" if source == ANNOUNCE_FILE else "lastHeartbeatAt"
+        payload = rec.get("payload", {})
+        identity = payload.get("identity", {})
+        inst_id = identity.get("instanceId")
+        if inst_id:
+            agg["instances"].add(inst_id)
+        sent_at = payload.get("sentAt") or rec.get("receivedAt")
+        if sent_at:
+            ts = _parse_epoch(sent_at)
+            if ts is not None and (
+                self.start_ts is None or self.start_ts <= ts <= self.end_ts
+            ):
+                if agg[field] is None or ts > agg[field]:
+                    agg[field] = ts
+
+    def merge(self, other):
+        for key, theirs in other.aggregates.items():
+            agg = self._slot(key)
+            if self.approximate:
+                agg["instances"].merge(theirs["instances"])
+            else:
+                agg["instances"] |= theirs["instances"]
+            for field in ("lastAnnouncedAt", "lastHeartbeatAt"):
+                ts = theirs[field]
+                if ts is not None and (agg[field] is None or ts > agg[field]):
+                    agg[field] = ts
+
+    def result(self):
+        now = time.time()
+        data = []
+        for (svc, env), agg in sorted(self.aggregates.items()):
+            last_hb = agg["lastHeartbeatAt"]
+            last_announced = agg["lastAnnouncedAt"] or last_hb
+            if last_hb is None:
+                status = "offline"
+            elif now - last_hb > 900:  # 15 min
+                status = "offline"
+            elif now - last_hb > 300:  # 5 min
+                status = "stale"
+            else:
+                status = "healthy"
+
+            data.append({
+                "serviceName": svc,
+                "environment": env,
+                "instanceCount": (
+                    agg["instances"].count() if self.approximate else len(agg["instances"])
+                ),
+                "lastAnnouncedAt": _format_epoch(last_announced) if last_announced else None,
+                "lastHeartbeatAt": _format_epoch(last_hb) if last_hb else None,
+                "status": status,
+            })
+
+        data = data[:self.max_rows]
+        return {
+            "data": data,
+            "meta": {
+                "totalRows": len(data),
+                "start": _format_ts(self.start),
+                "end": _format_ts(self.end),
+                "instanceCountApproximate": self.approximate,
+            },
+        }
+
+
+def _utc_today() -> date:
+    return date(*time.gmtime()[:3])
+
+
+def _fleet_summary_sizes(partition_dir: Path) -> dict[str, int] | None:
+    sizes = {}
+    for source in _FleetHealthAggregator.sources:
+        try:
+            sizes[source] = os.stat(partition_dir / source).st_size
+        except FileNotFoundError:
+            sizes[source] = 0
+        except OSError:
+            return None
+    return sizes
+
+
+def _fleet_summary(partition_dir: Path) -> dict | None:
+    """Return a partition's fleet summary, or None if missing or stale.
+
+    The summary holds a HyperLogLog of instance ids and the latest announce
+    and heartbeat times over the whole partition, plus the sizes of the files
+    it was built from; a size change means new data and makes it stale.
+    Queries only read summaries: compaction writes them (see
+    write_fleet_summary), so the read path never touches the tree.
+    """
+    sizes = _fleet_summary_sizes(partition_dir)
+    if sizes is None:
+        return None
+    path = partition_dir / FLEET_SUMMARY_FILE
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored["sources"] == sizes:
+            return {
+                "instances": HyperLogLog.from_json(stored["instances"]),
+                "lastAnnouncedAt": stored["lastAnnouncedAt"],
+                "lastHeartbeatAt": stored["lastHeartbeatAt"],
+            }
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, KeyError, TypeError):
+        logger.warning("fleet_summary_invalid", extra={"fields": {"path": str(path)}})
+    return None
+
+
+def write_fleet_summary(partition_dir: Path) -> None:
+    """Build a partition's fleet summary from its records and persist it.
+
+    Called by compaction, the only writer of sealed partitions, so summaries
+    are never written concurrently; the tmp file and os.replace still keep
+    a reader from seeing a half-written summary.
+    """
+    sizes = _fleet_summary_sizes(partition_dir)
+    if sizes is None:
+        return
+    builder = _FleetHealthAggregator(None, None, approximate=True)
+    for source in builder.sources:
+        for rec in _read_jsonl(partition_dir / source, builder.fields):
+            builder.feed(source, "", "", rec)
+    summary = builder._slot(("", ""))
+
+    path = partition_dir / FLEET_SUMMARY_FILE
+    tmp = path.with_name(f".{FLEET_SUMMARY_FILE}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "sources": sizes,
+            "instances": summary["instances"].to_json(),
+            "lastAnnouncedAt": summary["lastAnnouncedAt"],
+            "lastHeartbeatAt": summary["lastHeartbeatAt"],
+        }, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+def _load_rollup(partition_dir: Path) -> dict | None:
+    """Return a downsampled partition's rollup, or None for a raw partition."""
+    path = partition_dir / ROLLUP_FILE
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    except OSError:
+        logger.exception("rollup_read_error", extra={"fields": {"path": str(path)}})
+        return None
+    key = str(path)
+    cached = _ROLLUP_CACHE.get(key)
+    if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+        return cached[2]
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rollup = json.load(f)
+        if rollup.get("version") != ROLLUP_VERSION:
+            raise ValueError(f"unsupported rollup version {rollup.get('version')!r}")
+    except (OSError, ValueError, AttributeError):
+        logger.exception("rollup_read_error", extra={"fields": {"path": str(path)}})
+        return None
+    if len(_ROLLUP_CACHE) >= _ROLLUP_CACHE_MAX:
+        _ROLLUP_CACHE.clear()
+    _ROLLUP_CACHE[key] = (st.st_mtime_ns, st.st_size, rollup)
+    return rollup
+
+
+class _HeartbeatFreshnessAggregator(_Aggregator):
+    """Latest heartbeat per instance, paged by (service, environment, instanceId).
+
+    The cursor holds the last key returned. Partitions sorting before the
+    cursor's service/environment cannot contribute and are skipped, and
+    instances at or before it are dropped while feeding. With a cursor,
+    ``seek`` is set so TelemetryReader scans partitions in key order and stops
+    once the page is full.
+    """
+
+    sources = (HEARTBEAT_FILE,)
+    fields = (
+        "receivedAt",
+        "payload.sentAt",
+        "payload.identity.serviceName",
+        "payload.identity.environment",
+        "payload.identity.instanceId",
+        "payload.status.goDark",
+    )
+
+    def __init__(
+        self, start, end, staleness_threshold_sec=300, service_name=None,
+        environment=None, max_rows=1000, cursor=None,
+    ):
+        super().__init__(start, end, service_name, environment)
+        self.staleness_threshold_sec = staleness_threshold_sec
+        self.max_rows = max_rows
+        self.cursor = cursor
+        self.after, self.carried_total = _decode_cursor(cursor, ((str,),) * 3)
+        # Without a carried total the whole range is scanned to count it, and
+        # rows up to the cursor are dropped when the page is built.
+        self.seek = self.after is not None and self.carried_total is not None
+        self._init_state()
+
+    def _init_state(self):
+        # Key: (serviceName, environment, instanceId) -> latest heartbeat info
+        self.instances: dict[tuple[str, str, str], dict] = {}
+
+    def wants_partition(self, svc_dir, env_dir):
+        if self.seek and (svc_dir, env_dir) < self.after[:2]:
+            return False
+        return super().wants_partition(svc_dir, env_dir)
+
+    def page_full(self) -> bool:
+        return len(self.instances) > self.max_rows
+
+    def feed(self, source, svc_name, env_name, rec):
+        payload = rec.get("payload", {})
+        identity = payload.get("identity", {})
+        svc = identity.get("serviceName", svc_name)
+        env = identity.get("environment", env_name)
+        inst_id = identity.get("instanceId", "")
+        if not inst_id:
+            return
+        sent_at = payload.get("sentAt") or rec.get("receivedAt")
+        ts = _parse_epoch(sent_at) if sent_at else None
+        if ts is None or ts < self.start_ts or ts > self.end_ts:
+            return
+
+        go_dark = payload.get("status", {}).get("goDark")
+        key = (_safe_name(svc), _safe_name(env), inst_id)
+        if self.seek and key <= self.after:
+            return
+        existing = self.instances.get(key)
+        if existing is None or ts > existing["ts"]:
+            self.instances[key] = {"ts": ts, "goDark": go_dark}
+
+    def feed_rollup(self, rollup, svc_name, env_name):
+        for info in rollup["instances"]:
+            ts = info["lastHeartbeatAt"]
+            if ts is None or ts < self.start_ts or ts > self.end_ts:
+                continue
+            key = (svc_name, env_name, info["i"])
+            if self.seek and key <= self.after:
+                continue
+            existing = self.instances.get(key)
+            if existing is None or ts > existing["ts"]:
+                self.instances[key] = {"ts": ts, "goDark": info["goDark"]}
+
+    def merge(self, other):
+        _merge_latest(self.instances, other.instances)
+
+    def result(self):
+        threshold = self.staleness_threshold_sec
+        now = time.time()
+        keys = sorted(self.instances)
+        total = self.carried_total if self.seek else len(keys)
+        if self.after and not self.seek:
+            keys = keys[bisect.bisect_right(keys, self.after):]
+        page_keys = keys[: self.max_rows]
+        rows = []
+        for svc, env, inst_id in page_keys:
+            info = self.instances[(svc, env, inst_id)]
+            stale_sec = max(0.0, now - info["ts"])
+            if stale_sec <= threshold:
+                status = "fresh"
+            elif stale_sec <= threshold * 3:
+                status = "stale"
+            else:
+                status = "offline"
+
+            row: dict = {
+                "serviceName": svc,
+                "environment": env,
+                "instanceId": inst_id,
+                "lastHeartbeatAt": _format_epoch(info["ts"]),
+                "staleSec": round(stale_sec, 1),
+                "status": status,
+            }
+            if info["goDark"] is not None:
+                row["goDark"] = info["goDark"]
+            rows.append(row)
+
+        next_cursor = None
+        if len(keys) > self.max_rows:
+            next_cursor = _encode_cursor(list(page_keys[-1]), total)
+
+        return {
+            "data": rows,
+            "meta": {
+                "totalRows": total,
+                "start": _format_ts(self.start),
+                "end": _format_ts(self.end),
+                "cursor": next_cursor,
+            },
+        }
+
+
+class _EventThroughputAggregator(_Aggregator):
+    sources = (EVENTS_FILE,)
+    fields = ("payload.events[].ts",)
+
+    def __init__(
+        self, start, end, bucket_width_sec=60, service_name=None,
+        environment=None, max_rows=1000,
+    ):
+        super().__init__(start, end, service_name, environment)
+        self.bucket_width_sec = bucket_width_sec
+        self.max_rows = max_rows
+        self._init_state()
+
+    def _init_state(self):
+        # bucket index (from start) -> event count
+        self.buckets: dict[int, int] = {}
+        # With NumPy, seconds since start are buffered here and bucketed in bulk.
+        self.pending = array("d")
+        self.downsampled = False
+
+    def feed_rollup(self, rollup, svc_name, env_name):
+        # Per-minute counts: each minute lands in the bucket holding its start.
+        for minute, count in rollup["events"]:
+            if self.start_ts <= minute <= self.end_ts:
+                bucket_index = int((minute - self.start_ts) // self.bucket_width_sec)
+                self.buckets[bucket_index] = self.buckets.get(bucket_index, 0) + count
+                self.downsampled = True
+
+    def feed(self, source, svc_name, env_name, rec):
+        payload = rec.get("payload", {})
+        for event in payload.get("events", []):
+            ts_str = event.get("ts")
+            ts = _parse_epoch(ts_str) if ts_str else None
+            if ts is not None and self.start_ts <= ts <= self.end_ts:
+                seconds_since_start = ts - self.start_ts
+                if np is not None:
+                    self.pending.append(seconds_since_start)
+                    continue
+                # Floor to bucket boundary
+                bucket_index = int(seconds_since_start // self.bucket_width_sec)
+                self.buckets[bucket_index] = self.buckets.get(bucket_index, 0) + 1
+        if len(self.pending) >= _VECTOR_FLUSH_EVENTS:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Fold buffered offsets into bucket counts with one bincount."""
+        if not self.pending:
+            return
+        indices = (np.frombuffer(self.pending, dtype=np.float64) // self.bucket_width_sec)
+        counts = np.bincount(indices.astype(np.int64))
+        for bucket_index in np.flatnonzero(counts).tolist():
+            self.buckets[bucket_index] = self.buckets.get(bucket_index, 0) + int(counts[bucket_index])
+        self.pending = array("d")
+
+    def merge(self, other):
+        self.downsampled = self.downsampled or other.downsampled
+        self.pending.extend(other.pending)
+        for bucket_index, count in other.buckets.items():
+            self.buckets[bucket_index] = self.buckets.get(bucket_index, 0) + count
+        if len(self.pending) >= _VECTOR_FLUSH_EVENTS:
+            self._flush()
+
+    def result(self):
+        self._flush()
+        start, end = self.start, self.end
+        bucket_width_sec = self.bucket_width_sec
+        bucket_width = timedelta(seconds=bucket_width_sec)
+
+        # Generate all buckets in range (including empty ones)
+        all_buckets = []
+        current = start
+        bucket_index = 0
+        while current < end:
+            count = self.buckets.get(bucket_index, 0)
+            all_buckets.append({
+                "bucket": _format_ts(current),
+                "count": count,
+            })
+            current += bucket_width
+            bucket_index += 1
+
+        all_buckets = all_buckets[:self.max_rows]
+        return {
+            "data": all_buckets,
+            "meta": {
+                "totalRows": len(all_buckets),
+                "bucketWidthSec": bucket_width_sec,
+                "start": _format_ts(start),
+                "end": _format_ts(end),
+                "downsampled": self.downsampled,
+            },
+        }
+
+
+# Container-metrics ``stat`` values: "sum" returns the bucket aggregates, the
+# others the given quantile of per-heartbeat samples of _SKETCHED_FIELDS.
+CONTAINER_METRIC_STATS: dict[str, float | None] = {
+    "sum": None,
+    "p50": 0.5,
+    "p95": 0.95,
+    "p99": 0.99,
+    "max": 1.0,
+}
+_SKETCHED_FIELDS = (
+    "containerMemoryCurrentBytes",
+    "transponderRssBytes",
+    "primaryAppRssBytes",
+    "cpuPct",
+)
+
+
+# Summed container-metric group fields and their sample counters.
+_GROUP_SAMPLE_FIELDS = {
+    "networkRxBytes": "_rxSamples",
+    "networkTxBytes": "_txSamples",
+    "containerMemoryCurrentBytes": "_memorySamples",
+    "containerMemoryMaxBytes": "_maxSamples",
+    "transponderRssBytes": "_rssSamples",
+    "primaryAppRssBytes": "_appRssSamples",
+    "transponderUptimeSec": "_uptimeSamples",
+    "cpuPct": "_cpuSamples",
+}
+
+# A container metrics cell holds one container's bucket: the heartbeat count,
+# then each summed group field followed by its sample counter.
+_CELL_FIELDS = ("heartbeatCount",) + tuple(
+    name for pair in _GROUP_SAMPLE_FIELDS.items() for name in pair
+)
+_CELL_CPU = _CELL_FIELDS.index("cpuPct")
+# (_HeartbeatPoint attribute, cell index of its sum, clamp negatives to 0)
+_CELL_POINT_FIELDS = (
+    ("rx", _CELL_FIELDS.index("networkRxBytes"), True),
+    ("tx", _CELL_FIELDS.index("networkTxBytes"), True),
+    ("containerMemoryCurrentBytes", _CELL_FIELDS.index("containerMemoryCurrentBytes"), False),
+    ("containerMemoryMaxBytes", _CELL_FIELDS.index("containerMemoryMaxBytes"), False),
+    ("transponderRssBytes", _CELL_FIELDS.index("transponderRssBytes"), False),
+    ("primaryAppRssBytes", _CELL_FIELDS.index("primaryAppRssBytes"), False),
+    ("transponderUptimeSec", _CELL_FIELDS.index("transponderUptimeSec"), False),
+)
+
+
+def _new_cell() -> list:
+    cell = [0] * len(_CELL_FIELDS)
+    cell[_CELL_CPU] = 0.0
+    return cell
+
+
+def _cpu_pct(previous: _HeartbeatPoint, point: _HeartbeatPoint) -> float | None:
+    """CPU% between consecutive heartbeats of one container, if both report CPU."""
+    user_now = point.transponderCpuUserSec
+    user_prev = previous.transponderCpuUserSec
+    sys_now = point.transponderCpuSystemSec
+    sys_prev = previous.transponderCpuSystemSec
+    if user_now is None or user_prev is None or sys_now is None or sys_prev is None:
+        return None
+    cpu_delta = (user_now - user_prev) + (sys_now - sys_prev)
+    if cpu_delta < 0:
+        return None
+    dt_sec = max(1e-6, point.ts - previous.ts)
+    return (cpu_delta / dt_sec) * 100.0
+
+
+class _ContainerMetricsAggregator(_Aggregator):
+    """Bucketed heartbeat metrics per container, service or fleet.
+
+    Each partition's points are reduced to per-(container, bucket) cells of
+    sums and sample counts when the partition ends, so partials stay small
+    and merge by addition. CPU% needs each point's predecessor; a partial
+    keeps every container's first and last point so the sample spanning two
+    partials is added on merge.
+
+    With a quantile ``stat`` (or ``sketches=True``) each cell also gets a
+    DDSketch per field in _SKETCHED_FIELDS; service and fleet rows merge the
+    sketches of their containers. Sketches are persisted only in rollups
+    (see telemetry_rollup.py); raw partitions build them in the same pass
+    as the sums.
+    """
+
+    sources = (HEARTBEAT_FILE,)
+    fields = (
+        "receivedAt",
+        "payload.sentAt",
+        "payload.identity.serviceName",
+        "payload.identity.environment",
+        "payload.identity.instanceId",
+        "payload.status.containerRxBytesSinceLastHeartbeat",
+        "payload.status.containerTxBytesSinceLastHeartbeat",
+        "payload.status.containerMemoryCurrentBytes",
+        "payload.status.containerMemoryMaxBytes",
+        "payload.status.transponderRssBytes",
+        "payload.status.primaryAppRssBytes",
+        "payload.status.transponderCpuUserSec",
+        "payload.status.transponderCpuSystemSec",
+        "payload.status.transponderUptimeSec",
+    )
+
+    def __init__(
+        self, start, end, bucket_width_sec=30, service_name=None, environment=None,
+        instance_id=None, rollup="container", max_rows=10000, stat="sum", sketches=None,
+    ):
+        super().__init__(start, end, service_name, environment)
+        self.bucket_width_sec = bucket_width_sec
+        self.instance_id = instance_id
+        self.rollup = rollup
+        self.max_rows = max_rows
+        self.stat = stat
+        self.quantile = CONTAINER_METRIC_STATS[stat]
+        self.keep_sketches = self.quantile is not None if sketches is None else sketches
+        self._init_state()
+
+    def _init_state(self):
+        # container key -> points of the partition being fed.
+        self.pending: dict[tuple[str, str, str], list[_HeartbeatPoint]] = {}
+        # (svc, env, inst, bucket index) -> sums and counts, see _CELL_FIELDS.
+        self.cells: dict[tuple[str, str, str, int], list] = {}
+        # Same keys -> {field: DDSketch}, filled when keep_sketches is set.
+        self.cell_sketches: dict[tuple[str, str, str, int], dict[str, DDSketch]] = {}
+        # container key -> its earliest and latest point fed so far.
+        self.first_points: dict[tuple[str, str, str], _HeartbeatPoint] = {}
+        self.last_points: dict[tuple[str, str, str], _HeartbeatPoint] = {}
+        # (svc, env, inst, hour) aggregates from downsampled partitions.
+        self.rollup_groups: list[tuple[str, str, str, int, dict]] = []
+
+    def feed_rollup(self, rollup, svc_name, env_name):
+        for group in rollup["heartbeats"]:
+            if self.instance_id and group["i"] != self.instance_id:
+                continue
+            if self.start_ts <= group["h"] <= self.end_ts:
+                self.rollup_groups.append((svc_name, env_name, group["i"], group["h"], group))
+
+    def feed(self, source, svc_name, env_name, rec):
+        payload = rec.get("payload", {})
+        identity = payload.get("identity", {})
+        svc = _safe_name(identity.get("serviceName", svc_name))
+        env = _safe_name(identity.get("environment", env_name))
+        inst_id = str(identity.get("instanceId", "")).strip()
+        if not inst_id:
+            return
+        if self.instance_id and inst_id != self.instance_id:
+            return
+
+        sent_at = payload.get("sentAt") or rec.get("receivedAt")
+        ts = _parse_epoch(sent_at) if sent_at else None
+        if ts is None or ts < self.start_ts or ts > self.end_ts:
+            return
+
+        status = payload.get("status", {})
+        self.pending.setdefault((svc, env, inst_id), []).append(_HeartbeatPoint(
+            ts=ts,
+            rx=_to_int(status.get("containerRxBytesSinceLastHeartbeat")),
+            tx=_to_int(status.get("containerTxBytesSinceLastHeartbeat")),
+            containerMemoryCurrentBytes=_to_int(status.get("containerMemoryCurrentBytes")),
+            containerMemoryMaxBytes=_to_int(status.get("containerMemoryMaxBytes")),
+            transponderRssBytes=_to_int(status.get("transponderRssBytes")),
+            primaryAppRssBytes=_to_int(status.get("primaryAppRssBytes")),
+            transponderCpuUserSec=_to_float(status.get("transponderCpuUserSec")),
+            transponderCpuSystemSec=_to_float(status.get("transponderCpuSystemSec")),
+            transponderUptimeSec=_to_int(status.get("transponderUptimeSec")),
+        ))
+
+    def end_partition(self):
+        """Reduce the pending points to cells and merge them in."""
+        if not self.pending:
+            return
+        partial = self.spawn()
+        for container, points in self.pending.items():
+            points.sort(key=lambda p: p.ts)
+            partial.first_points[container] = points[0]
+            partial.last_points[container] = points[-1]
+        if np is not None:
+            partial.cells = self._reduce_vectorized(self.pending)
+        else:
+            partial.cells = self._reduce(self.pending)
+        if self.keep_sketches:
+            partial.cell_sketches = self._reduce_sketches(self.pending)
+        self.pending = {}
+        self.merge(partial)
+
+    def merge(self, other):
+        other.end_partition()
+        for key, cell in other.cells.items():
+            mine = self.cells.get(key)
+            if mine is None:
+                self.cells[key] = cell
+                continue
+            for index, value in enumerate(cell):
+                mine[index] += value
+        for key, sketches in other.cell_sketches.items():
+            mine = self.cell_sketches.setdefault(key, {})
+            for field, sketch in sketches.items():
+                if field in mine:
+                    mine[field].merge(sketch)
+                else:
+                    mine[field] = sketch
+        for container, point in other.first_points.items():
+            previous = self.last_points.get(container)
+            if previous is None:
+                self.first_points[container] = point
+            elif point.ts >= previous.ts:
+                self._add_cpu(container, previous, point)
+            # Otherwise the partials overlap in time (heartbeats filed out of
+            # order across dates) and the spanning CPU sample is skipped.
+        for container, point in other.last_points.items():
+            latest = self.last_points.get(container)
+            if latest is None or point.ts > latest.ts:
+                self.last_points[container] = point
+        self.rollup_groups.extend(other.rollup_groups)
+
+    def _add_cpu(self, container: tuple, previous: _HeartbeatPoint, point: _HeartbeatPoint):
+        """Add the CPU% sample of a partial's first point to its cell."""
+        cpu = _cpu_pct(previous, point)
+        if cpu is None:
+            return
+        key = (*container, int((point.ts - self.start_ts) // self.bucket_width_sec))
+        cell = self.cells[key]
+        cell[_CELL_CPU] += cpu
+        cell[_CELL_CPU + 1] += 1
+        if self.keep_sketches:
+            sketches = self.cell_sketches.setdefault(key, {})
+            if "cpuPct" not in sketches:
+                sketches["cpuPct"] = DDSketch()
+            sketches["cpuPct"].add(cpu)
+
+    def _new_group(self, svc: str, env: str, bucket_start: datetime, inst: str) -> dict:
+        fleet = self.rollup == "fleet"
+        return {
+            "serviceName": svc if not fleet else "all-services",
+            "environment": env if not fleet else "all-envs",
+            "bucket": bucket_start,
+            "instanceId": inst if self.rollup == "container" else None,
+            "containerCount": 0,
+            "networkRxBytes": 0,
+            "networkTxBytes": 0,
+            "heartbeatCount": 0,
+            "containerMemoryCurrentBytes": 0,
+            "containerMemoryMaxBytes": 0,
+            "transponderRssBytes": 0,
+            "primaryAppRssBytes": 0,
+            "transponderUptimeSec": 0,
+            "cpuPct": 0.0,
+            "_rxSamples": 0,
+            "_txSamples": 0,
+            "_cpuSamples": 0,
+            "_memorySamples": 0,
+            "_maxSamples": 0,
+            "_rssSamples": 0,
+            "_appRssSamples": 0,
+            "_uptimeSamples": 0,
+        }
+
+    def _reduce(self, points_by_container: dict) -> dict[tuple, list]:
+        """Sum per-container points, sorted by ts, into cells (pure Python)."""
+        start_ts, width = self.start_ts, self.bucket_width_sec
+        cells: dict[tuple, list] = {}
+        for container, points in points_by_container.items():
+            previous: _HeartbeatPoint | None = None
+            for point in points:
+                key = (*container, int((point.ts - start_ts) // width))
+                cell = cells.get(key)
+                if cell is None:
+                    cell = cells[key] = _new_cell()
+                cell[0] += 1
+                for attr, index, clamp in _CELL_POINT_FIELDS:
+                    value = getattr(point, attr)
+                    if value is not None:
+                        cell[index] += max(0, value) if clamp else value
+                        cell[index + 1] += 1
+                if previous is not None:
+                    cpu = _cpu_pct(previous, point)
+                    if cpu is not None:
+                        cell[_CELL_CPU] += cpu
+                        cell[_CELL_CPU + 1] += 1
+                previous = point
+        return cells
+
+    def _reduce_vectorized(self, points_by_container: dict) -> dict[tuple, list]:
+        """NumPy equivalent of ``_reduce``.
+
+        Points are laid out as columns in (container, ts) order, bucket
+        indices come from integer division of seconds since start, and cell
+        sums use ``np.add.at`` in that same order so float sums match the
+        pure-Python path exactly.
+        """
+        containers = list(points_by_container)
+        owner: list[int] = []
+        points: list[_HeartbeatPoint] = []
+        for c, key in enumerate(containers):
+            series = points_by_container[key]
+            owner.extend([c] * len(series))
+            points.extend(series)
+
+        owner_arr = np.asarray(owner, dtype=np.int64)
+        offsets = np.fromiter(
+            (p.ts for p in points), dtype=np.float64, count=len(points),
+        ) - self.start_ts
+        buckets = (offsets // self.bucket_width_sec).astype(np.int64)
+        group_keys, group_ids = np.unique(
+            np.stack([owner_arr, buckets], axis=1), axis=0, return_inverse=True,
+        )
+        group_ids = group_ids.reshape(-1)
+        n_groups = len(group_keys)
+
+        columns = []
+        for attr, index, clamp in _CELL_POINT_FIELDS:
+            values = [getattr(p, attr) for p in points]
+            mask = np.fromiter((v is not None for v in values), dtype=bool, count=len(values))
+            column = np.fromiter(
+                (v if v is not None else 0 for v in values), dtype=np.int64, count=len(values),
+            )
+            if clamp:
+                column = np.maximum(column, 0)
+            sums = np.zeros(n_groups, dtype=np.int64)
+            np.add.at(sums, group_ids, column)
+            samples = np.bincount(group_ids[mask], minlength=n_groups)
+            columns.append((index, sums.tolist(), samples.tolist()))
+
+        def float_column(attr: str):
+            return np.fromiter(
+                (v if (v := getattr(p, attr)) is not None else np.nan for p in points),
+                dtype=np.float64, count=len(points),
+            )
+
+        # CPU% from each point's predecessor within the same container.
+        user = float_column("transponderCpuUserSec")
+        system = float_column("transponderCpuSystemSec")
+        has_prev = np.zeros(len(points), dtype=bool)
+        has_prev[1:] = owner_arr[1:] == owner_arr[:-1]
+        dt_sec = np.ones(len(points))
+        dt_sec[1:] = np.maximum(1e-6, offsets[1:] - offsets[:-1])
+        cpu_delta = np.full(len(points), np.nan)
+        cpu_delta[1:] = (user[1:] - user[:-1]) + (system[1:] - system[:-1])
+        with np.errstate(invalid="ignore"):
+            valid = has_prev & (cpu_delta >= 0)
+        cpu_sums = np.zeros(n_groups)
+        np.add.at(cpu_sums, group_ids[valid], (cpu_delta[valid] / dt_sec[valid]) * 100.0)
+        cpu_samples = np.bincount(group_ids[valid], minlength=n_groups)
+        heartbeats = np.bincount(group_ids, minlength=n_groups)
+
+        cells: dict[tuple, list] = {}
+        for g, (c, bucket_index) in enumerate(group_keys.tolist()):
+            cell = _new_cell()
+            cell[0] = int(heartbeats[g])
+            for index, sums, samples in columns:
+                cell[index] = sums[g]
+                cell[index + 1] = samples[g]
+            cell[_CELL_CPU] = float(cpu_sums[g])
+            cell[_CELL_CPU + 1] = int(cpu_samples[g])
+            cells[(*containers[c], bucket_index)] = cell
+        return cells
+
+    def _reduce_sketches(self, points_by_container: dict) -> dict[tuple, dict[str, DDSketch]]:
+        """Per-cell DDSketches of _SKETCHED_FIELDS for sorted per-container points."""
+        start_ts, width = self.start_ts, self.bucket_width_sec
+        cell_sketches: dict[tuple, dict[str, DDSketch]] = {}
+        for container, points in points_by_container.items():
+            previous: _HeartbeatPoint | None = None
+            for point in points:
+                key = (*container, int((point.ts - start_ts) // width))
+                sketches = cell_sketches.setdefault(key, {})
+                samples = [(field, getattr(point, field)) for field in _SKETCHED_FIELDS[:3]]
+                if previous is not None:
+                    samples.append(("cpuPct", _cpu_pct(previous, point)))
+                for field, value in samples:
+                    if value is not None and value >= 0:
+                        if field not in sketches:
+                            sketches[field] = DDSketch()
+                        sketches[field].add(value)
+                previous = point
+        return cell_sketches
+
+    def _by_bucket(self) -> list[tuple[int, list[tuple], list[tuple]]]:
+        """(bucket index, cell keys, downsampled hours) per bucket, in bucket order.
+
+        Downsampled hours fall in the bucket holding each hour's start.
+        """
+        self.end_partition()
+        width = self.bucket_width_sec
+        buckets: dict[int, tuple[list, list]] = {}
+        for key in self.cells:
+            buckets.setdefault(key[3], ([], []))[0].append(key)
+        for entry in self.rollup_groups:
+            bucket_index = int((entry[3] - self.start_ts) // width)
+            buckets.setdefault(bucket_index, ([], []))[1].append(entry)
+        return [(index, keys, hours) for index, (keys, hours) in sorted(buckets.items())]
+
+    def _bucket_groups(
+        self, bucket_index: int, cell_keys: list[tuple], hours: list[tuple], release: bool = False,
+    ) -> list[dict]:
+        """Roll one bucket's cells and downsampled hours up into row accumulators.
+
+        With ``release`` the bucket's cells are dropped as they are used.
+        """
+        bucket_start = self.start + timedelta(seconds=bucket_index * self.bucket_width_sec)
+        aggregates: dict[tuple, dict] = {}
+        members: dict[tuple, set[tuple[str, str, str]]] = {}
+        for cell_key in cell_keys:
+            svc, env, inst, _bucket = cell_key
+            cell = self.cells.pop(cell_key) if release else self.cells[cell_key]
+            key = self._group_key(svc, env, inst, bucket_start)
+            agg = aggregates.get(key)
+            if agg is None:
+                agg = aggregates[key] = self._new_group(svc, env, bucket_start, inst)
+            for name, value in zip(_CELL_FIELDS, cell):
+                agg[name] += value
+            members.setdefault(key, set()).add((svc, env, inst))
+
+        for svc, env, inst, _hour, group in hours:
+            key = self._group_key(svc, env, inst, bucket_start)
+            agg = aggregates.get(key)
+            if agg is None:
+                agg = aggregates[key] = self._new_group(svc, env, bucket_start, inst)
+            agg["heartbeatCount"] += group["n"]
+            for field, (total, samples) in group["sums"].items():
+                agg[field] += total
+                agg[_GROUP_SAMPLE_FIELDS[field]] += samples
+            members.setdefault(key, set()).add((svc, env, inst))
+
+        for key, agg in aggregates.items():
+            agg["containerCount"] = len(members[key])
+        return list(aggregates.values())
+
+    def _bucket_sketches(
+        self, bucket_index: int, cell_keys: list[tuple], hours: list[tuple], release: bool = False,
+    ) -> dict[tuple, dict[str, DDSketch]]:
+        """One bucket's DDSketches of _SKETCHED_FIELDS per row, keyed like _group_key.
+
+        Cell sketches are merged into their service or fleet row, so rollups
+        see every container's samples.
+        """
+        bucket_start = self.start + timedelta(seconds=bucket_index * self.bucket_width_sec)
+        rows: dict[tuple, dict[str, DDSketch]] = {}
+        for cell_key in cell_keys:
+            svc, env, inst, _bucket = cell_key
+            if release:
+                sketches = self.cell_sketches.pop(cell_key, {})
+            else:
+                sketches = self.cell_sketches.get(cell_key, {})
+            merged = rows.setdefault(self._group_key(svc, env, inst, bucket_start), {})
+            for field, sketch in sketches.items():
+                if field not in merged:
+                    merged[field] = DDSketch(sketch.relative_accuracy)
+                merged[field].merge(sketch)
+
+        for svc, env, inst, _hour, group in hours:
+            merged = rows.setdefault(self._group_key(svc, env, inst, bucket_start), {})
+            for field, data in group["sketches"].items():
+                sketch = DDSketch.from_json(data)
+                if field in merged:
+                    merged[field].merge(sketch)
+                else:
+                    merged[field] = sketch
+        return rows
+
+    def _groups(self) -> list[dict]:
+        """Row accumulators for every bucket, in bucket order."""
+        return [
+            agg
+            for bucket_index, keys, hours in self._by_bucket()
+            for agg in self._bucket_groups(bucket_index, keys, hours)
+        ]
+
+    def _group_key(self, svc: str, env: str, inst: str, bucket_start: datetime) -> tuple:
+        """Row identity, matching the fields _new_group fills in."""
+        if self.rollup == "fleet":
+            return (bucket_start, "all-services", "all-envs", None)
+        return (bucket_start, svc, env, inst if self.rollup == "container" else None)
+
+    def _sketches(self) -> dict[tuple, dict[str, DDSketch]]:
+        """Per-row DDSketches of _SKETCHED_FIELDS for every bucket."""
+        rows: dict[tuple, dict[str, DDSketch]] = {}
+        for bucket_index, keys, hours in self._by_bucket():
+            rows.update(self._bucket_sketches(bucket_index, keys, hours))
+        return rows
+
+    def stream(self) -> tuple[dict, Iterator[dict]]:
+        """Return response meta and a lazy iterator over the response rows.
+
+        Rows are produced one bucket at a time, in bucket order. Each bucket's
+        cells are rolled up when the iterator reaches it and released once
+        its rows are built, so only one bucket's rows exist at a time.
+        """
+        buckets = self._by_bucket()
+        total = 0
+        for _bucket_index, keys, hours in buckets:
+            if total >= self.max_rows:
+                break
+            total += len(
+                {self._group_key(svc, env, inst, None) for svc, env, inst, _bucket in keys}
+                | {self._group_key(svc, env, inst, None) for svc, env, inst, _hour, _group in hours}
+            )
+        meta = {
+            "totalRows": min(total, self.max_rows),
+            "bucketWidthSec": self.bucket_width_sec,
+            "rollup": self.rollup,
+            "stat": self.stat,
+            "start": _format_ts(self.start),
+            "end": _format_ts(self.end),
+            "downsampled": bool(self.rollup_groups),
+        }
+        return meta, self._stream_rows(buckets)
+
+    def _stream_rows(self, buckets: list[tuple[int, list[tuple], list[tuple]]]) -> Iterator[dict]:
+        remaining = self.max_rows
+        for bucket_index, keys, hours in buckets:
+            if remaining <= 0:
+                return
+            groups = self._bucket_groups(bucket_index, keys, hours, release=True)
+            groups.sort(key=lambda r: (r["serviceName"], r["environment"], r["instanceId"] or ""))
+            del groups[remaining:]
+            remaining -= len(groups)
+            if self.quantile is None:
+                for agg in groups:
+                    yield self._row(agg)
+                continue
+            sketches = self._bucket_sketches(bucket_index, keys, hours, release=True)
+            for agg in groups:
+                yield self._quantile_row(agg, sketches.get(
+                    (agg["bucket"], agg["serviceName"], agg["environment"], agg["instanceId"]), {},
+                ))
+
+    def _quantile_row(self, agg: dict, sketches: dict[str, DDSketch]) -> dict:
+        row = self._row(agg)
+        for field in _SKETCHED_FIELDS:
+            sketch = sketches.get(field)
+            value = sketch.quantile(self.quantile) if sketch is not None else None
+            if value is None:
+                row[field] = None
+            elif field == "cpuPct":
+                row[field] = round(value, 3)
+            else:
+                row[field] = round(value)
+        return row
+
+    def _row(self, agg: dict) -> dict:
+        row = {
+            "bucket": _format_ts(agg["bucket"]),
+            "serviceName": agg["serviceName"],
+            "environment": agg["environment"],
+            "networkRxBytes": agg["networkRxBytes"] if agg["_rxSamples"] > 0 else None,
+            "networkTxBytes": agg["networkTxBytes"] if agg["_txSamples"] > 0 else None,
+            "heartbeatCount": agg["heartbeatCount"],
+            "transponderUptimeSec": (
+                round(agg["transponderUptimeSec"] / agg["_uptimeSamples"], 1)
+                if agg["_uptimeSamples"] > 0
+                else None
+            ),
+            "containerMemoryCurrentBytes": (
+                agg["containerMemoryCurrentBytes"] if agg["_memorySamples"] > 0 else None
+            ),
+            "containerMemoryMaxBytes": (
+                agg["containerMemoryMaxBytes"] if agg["_maxSamples"] > 0 else None
+            ),
+            "transponderRssBytes": (
+                agg["transponderRssBytes"] if agg["_rssSamples"] > 0 else None
+            ),
+            "primaryAppRssBytes": (
+                agg["primaryAppRssBytes"] if agg["_appRssSamples"] > 0 else None
+            ),
+            "cpuPct": round(agg["cpuPct"] / agg["_cpuSamples"], 3) if agg["_cpuSamples"] > 0 else None,
+        }
+        if self.rollup == "container":
+            row["instanceId"] = agg["instanceId"]
+        else:
+            row["containerCount"] = agg["containerCount"]
+        return row
+
+    def result(self):
+        meta, rows = self.stream()
+        return {"data": list(rows), "meta": meta}
+
+
+class _GoDarkStatusAggregator(_Aggregator):
+    sources = (HEARTBEAT_FILE,)
+    fields = (
+        "receivedAt",
+        "payload.sentAt",
+        "payload.identity.serviceName",
+        "payload.identity.environment",
+        "payload.identity.instanceId",
+        "payload.status.goDark",
+    )
+
+    def __init__(self, service_name=None, environment=None, max_rows=1000):
+        # Scan all date directories (no time range filter for go-dark status)
+        super().__init__(None, None, service_name, environment)
+        self.max_rows = max_rows
+        self._init_state()
+
+    def _init_state(self):
+        self.instances: dict[tuple[str, str, str], dict] = {}
+
+    def feed(self, source, svc_name, env_name, rec):
+        payload = rec.get("payload", {})
+        identity = payload.get("identity", {})
+        svc = identity.get("serviceName", svc_name)
+        env = identity.get("environment", env_name)
+        inst_id = identity.get("instanceId", "")
+        if not inst_id:
+            return
+        sent_at = payload.get("sentAt") or rec.get("receivedAt")
+        ts = _parse_epoch(sent_at) if sent_at else None
+        if ts is None:
+            return
+
+        go_dark = payload.get("status", {}).get("goDark", False)
+        key = (_safe_name(svc), _safe_name(env), inst_id)
+        existing = self.instances.get(key)
+        if existing is None or ts > existing["ts"]:
+            self.instances[key] = {
+                "ts": ts,
+                "goDark": bool(go_dark),
+                "lastHeartbeatAt": ts,
+            }
+
+    def feed_rollup(self, rollup, svc_name, env_name):
+        for info in rollup["instances"]:
+            ts = info["lastHeartbeatAt"]
+            if ts is None:
+                continue
+            key = (svc_name, env_name, info["i"])
+            existing = self.instances.get(key)
+            if existing is None or ts > existing["ts"]:
+                self.instances[key] = {
+                    "ts": ts,
+                    "goDark": bool(info["goDark"]),
+                    "lastHeartbeatAt": ts,
+                }
+
+    def merge(self, other):
+        _merge_latest(self.instances, other.instances)
+
+    def result(self):
+        data = []
+        for (svc, env, inst_id), info in sorted(self.instances.items()):
+            data.append({
+                "serviceName": svc,
+                "environment": env,
+                "instanceId": inst_id,
+                "goDark": info["goDark"],
+                "lastHeartbeatAt": _format_epoch(info["lastHeartbeatAt"]),
+                "reportedAt": _format_epoch(info["ts"]),
+            })
+
+        data = data[:self.max_rows]
+        return {
+            "data": data,
+            "meta": {
+                "totalRows": len(data),
+            },
+        }
+
+
+class _RecentEventsAggregator(_Aggregator):
+    """Page of events, newest first.
+
+    Rows are ordered by the keyset key (ts, service, environment, date, byte
+    offset, event index), descending; the record's position in its partition
+    file keeps keys unique even for a batch stored twice. The cursor holds the
+    last key returned and only rows after it are kept, in a min-heap bounded
+    to one page plus one row. ``floor`` is the ts a new row must beat once the heap is full,
+    which lets the newest-first scan stop early.
+
+    ``newest_first`` selects that scan: without includeTotal, or when the
+    cursor carries the first page's total. Otherwise every match is counted
+    for an exact total.
+
+    ``tags`` are (key, value) pairs every returned event must carry. With any
+    of severity, type or tags set, only batches the event index lists for
+    all of them are read.
+    """
+
+    sources = (EVENTS_FILE,)
+    wants_positions = True
+    # Event payloads are never returned, so they are never materialized.
+    fields = (
+        "receivedAt",
+        "payload.batchId",
+        "payload.transponderSessionId",
+        "payload.events[].ts",
+        "payload.events[].type",
+        "payload.events[].severity",
+        "payload.events[].tags",
+    )
+
+    def __init__(
+        self, start, end, service_name=None, environment=None, max_rows=100,
+        cursor=None, severity=None, event_type=None, include_total=True, tags=None,
+    ):
+        super().__init__(start, end, service_name, environment)
+        self.max_rows = max_rows
+        self.cursor = cursor
+        self.severity = severity
+        self.event_type = event_type
+        self.include_total = include_total
+        self.tags = tuple(sorted((str(k), str(v)) for k, v in dict(tags or ()).items()))
+        terms = [("tag", f"{k}={v}") for k, v in self.tags]
+        if event_type:
+            terms.append(("type", event_type))
+        if severity:
+            terms.append(("severity", severity))
+        self.index_terms = tuple(terms) or None
+        # Key: (ts, service, environment, date, byte offset, event index)
+        self.after, self.carried_total = _decode_cursor(
+            cursor, (_NUMBER, (str,), (str,), (str,), (int,), (int,))
+        )
+        self.newest_first = not include_total or self.carried_total is not None
+        self._init_state()
+
+    def _init_state(self):
+        self.top: list[tuple[tuple, int, dict]] = []
+        # Heap tie-breaker; a plain int so the state pickles to scan workers.
+        self._seq = 0
+        self.matched = 0
+        self.complete = True
+
+    def floor(self) -> int | float | None:
+        """Lowest kept ts once the heap is full, else None."""
+        return self.top[0][0][0] if len(self.top) > self.max_rows else None
+
+    def _keep(self, key: tuple, row: dict) -> None:
+        self._seq += 1
+        item = (key, self._seq, row)
+        if len(self.top) <= self.max_rows:
+            heapq.heappush(self.top, item)
+        elif key > self.top[0][0]:
+            heapq.heapreplace(self.top, item)
+
+    def _rows(self, svc_name, env_name, rec) -> Iterator[tuple[int, int | float, dict]]:
+        """Yield (event index, ts, row) for matching events in one record."""
+        payload = rec.get("payload", {})
+        batch_id = payload.get("batchId")
+        session_id = payload.get("transponderSessionId")
+        events = payload.get("events", [])
+
+        # Extract service context from first event tags
+        first_tags = events[0].get("tags", {}) if events else {}
+        rec_svc = first_tags.get("serviceName", svc_name)
+        rec_env = first_tags.get("environment", env_name)
+
+        for idx, event in enumerate(events):
+            ts_str = event.get("ts")
+            ts = _parse_epoch(ts_str) if ts_str else None
+            if ts is None or ts < self.start_ts or ts > self.end_ts:
+                continue
+
+            evt_severity = event.get("severity", "info")
+            evt_type = event.get("type", "")
+
+            if self.severity and evt_severity != self.severity:
+                continue
+            if self.event_type and evt_type != self.event_type:
+                continue
+            tags = event.get("tags")
+            if self.tags and not (
+                isinstance(tags, dict)
+                and all(k in tags and str(tags[k]) == v for k, v in self.tags)
+            ):
+                continue
+
+            row: dict = {
+                "ts": ts_str,
+                "type": evt_type,
+                "severity": evt_severity,
+                "serviceName": rec_svc,
+                "environment": rec_env,
+            }
+            if tags:
+                row["tags"] = {str(k): str(v) for k, v in tags.items()}
+            if batch_id:
+                row["batchId"] = batch_id
+            if session_id:
+                row["transponderSessionId"] = session_id
+            yield idx, ts, row
+
+    def feed(self, source, svc_name, env_name, rec):
+        date_str, offset = rec[_RECORD_POSITION]
+        for idx, ts, row in self._rows(svc_name, env_name, rec):
+            self.matched += 1
+            key = (ts, svc_name, env_name, date_str, offset, idx)
+            if self.after and key >= self.after:
+                continue
+            self._keep(key, row)
+
+    def merge(self, other):
+        self.matched += other.matched
+        for key, _seq, row in other.top:
+            self._keep(key, row)
+
+    def stream(self) -> tuple[dict, Iterator[dict]]:
+        """Return response meta and a lazy iterator over the response rows."""
+        ranked = sorted(self.top, reverse=True)
+        page = ranked[: self.max_rows]
+
+        if not self.include_total:
+            total = self.matched
+        elif self.carried_total is not None:
+            total = self.carried_total
+        else:
+            total = self.matched
+        next_cursor = None
+        if len(ranked) > self.max_rows:
+            next_cursor = _encode_cursor(
+                list(page[-1][0]), total if self.include_total else None
+            )
+
+        meta: dict = {"totalRows": total}
+        if not self.include_total:
+            # Without a full scan the total is a lower bound: matches seen so far.
+            meta["totalRowsExact"] = self.complete
+        meta.update({
+            "start": _format_ts(self.start),
+            "end": _format_ts(self.end),
+            "cursor": next_cursor,
+        })
+        return meta, (row for _, _, row in page)
+
+    def result(self):
+        meta, rows = self.stream()
+        return {"data": list(rows), "meta": meta}
+
+
+# Batch fields read for a trace lookup; payloads stay on disk.
+_TRACE_FIELDS = (
+    "receivedAt",
+    "payload.batchId",
+    "payload.transponderSessionId",
+    "payload.events[].ts",
+    "payload.events[].type",
+    "payload.events[].severity",
+    "payload.events[].traceId",
+    "payload.events[].spanId",
+    "payload.events[].tags",
+)
+
+
+def _trace_rows(
+    rec: dict, trace_id: str, svc_name: str, env_name: str,
+) -> Iterator[tuple[tuple, dict]]:
+    """Yield (sort key, row) for the events of one trace in a batch record."""
+    received = rec.get("receivedAt") or ""
+    payload = rec.get("payload", {})
+    batch_id = payload.get("batchId")
+    session_id = payload.get("transponderSessionId")
+    events = payload.get("events", [])
+
+    first_tags = events[0].get("tags", {}) if events else {}
+    rec_svc = first_tags.get("serviceName", svc_name)
+    rec_env = first_tags.get("environment", env_name)
+
+    for idx, event in enumerate(events):
+        if event.get("traceId") != trace_id:
+            continue
+        ts_str = event.get("ts")
+        ts = _parse_epoch(ts_str) if ts_str else None
+        row: dict = {
+            "ts": ts_str,
+            "type": event.get("type", ""),
+            "severity": event.get("severity", "info"),
+            "serviceName": rec_svc,
+            "environment": rec_env,
+            "traceId": trace_id,
+        }
+        if event.get("spanId"):
+            row["spanId"] = event["spanId"]
+        tags = event.get("tags")
+        if tags:
+            row["tags"] = {str(k): str(v) for k, v in tags.items()}
+        if batch_id:
+            row["batchId"] = batch_id
+        if session_id:
+            row["transponderSessionId"] = session_id
+        key = (
+            ts if ts is not None else float("inf"),
+            svc_name, env_name, received, batch_id or "", idx,
+        )
+        yield key, row
+
+
+# Query names accepted by TelemetryReader.query_batch.
+_AGGREGATORS: dict[str, type[_Aggregator]] = {
+    "fleet_health": _FleetHealthAggregator,
+    "heartbeat_freshness": _HeartbeatFreshnessAggregator,
+    "event_throughput": _EventThroughputAggregator,
+    "container_metrics": _ContainerMetricsAggregator,
+    "go_dark_status": _GoDarkStatusAggregator,
+    "recent_events": _RecentEventsAggregator,
+}
+
+
+def _union_fields(aggregators: list[_Aggregator]) -> tuple[str, ...] | None:
+    """Projection covering every aggregator; None if any needs whole records."""
+    fields: set[str] = set()
+    for agg in aggregators:
+        if agg.fields is None:
+            return None
+        fields.update(agg.fields)
+    return tuple(sorted(fields))
+
+
+def _feed_partition(
+    read: Callable[[Path, tuple[str, ...] | None], Iterator[dict]],
+    partition_dir: Path,
+    svc_name: str,
+    env_name: str,
+    aggregators: list[_Aggregator],
+) -> list[_Aggregator]:
+    """Read each source file of one partition once, feeding every consumer.
+
+    Aggregators that can use a persisted partition summary take it instead
+    and are not fed records. The events file is read through its index when
+    every consumer filters on index terms: only batches matching some
+    consumer's terms are read. A downsampled partition feeds its rollup.
+    Consumers that want positions get each record's (date, byte offset).
+    """
+    rollup = _load_rollup(partition_dir)
+    if rollup is not None:
+        for agg in aggregators:
+            agg.feed_rollup(rollup, svc_name, env_name)
+        return aggregators
+    readers = [
+        agg for agg in aggregators
+        if not agg.feed_summary(partition_dir, svc_name, env_name)
+    ]
+    sources = sorted({source for agg in readers for source in agg.sources})
+    date_str = partition_dir.parent.parent.name
+    for source in sources:
+        consumers = [agg for agg in readers if source in agg.sources]
+        filepath = partition_dir / source
+        fields = _union_fields(consumers)
+        positions = any(agg.wants_positions for agg in consumers)
+        records = None
+        if source == EVENTS_FILE and all(agg.index_terms for agg in consumers):
+            index = load_event_index(filepath)
+            if index is not None:
+                offsets, covered = index.lookup(agg.index_terms for agg in consumers)
+                if positions:
+                    records = _with_positions(
+                        _read_jsonl_at(filepath, fields, offsets, covered), date_str
+                    )
+                else:
+                    records = _read_indexed(filepath, offsets, covered, fields)
+        if records is None:
+            if positions:
+                records = _with_positions(_read_jsonl_at(filepath, fields), date_str)
+            else:
+                records = read(filepath, fields)
+        for rec in records:
+            for agg in consumers:
+                agg.feed(source, svc_name, env_name, rec)
+    for agg in readers:
+        agg.end_partition()
+    return aggregators
+
+
+def _scan_partition(
+    partition_dir: Path,
+    svc_name: str,
+    env_name: str,
+    partials: list[_Aggregator],
+) -> list[_Aggregator]:
+    """Process pool entry point: fill empty partials from one partition."""
+    return _feed_partition(_read_jsonl, partition_dir, svc_name, env_name, partials)
 
 
 class TelemetryReader:
-    """Partition-aware reader for telemetry JSONL files."""
+    """Partition-aware reader for telemetry JSONL files.
+
+    With a PartitionCatalog, scans are planned from the catalog; without one
+    the date and service/environment directories are listed per query.
+    """
 
-    def __init__(self, base_dir: str | Path) -> None:
+    def __init__(
+        self,
+        base_dir: str | Path,
+        scan_workers: int = 1,
+        catalog: PartitionCatalog | None = None,
+    ) -> None:
         self._base = Path(base_dir)
+        self._scan_workers = scan_workers
+        self._catalog = catalog
+        self._pool: Executor | None = None
+        self._pool_lock = threading.Lock()
 
     def _date_dirs_in_range(
         self, start: datetime, end: datetime
     ) -> list[tuple[str, Path]]:
         """Return sorted (date_str, path) tuples for date dirs within [start, end]."""
+        if self._catalog is not None:
+            return [
+                (date_str, self._base / date_str)
+                for date_str in self._catalog.dates(start.date(), end.date())
+            ]
         if not self._base.is_dir():
             return []
         start_date = start.date()
@@ -76,6 +2056,8 @@ class TelemetryReader:
 
     def _all_date_dirs(self) -> list[tuple[str, Path]]:
         """Return all date directories, sorted."""
+        if self._catalog is not None:
+            return [(date_str, self._base / date_str) for date_str in self._catalog.dates()]
         if not self._base.is_dir():
             return []
         results = []
@@ -96,12 +2078,15 @@ class TelemetryReader:
         env_filter: str | None,
     ) -> list[tuple[str, str, Path]]:
         """Return (serviceName, environment, path) for matching partitions."""
+        if self._catalog is not None:
+            return self._catalog.partitions(date_dir.name, service_filter, env_filter)
         results = []
         if not date_dir.is_dir():
             return results
         service_dirs = sorted(date_dir.iterdir())
         for svc_dir in service_dirs:
-            if not svc_dir.is_dir():
+            # "@" directories hold indexes (see telemetry_index.py), not partitions.
+            if svc_dir.name.startswith("@") or not svc_dir.is_dir():
                 continue
             if service_filter and svc_dir.name != _safe_name(service_filter):
                 continue
@@ -113,24 +2098,217 @@ class TelemetryReader:
                 results.append((svc_dir.name, env_dir.name, env_dir))
         return results
 
-    def _read_jsonl(self, filepath: Path) -> list[dict]:
-        """Read all records from a JSONL file."""
-        records = []
-        if not filepath.is_file():
-            return records
-        try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                for line in f:
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        records.append(json.loads(line))
-                    except json.JSONDecodeError:
-                        continue
-        except OSError:
-            logger.exception("read_jsonl_error", extra={"fields": {"path": str(filepath)}})
-        return records
+    def _read_jsonl(
+        self, filepath: Path, fields: tuple[str, ...] | None = None
+    ) -> Iterator[dict]:
+        """Yield records from a JSONL file, projected to ``fields``."""
+        return _read_jsonl(filepath, fields)
+
+    def _plan_partitions(
+        self, aggregators: list[_Aggregator]
+    ) -> list[tuple[Path, str, str, list[_Aggregator]]]:
+        """List (partition, service, environment, aggregators) for a shared scan.
+
+        The date range and service/environment filters are widened to cover
+        all aggregators; each partition is paired with the aggregators that
+        want it.
+        """
+        filters = {(agg.service_filter, agg.env_filter) for agg in aggregators}
+        service_filter, env_filter = filters.pop() if len(filters) == 1 else (None, None)
+
+        if any(agg.start is None or agg.end is None for agg in aggregators):
+            date_dirs = self._all_date_dirs()
+        else:
+            date_dirs = self._date_dirs_in_range(
+                min(agg.start for agg in aggregators),
+                max(agg.end for agg in aggregators),
+            )
+
+        tasks = []
+        for date_str, date_dir in date_dirs:
+            d = datetime.strptime(date_str, "%Y-%m-%d").date()
+            dated = [agg for agg in aggregators if agg.wants_date(d)]
+            if not dated:
+                continue
+            for svc_name, env_name, partition_dir in self._service_env_dirs(
+                date_dir, service_filter, env_filter
+            ):
+                wanting = [agg for agg in dated if agg.wants_partition(svc_name, env_name)]
+                if wanting:
+                    tasks.append((partition_dir, svc_name, env_name, wanting))
+        return tasks
+
+    def _scan(self, aggregators: list[_Aggregator]) -> None:
+        """Feed every aggregator from a single pass over the partitions.
+
+        Each partition file is read at most once and every record is handed
+        to each aggregator that wants that partition. With scan workers
+        configured and enough partitions, partitions are fanned out to the
+        process pool as empty partials and merged back in scan order.
+        """
+        if not aggregators:
+            return
+        tasks = self._plan_partitions(aggregators)
+        if self._scan_workers <= 1 or len(tasks) < PARALLEL_MIN_PARTITIONS:
+            for partition_dir, svc_name, env_name, wanting in tasks:
+                _feed_partition(self._read_jsonl, partition_dir, svc_name, env_name, wanting)
+            return
+
+        pool = self._get_pool()
+        futures = [
+            pool.submit(
+                _scan_partition,
+                partition_dir,
+                svc_name,
+                env_name,
+                [agg.spawn() for agg in wanting],
+            )
+            for partition_dir, svc_name, env_name, wanting in tasks
+        ]
+        for (_dir, _svc, _env, wanting), future in zip(tasks, futures):
+            for agg, partial in zip(wanting, future.result()):
+                agg.merge(partial)
+
+    def _events_newest_first(
+        self, svc_name: str, env_name: str, partition_dir: Path, day_end: int,
+        index_terms: tuple[tuple[str, str], ...] | None = None,
+    ) -> Iterator[tuple[int | float, str, str, int, bytes]]:
+        """Yield (receivedAt, service, environment, byte offset, line), newest first.
+
+        With ``index_terms`` and an event index, only the unindexed tail and
+        the indexed batches carrying every term are read.
+        """
+        filepath = partition_dir / EVENTS_FILE
+        lines = None
+        if index_terms:
+            index = load_event_index(filepath)
+            if index is not None:
+                offsets, covered = index.lookup([index_terms])
+                lines = itertools.chain(
+                    _iter_lines_reverse(filepath, covered),
+                    _read_lines_at(filepath, reversed(offsets)),
+                )
+        if lines is None:
+            lines = _iter_lines_reverse(filepath)
+        for offset, line in lines:
+            received = None
+            # Records are written as {"receivedAt":"<20 chars>",...}.
+            if line.startswith(b'{"receivedAt":"'):
+                received = _parse_epoch(line[15:35].decode("ascii", "replace"))
+            # Unknown receivedAt: assume the latest possible for this date dir.
+            if received is None:
+                received = day_end
+            yield received, svc_name, env_name, offset, line
+
+    def _scan_newest_first(self, aggregator: _RecentEventsAggregator) -> None:
+        """Feed a recent events page from the newest data backwards.
+
+        Date directories are visited newest first and, within a date, every
+        partition's events file is read backwards and merged by receivedAt.
+        An event's ts is at most receivedAt + _EVENT_TS_SKEW_SEC, so the scan
+        stops once receivedAt falls far enough below either the query start
+        or the lowest ts still in the page heap.
+        """
+        skew = _EVENT_TS_SKEW_SEC
+        tree = _compile_projection(aggregator.fields)
+        date_dirs = self._date_dirs_in_range(aggregator.start, aggregator.end)
+        for date_str, date_dir in reversed(date_dirs):
+            day_end = _parse_epoch(f"{date_str}T00:00:00Z") + 86400
+            floor = aggregator.floor()
+            if floor is not None and day_end + skew <= floor:
+                aggregator.complete = False
+                return
+            streams = [
+                self._events_newest_first(
+                    svc_name, env_name, partition_dir, day_end, aggregator.index_terms
+                )
+                for svc_name, env_name, partition_dir in self._service_env_dirs(
+                    date_dir, aggregator.service_filter, aggregator.env_filter
+                )
+            ]
+            for received, svc_name, env_name, offset, line in heapq.merge(
+                *streams, key=itemgetter(0), reverse=True
+            ):
+                if received + skew < aggregator.start_ts:
+                    return
+                floor = aggregator.floor()
+                if floor is not None and received + skew < floor:
+                    aggregator.complete = False
+                    return
+                rec = _decode_line(line.decode("utf-8", "replace"), tree)
+                if rec is not None:
+                    rec[_RECORD_POSITION] = (date_str, offset)
+                    aggregator.feed(EVENTS_FILE, svc_name, env_name, rec)
+
+    def _scan_seek(self, aggregator: _HeartbeatFreshnessAggregator) -> None:
+        """Feed a keyset page in (service, environment) partition order.
+
+        Rows sort by service and environment first, so once the page is full
+        after finishing a service/environment group no later group can
+        contribute and the scan stops.
+        """
+        tasks = sorted(
+            self._plan_partitions([aggregator]),
+            key=lambda task: (task[1], task[2]),
+        )
+        group = None
+        for partition_dir, svc_name, env_name, wanting in tasks:
+            if (svc_name, env_name) != group:
+                if aggregator.page_full():
+                    return
+                group = (svc_name, env_name)
+            _feed_partition(self._read_jsonl, partition_dir, svc_name, env_name, wanting)
+
+    def _fill(self, aggregator: _Aggregator) -> None:
+        if getattr(aggregator, "newest_first", False):
+            self._scan_newest_first(aggregator)
+        elif getattr(aggregator, "seek", False):
+            self._scan_seek(aggregator)
+        else:
+            self._scan([aggregator])
+
+    def _get_pool(self) -> Executor:
+        with self._pool_lock:
+            if self._pool is None:
+                # spawn rather than fork: the API process is multi-threaded.
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self._scan_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._pool
+
+    def close(self) -> None:
+        """Shut down the partition scan pool, if one was started."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _run(self, aggregator: _Aggregator) -> dict:
+        self._fill(aggregator)
+        return aggregator.result()
+
+    def query_batch(self, queries: list[tuple[str, dict]]) -> list[dict]:
+        """Run several queries over one shared partition scan.
+
+        ``queries`` is a list of (query name, keyword arguments) pairs using the
+        same arguments as the individual ``query_*`` methods. Identical
+        queries are planned once and share a single aggregator. Results are
+        returned in request order.
+        """
+        planned: dict[tuple, _Aggregator] = {}
+        order: list[_Aggregator] = []
+        for name, kwargs in queries:
+            key = (name, tuple(sorted(kwargs.items())))
+            agg = planned.get(key)
+            if agg is None:
+                agg = _AGGREGATORS[name](**kwargs)
+                planned[key] = agg
+            order.append(agg)
+
+        self._scan(list(planned.values()))
+        results = {id(agg): agg.result() for agg in planned.values()}
+        return [results[id(agg)] for agg in order]
 
     def query_fleet_health(
         self,
@@ -139,86 +2317,20 @@ class TelemetryReader:
         service_name: str | None = None,
         environment: str | None = None,
         max_rows: int = 1000,
+        approximate: bool | None = None,
     ) -> dict:
-        """Aggregate fleet health from announce and heartbeat data."""
-        # Key: (serviceName, environment)
-        aggregates: dict[tuple[str, str], dict] = {}
-
-        date_dirs = self._date_dirs_in_range(start, end)
-        for _date_str, date_dir in date_dirs:
-            for svc_name, env_name, partition_dir in self._service_env_dirs(
-                date_dir, service_name, environment
-            ):
-                key = (svc_name, env_name)
-                if key not in aggregates:
-                    aggregates[key] = {
-                        "instances": set(),
-                        "lastAnnouncedAt": None,
-                        "lastHeartbeatAt": None,
-                    }
-                agg = aggregates[key]
-
-                # Scan announce records
-                for rec in self._read_jsonl(partition_dir / "announce.jsonl"):
-                    payload = rec.get("payload", {})
-                    identity = payload.get("identity", {})
-                    inst_id = identity.get("instanceId")
-                    if inst_id:
-                        agg["instances"].add(inst_id)
-                    sent_at = payload.get("sentAt") or rec.get("receivedAt")
-                    if sent_at:
-                        ts = _parse_ts(sent_at)
-                        if ts and start <= ts <= end:
-                            if agg["lastAnnouncedAt"] is None or ts > agg["lastAnnouncedAt"]:
-                                agg["lastAnnouncedAt"] = ts
-
-                # Scan heartbeat records
-                for rec in self._read_jsonl(partition_dir / "heartbeat.jsonl"):
-                    payload = rec.get("payload", {})
-                    identity = payload.get("identity", {})
-                    inst_id = identity.get("instanceId")
-                    if inst_id:
-                        agg["instances"].add(inst_id)
-                    sent_at = payload.get("sentAt") or rec.get("receivedAt")
-                    if sent_at:
-                        ts = _parse_ts(sent_at)
-                        if ts and start <= ts <= end:
-                            if agg["lastHeartbeatAt"] is None or ts > agg["lastHeartbeatAt"]:
-                                agg["lastHeartbeatAt"] = ts
-
-        # Build response
-        now = datetime.now(timezone.utc)
-        data = []
-        for (svc, env), agg in sorted(aggregates.items()):
-            last_hb = agg["lastHeartbeatAt"]
-            last_announced = agg["lastAnnouncedAt"] or last_hb
-            if last_hb is None:
-                status = "offline"
-            elif (now - last_hb).total_seconds() > 900:  # 15 min
-                status = "offline"
-            elif (now - last_hb).total_seconds() > 300:  # 5 min
-                status = "stale"
-            else:
-                status = "healthy"
-
-            data.append({
-                "serviceName": svc,
-                "environment": env,
-                "instanceCount": len(agg["instances"]),
-                "lastAnnouncedAt": _format_ts(last_announced) if last_announced else None,
-                "lastHeartbeatAt": _format_ts(last_hb) if last_hb else None,
-                "status": status,
-            })
-
-        data = data[:max_rows]
-        return {
-            "data": data,
-            "meta": {
-                "totalRows": len(data),
-                "start": _format_ts(start),
-                "end": _format_ts(end),
-            },
-        }
+        """Aggregate fleet health from announce and heartbeat data.
+
+        ``approximate`` selects HyperLogLog instance counts; None picks them
+        for windows longer than FLEET_APPROX_MIN_DAYS.
+        """
+        return self._run(_FleetHealthAggregator(
+            start, end,
+            service_name=service_name,
+            environment=environment,
+            max_rows=max_rows,
+            approximate=approximate,
+        ))
 
     def query_heartbeat_freshness(
         self,
@@ -231,72 +2343,14 @@ class TelemetryReader:
         cursor: str | None = None,
     ) -> dict:
         """Per-instance heartbeat freshness with staleness calculation."""
-        offset = _decode_cursor(cursor)
-        # Key: (serviceName, environment, instanceId) -> latest heartbeat info
-        instances: dict[tuple[str, str, str], dict] = {}
-
-        date_dirs = self._date_dirs_in_range(start, end)
-        for _date_str, date_dir in date_dirs:
-            for svc_name, env_name, partition_dir in self._service_env_dirs(
-                date_dir, service_name, environment
-            ):
-                for rec in self._read_jsonl(partition_dir / "heartbeat.jsonl"):
-                    payload = rec.get("payload", {})
-                    identity = payload.get("identity", {})
-                    svc = identity.get("serviceName", svc_name)
-                    env = identity.get("environment", env_name)
-                    inst_id = identity.get("instanceId", "")
-                    if not inst_id:
-                        continue
-                    sent_at = payload.get("sentAt") or rec.get("receivedAt")
-                    ts = _parse_ts(sent_at) if sent_at else None
-                    if not ts or ts < start or ts > end:
-                        continue
-
-                    go_dark = payload.get("status", {}).get("goDark")
-                    key = (_safe_name(svc), _safe_name(env), inst_id)
-                    existing = instances.get(key)
-                    if existing is None or ts > existing["ts"]:
-                        instances[key] = {"ts": ts, "goDark": go_dark}
-
-        now = datetime.now(timezone.utc)
-        all_rows = []
-        for (svc, env, inst_id), info in sorted(instances.items()):
-            stale_sec = (now - info["ts"]).total_seconds()
-            stale_sec = max(0.0, stale_sec)
-            if stale_sec <= staleness_threshold_sec:
-                status = "fresh"
-            elif stale_sec <= staleness_threshold_sec * 3:
-                status = "stale"
-            else:
-                status = "offline"
-
-            row: dict = {
-                "serviceName": svc,
-                "environment": env,
-                "instanceId": inst_id,
-                "lastHeartbeatAt": _format_ts(info["ts"]),
-                "staleSec": round(stale_sec, 1),
-                "status": status,
-            }
-            if info["goDark"] is not None:
-                row["goDark"] = info["goDark"]
-            all_rows.append(row)
-
-        total = len(all_rows)
-        page = all_rows[offset : offset + max_rows]
-        next_offset = offset + max_rows
-        next_cursor = _encode_cursor(next_offset) if next_offset < total else None
-
-        return {
-            "data": page,
-            "meta": {
-                "totalRows": total,
-                "start": _format_ts(start),
-                "end": _format_ts(end),
-                "cursor": next_cursor,
-            },
-        }
+        return self._run(_HeartbeatFreshnessAggregator(
+            start, end,
+            staleness_threshold_sec=staleness_threshold_sec,
+            service_name=service_name,
+            environment=environment,
+            max_rows=max_rows,
+            cursor=cursor,
+        ))
 
     def query_event_throughput(
         self,
@@ -308,54 +2362,13 @@ class TelemetryReader:
         max_rows: int = 1000,
     ) -> dict:
         """Time-bucketed event counts."""
-        bucket_width = timedelta(seconds=bucket_width_sec)
-        # Collect all event timestamps
-        event_times: list[datetime] = []
-
-        date_dirs = self._date_dirs_in_range(start, end)
-        for _date_str, date_dir in date_dirs:
-            for svc_name, env_name, partition_dir in self._service_env_dirs(
-                date_dir, service_name, environment
-            ):
-                for rec in self._read_jsonl(partition_dir / "events.jsonl"):
-                    payload = rec.get("payload", {})
-                    events = payload.get("events", [])
-                    for event in events:
-                        ts_str = event.get("ts")
-                        ts = _parse_ts(ts_str) if ts_str else None
-                        if ts and start <= ts <= end:
-                            event_times.append(ts)
-
-        # Build buckets
-        buckets: dict[datetime, int] = {}
-        for ts in event_times:
-            # Floor to bucket boundary
-            seconds_since_start = (ts - start).total_seconds()
-            bucket_index = int(seconds_since_start // bucket_width_sec)
-            bucket_start = start + timedelta(seconds=bucket_index * bucket_width_sec)
-            buckets[bucket_start] = buckets.get(bucket_start, 0) + 1
-
-        # Generate all buckets in range (including empty ones)
-        all_buckets = []
-        current = start
-        while current < end:
-            count = buckets.get(current, 0)
-            all_buckets.append({
-                "bucket": _format_ts(current),
-                "count": count,
-            })
-            current += bucket_width
-
-        all_buckets = all_buckets[:max_rows]
-        return {
-            "data": all_buckets,
-            "meta": {
-                "totalRows": len(all_buckets),
-                "bucketWidthSec": bucket_width_sec,
-                "start": _format_ts(start),
-                "end": _format_ts(end),
-            },
-        }
+        return self._run(_EventThroughputAggregator(
+            start, end,
+            bucket_width_sec=bucket_width_sec,
+            service_name=service_name,
+            environment=environment,
+            max_rows=max_rows,
+        ))
 
     def query_container_metrics(
         self,
@@ -367,192 +2380,33 @@ class TelemetryReader:
         instance_id: str | None = None,
         rollup: str = "container",
         max_rows: int = 10000,
+        stat: str = "sum",
     ) -> dict:
-        """Bucketed heartbeat metrics for container/service/fleet views."""
-
-        def _to_int(value: object) -> int | None:
-            if isinstance(value, bool):
-                return None
-            if isinstance(value, int):
-                return value
-            if isinstance(value, float):
-                return int(value)
-            return None
-
-        def _to_float(value: object) -> float | None:
-            if isinstance(value, bool):
-                return None
-            if isinstance(value, (int, float)):
-                return float(value)
-            return None
-
-        # container key -> points ordered later by timestamp
-        container_points: dict[tuple[str, str, str], list[dict]] = {}
-        for _date_str, date_dir in self._date_dirs_in_range(start, end):
-            for svc_name, env_name, partition_dir in self._service_env_dirs(
-                date_dir, service_name, environment
-            ):
-                for rec in self._read_jsonl(partition_dir / "heartbeat.jsonl"):
-                    payload = rec.get("payload", {})
-                    identity = payload.get("identity", {})
-                    svc = _safe_name(identity.get("serviceName", svc_name))
-                    env = _safe_name(identity.get("environment", env_name))
-                    inst_id = str(identity.get("instanceId", "")).strip()
-                    if not inst_id:
-                        continue
-                    if instance_id and inst_id != instance_id:
-                        continue
-
-                    sent_at = payload.get("sentAt") or rec.get("receivedAt")
-                    ts = _parse_ts(sent_at) if sent_at else None
-                    if not ts or ts < start or ts > end:
-                        continue
-
-                    status = payload.get("status", {})
-                    container_points.setdefault((svc, env, inst_id), []).append({
-                        "ts": ts,
-                        "rx": _to_int(status.get("containerRxBytesSinceLastHeartbeat")),
-                        "tx": _to_int(status.get("containerTxBytesSinceLastHeartbeat")),
-                        "containerMemoryCurrentBytes": _to_int(status.get("containerMemoryCurrentBytes")),
-                        "containerMemoryMaxBytes": _to_int(status.get("containerMemoryMaxBytes")),
-                        "transponderRssBytes": _to_int(status.get("transponderRssBytes")),
-                        "primaryAppRssBytes": _to_int(status.get("primaryAppRssBytes")),
-                        "transponderCpuUserSec": _to_float(status.get("transponderCpuUserSec")),
-                        "transponderCpuSystemSec": _to_float(status.get("transponderCpuSystemSec")),
-                        "transponderUptimeSec": _to_int(status.get("transponderUptimeSec")),
-                    })
-
-        # aggregate by bucket and grouping key (container or service+environment)
-        aggregates: dict[tuple, dict] = {}
-        for (svc, env, inst), points in container_points.items():
-            previous: dict | None = None
-            for point in sorted(points, key=lambda p: p["ts"]):
-                seconds_since_start = (point["ts"] - start).total_seconds()
-                bucket_index = int(seconds_since_start // bucket_width_sec)
-                bucket_start = start + timedelta(seconds=bucket_index * bucket_width_sec)
-
-                group_key = (svc, env, bucket_start, inst)
-                if rollup == "service":
-                    group_key = (svc, env, bucket_start)
-                if rollup == "fleet":
-                    group_key = (bucket_start,)
-
-                agg = aggregates.setdefault(group_key, {
-                    "serviceName": svc if rollup != "fleet" else "all-services",
-                    "environment": env if rollup != "fleet" else "all-envs",
-                    "bucket": bucket_start,
-                    "instanceId": inst if rollup == "container" else None,
-                    "containerCount": 0,
-                    "_containerSet": set(),
-                    "networkRxBytes": 0,
-                    "networkTxBytes": 0,
-                    "heartbeatCount": 0,
-                    "containerMemoryCurrentBytes": 0,
-                    "containerMemoryMaxBytes": 0,
-                    "transponderRssBytes": 0,
-                    "primaryAppRssBytes": 0,
-                    "transponderUptimeSec": 0,
-                    "cpuPct": 0.0,
-                    "_rxSamples": 0,
-                    "_txSamples": 0,
-                    "_cpuSamples": 0,
-                    "_memorySamples": 0,
-                    "_maxSamples": 0,
-                    "_rssSamples": 0,
-                    "_appRssSamples": 0,
-                    "_uptimeSamples": 0,
-                })
-
-                agg["heartbeatCount"] += 1
-                if point["rx"] is not None:
-                    agg["networkRxBytes"] += max(0, point["rx"])
-                    agg["_rxSamples"] += 1
-                if point["tx"] is not None:
-                    agg["networkTxBytes"] += max(0, point["tx"])
-                    agg["_txSamples"] += 1
-
-                if point["containerMemoryCurrentBytes"] is not None:
-                    agg["containerMemoryCurrentBytes"] += point["containerMemoryCurrentBytes"]
-                    agg["_memorySamples"] += 1
-                if point["containerMemoryMaxBytes"] is not None:
-                    agg["containerMemoryMaxBytes"] += point["containerMemoryMaxBytes"]
-                    agg["_maxSamples"] += 1
-                if point["transponderRssBytes"] is not None:
-                    agg["transponderRssBytes"] += point["transponderRssBytes"]
-                    agg["_rssSamples"] += 1
-                if point["primaryAppRssBytes"] is not None:
-                    agg["primaryAppRssBytes"] += point["primaryAppRssBytes"]
-                    agg["_appRssSamples"] += 1
-                if point["transponderUptimeSec"] is not None:
-                    agg["transponderUptimeSec"] += point["transponderUptimeSec"]
-                    agg["_uptimeSamples"] += 1
-
-                if previous is not None:
-                    dt_sec = max(1e-6, (point["ts"] - previous["ts"]).total_seconds())
-                    user_now = point["transponderCpuUserSec"]
-                    user_prev = previous["transponderCpuUserSec"]
-                    sys_now = point["transponderCpuSystemSec"]
-                    sys_prev = previous["transponderCpuSystemSec"]
-                    if (
-                        user_now is not None
-                        and user_prev is not None
-                        and sys_now is not None
-                        and sys_prev is not None
-                    ):
-                        cpu_delta = (user_now - user_prev) + (sys_now - sys_prev)
-                        if cpu_delta >= 0:
-                            agg["cpuPct"] += (cpu_delta / dt_sec) * 100.0
-                            agg["_cpuSamples"] += 1
-
-                if rollup in ("service", "fleet"):
-                    agg["_containerSet"].add(inst)
-                previous = point
-
-        rows = []
-        for agg in sorted(aggregates.values(), key=lambda r: (r["bucket"], r["serviceName"], r["environment"], r.get("instanceId") or "")):
-            row = {
-                "bucket": _format_ts(agg["bucket"]),
-                "serviceName": agg["serviceName"],
-                "environment": agg["environment"],
-                "networkRxBytes": agg["networkRxBytes"] if agg["_rxSamples"] > 0 else None,
-                "networkTxBytes": agg["networkTxBytes"] if agg["_txSamples"] > 0 else None,
-                "heartbeatCount": agg["heartbeatCount"],
-                "transponderUptimeSec": (
-                    round(agg["transponderUptimeSec"] / agg["_uptimeSamples"], 1)
-                    if agg["_uptimeSamples"] > 0
-                    else None
-                ),
-                "containerMemoryCurrentBytes": (
-                    agg["containerMemoryCurrentBytes"] if agg["_memorySamples"] > 0 else None
-                ),
-                "containerMemoryMaxBytes": (
-                    agg["containerMemoryMaxBytes"] if agg["_maxSamples"] > 0 else None
-                ),
-                "transponderRssBytes": (
-                    agg["transponderRssBytes"] if agg["_rssSamples"] > 0 else None
-                ),
-                "primaryAppRssBytes": (
-                    agg["primaryAppRssBytes"] if agg["_appRssSamples"] > 0 else None
-                ),
-                "cpuPct": round(agg["cpuPct"] / agg["_cpuSamples"], 3) if agg["_cpuSamples"] > 0 else None,
-            }
-            if rollup == "container":
-                row["instanceId"] = agg["instanceId"]
-            else:
-                row["containerCount"] = len(agg["_containerSet"])
-            rows.append(row)
-
-        rows = rows[:max_rows]
-        return {
-            "data": rows,
-            "meta": {
-                "totalRows": len(rows),
-                "bucketWidthSec": bucket_width_sec,
-                "rollup": rollup,
-                "start": _format_ts(start),
-                "end": _format_ts(end),
-            },
-        }
+        """Bucketed heartbeat metrics for container/service/fleet views.
+
+        ``stat`` (see CONTAINER_METRIC_STATS) switches memory, RSS and CPU%
+        from bucket sums/means to a quantile or max of their samples.
+        """
+        return self._run(_ContainerMetricsAggregator(
+            start, end,
+            bucket_width_sec=bucket_width_sec,
+            service_name=service_name,
+            environment=environment,
+            instance_id=instance_id,
+            rollup=rollup,
+            max_rows=max_rows,
+            stat=stat,
+        ))
+
+    def stream_container_metrics(self, **kwargs) -> tuple[dict, Iterator[dict]]:
+        """Scan like query_container_metrics; return meta and a lazy row iterator.
+
+        The scan finishes here. The iterator rolls up and releases one bucket
+        at a time.
+        """
+        aggregator = _ContainerMetricsAggregator(**kwargs)
+        self._scan([aggregator])
+        return aggregator.stream()
 
     def query_go_dark_status(
         self,
@@ -561,54 +2415,11 @@ class TelemetryReader:
         max_rows: int = 1000,
     ) -> dict:
         """Latest GO_DARK state per instance from heartbeat data."""
-        # Scan all date directories (no time range filter for go-dark status)
-        instances: dict[tuple[str, str, str], dict] = {}
-
-        for _date_str, date_dir in self._all_date_dirs():
-            for svc_name, env_name, partition_dir in self._service_env_dirs(
-                date_dir, service_name, environment
-            ):
-                for rec in self._read_jsonl(partition_dir / "heartbeat.jsonl"):
-                    payload = rec.get("payload", {})
-                    identity = payload.get("identity", {})
-                    svc = identity.get("serviceName", svc_name)
-                    env = identity.get("environment", env_name)
-                    inst_id = identity.get("instanceId", "")
-                    if not inst_id:
-                        continue
-                    sent_at = payload.get("sentAt") or rec.get("receivedAt")
-                    ts = _parse_ts(sent_at) if sent_at else None
-                    if not ts:
-                        continue
-
-                    go_dark = payload.get("status", {}).get("goDark", False)
-                    key = (_safe_name(svc), _safe_name(env), inst_id)
-                    existing = instances.get(key)
-                    if existing is None or ts > existing["ts"]:
-                        instances[key] = {
-                            "ts": ts,
-                            "goDark": bool(go_dark),
-                            "lastHeartbeatAt": ts,
-                        }
-
-        data = []
-        for (svc, env, inst_id), info in sorted(instances.items()):
-            data.append({
-                "serviceName": svc,
-                "environment": env,
-                "instanceId": inst_id,
-                "goDark": info["goDark"],
-                "lastHeartbeatAt": _format_ts(info["lastHeartbeatAt"]),
-                "reportedAt": _format_ts(info["ts"]),
-            })
-
-        data = data[:max_rows]
-        return {
-            "data": data,
-            "meta": {
-                "totalRows": len(data),
-            },
-        }
+        return self._run(_GoDarkStatusAggregator(
+            service_name=service_name,
+            environment=environment,
+            max_rows=max_rows,
+        ))
 
     def query_recent_events(
         self,
@@ -620,71 +2431,70 @@ class TelemetryReader:
         cursor: str | None = None,
         severity: str | None = None,
         event_type: str | None = None,
+        include_total: bool = True,
+        tags: tuple[tuple[str, str], ...] | None = None,
     ) -> dict:
-        """Paginated recent events with redaction-safe projection (no payload)."""
-        offset = _decode_cursor(cursor)
-        all_events: list[dict] = []
-
-        date_dirs = self._date_dirs_in_range(start, end)
-        # Reverse for recent-first ordering
-        for _date_str, date_dir in reversed(date_dirs):
-            for svc_name, env_name, partition_dir in self._service_env_dirs(
-                date_dir, service_name, environment
-            ):
-                for rec in self._read_jsonl(partition_dir / "events.jsonl"):
-                    payload = rec.get("payload", {})
-                    batch_id = payload.get("batchId")
-                    session_id = payload.get("transponderSessionId")
-                    events = payload.get("events", [])
-
-                    # Extract service context from first event tags
-                    first_tags = events[0].get("tags", {}) if events else {}
-                    rec_svc = first_tags.get("serviceName", svc_name)
-                    rec_env = first_tags.get("environment", env_name)
-
-                    for event in events:
-                        ts_str = event.get("ts")
-                        ts = _parse_ts(ts_str) if ts_str else None
-                        if not ts or ts < start or ts > end:
-                            continue
-
-                        evt_severity = event.get("severity", "info")
-                        evt_type = event.get("type", "")
-
-                        if severity and evt_severity != severity:
-                            continue
-                        if event_type and evt_type != event_type:
-                            continue
-
-                        row: dict = {
-                            "ts": ts_str,
-                            "type": evt_type,
-                            "severity": evt_severity,
-                            "serviceName": rec_svc,
-                            "environment": rec_env,
-                        }
-                        tags = event.get("tags")
-                        if tags:
-                            row["tags"] = {str(k): str(v) for k, v in tags.items()}
-                        if batch_id:
-                            row["batchId"] = batch_id
-                        if session_id:
-                            row["transponderSessionId"] = session_id
-                        all_events.append((ts, row))
-
-        # Sort by timestamp descending (most recent first)
-        all_events.sort(key=lambda x: x[0], reverse=True)
-        total = len(all_events)
-        page = [row for _, row in all_events[offset : offset + max_rows]]
-        next_offset = offset + max_rows
-        next_cursor = _encode_cursor(next_offset) if next_offset < total else None
-
+        """Paginated recent events with redaction-safe projection (no payload).
+
+        With ``include_total=False``, or on later pages whose cursor carries
+        the total, the range is scanned newest first and the scan stops once
+        the page is settled. Without the total, ``totalRows`` is only exact if
+        ``totalRowsExact`` is true. ``tags`` are (key, value) pairs that
+        every returned event must carry.
+        """
+        return self._run(_RecentEventsAggregator(
+            start, end,
+            service_name=service_name,
+            environment=environment,
+            max_rows=max_rows,
+            cursor=cursor,
+            severity=severity,
+            event_type=event_type,
+            include_total=include_total,
+            tags=tags,
+        ))
+
+    def stream_recent_events(self, **kwargs) -> tuple[dict, Iterator[dict]]:
+        """Scan like query_recent_events; return meta and a lazy row iterator.
+
+        The scan finishes here; the iterator only builds rows.
+        """
+        aggregator = _RecentEventsAggregator(**kwargs)
+        self._fill(aggregator)
+        return aggregator.stream()
+
+    def query_trace_events(self, trace_id: str, max_rows: int = 1000) -> dict:
+        """Every stored event of one trace, across services and dates, in ts order.
+
+        Reads the trace index (see telemetry_index.py): one hashed bucket per
+        date directory, then only the batches it lists. Batches stored before
+        the index existed are not found.
+        """
+        bucket = trace_bucket(trace_id)
+        batches: dict[Path, set[int]] = {}
+        for _date_str, date_dir in self._all_date_dirs():
+            for entry in _read_jsonl(date_dir / TRACE_INDEX_DIR / bucket):
+                if entry.get("t") != trace_id:
+                    continue
+                svc_dir, env_dir, offset = entry.get("s"), entry.get("e"), entry.get("o")
+                if not (
+                    isinstance(svc_dir, str) and svc_dir == _safe_name(svc_dir)
+                    and isinstance(env_dir, str) and env_dir == _safe_name(env_dir)
+                    and type(offset) is int and offset >= 0
+                ):
+                    continue
+                batches.setdefault(date_dir / svc_dir / env_dir / EVENTS_FILE, set()).add(offset)
+
+        tree = _compile_projection(_TRACE_FIELDS)
+        ranked: list[tuple[tuple, dict]] = []
+        for events_path, offsets in batches.items():
+            svc_dir, env_dir = events_path.parent.parent.name, events_path.parent.name
+            for _offset, line in _read_lines_at(events_path, sorted(offsets)):
+                rec = _decode_line(line.decode("utf-8", "replace"), tree)
+                if rec is not None:
+                    ranked.extend(_trace_rows(rec, trace_id, svc_dir, env_dir))
+        ranked.sort(key=itemgetter(0))
         return {
-            "data": page,
-            "meta": {
-                "totalRows": total,
-                "start": _format_ts(start),
-                "end": _format_ts(end),
-                "cursor": next_cursor,
-            },
+            "data": [row for _key, row in ranked[:max_rows]],
+            "meta": {"totalRows": len(ranked), "traceId": trace_id},
         }
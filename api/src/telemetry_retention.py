@@ -1,11 +1,24 @@
 """Telemetry retention module.
 
-Prunes telemetry partitions older than a configurable number of days
-(default 180) from the date-partitioned directory tree under data/telemetry/.
+Prunes telemetry partitions from the date-partitioned directory tree under
+data/telemetry/. The date dimension is the top-level directory (YYYY-MM-DD
+format). Retention walks these directories and removes:
 
-The date dimension is the top-level directory (YYYY-MM-DD format).
-Retention walks these directories, compares against the cutoff date,
-and removes stale partitions entirely.
+  - dates older than the retention period (default 180 days), entirely;
+  - services with a per-service override, within dates older than the
+    override (which may be shorter or longer than the default);
+  - the oldest remaining dates, while the tree exceeds a byte quota or the
+    disk is fuller than a usage watermark. Today's date is never pruned.
+
+With a raw tier (``raw_days``), dates older than it but still retained are
+downsampled instead: each partition's raw files are replaced by a rollup
+(see telemetry_rollup.py) that long-range queries read.
+
+A pruned directory is first renamed to an "@pruning." name, which no
+listing treats as a partition, and dropped from the catalog and reader
+caches; its files are then unlinked at a bounded rate so a huge day does not
+starve ingest of disk bandwidth. RetentionScheduler repeats the run on an
+interval for the life of the process.
 """
 
 from __future__ import annotations
@@ -13,12 +26,126 @@ from __future__ import annotations
 import logging
 import os
 import shutil
-from datetime import datetime, timedelta, timezone
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable
+
+from .telemetry_compaction import rebuild_trace_index
+from .telemetry_index import TRACE_INDEX_DIR, evict_event_indexes
+from .telemetry_rollup import downsample_date
+from .telemetry_store import _safe_name
+
+if TYPE_CHECKING:
+    from .telemetry_catalog import PartitionCatalog
 
 logger = logging.getLogger("arecibo.telemetry_retention")
 
 DEFAULT_RETENTION_DAYS = 180
+DEFAULT_RETENTION_INTERVAL_SEC = 3600
+DEFAULT_DELETE_FILES_PER_SEC = 200
+
+# Directories being deleted; "@" keeps them out of date and service listings.
+PRUNING_PREFIX = "@pruning."
+
+
+def _dir_size(path: Path) -> int:
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def _remove_tree(path: Path, files_per_sec: float) -> None:
+    """Delete a directory tree, unlinking at most ``files_per_sec`` files a second."""
+    if files_per_sec <= 0:
+        shutil.rmtree(path)
+        return
+    interval = 1.0 / files_per_sec
+    next_at = time.monotonic()
+    for root, dirs, files in os.walk(path, topdown=False):
+        for name in files:
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            next_at = max(next_at, time.monotonic() - 1.0) + interval
+            os.unlink(os.path.join(root, name))
+        for name in dirs:
+            os.rmdir(os.path.join(root, name))
+    os.rmdir(path)
+
+
+def _prune_dir(path: Path, files_per_sec: float) -> int:
+    """Move ``path`` out of sight, then delete it; return the bytes freed."""
+    size = _dir_size(path)
+    doomed = path.with_name(PRUNING_PREFIX + path.name)
+    if doomed.exists():
+        shutil.rmtree(doomed)
+    path.rename(doomed)
+    evict_event_indexes(path)
+    _remove_tree(doomed, files_per_sec)
+    return size
+
+
+def _clear_leftovers(parent: Path, files_per_sec: float) -> None:
+    """Finish deletions interrupted by a restart."""
+    for entry in parent.iterdir():
+        if entry.name.startswith(PRUNING_PREFIX) and entry.is_dir():
+            try:
+                _remove_tree(entry, files_per_sec)
+            except OSError:
+                logger.exception(
+                    "retention_prune_error",
+                    extra={"fields": {"partition": str(entry.relative_to(parent.parent))}},
+                )
+
+
+def _prune_services(
+    date_dir: Path,
+    expired: Callable[[str], bool],
+    *,
+    dry_run: bool,
+    catalog: PartitionCatalog | None,
+    files_per_sec: float,
+) -> tuple[int, int, int, bool]:
+    """Prune expired services in one date.
+
+    Returns (services pruned, bytes freed, errors, whether any service is left).
+    """
+    pruned = freed = errors = 0
+    remaining = False
+    _clear_leftovers(date_dir, files_per_sec)
+    for svc_dir in sorted(date_dir.iterdir()):
+        if svc_dir.name.startswith("@") or not svc_dir.is_dir():
+            continue
+        if not expired(svc_dir.name):
+            remaining = True
+            continue
+        partition = f"{date_dir.name}/{svc_dir.name}"
+        if dry_run:
+            logger.info("retention_would_prune", extra={"fields": {"partition": partition}})
+            pruned += 1
+            continue
+        try:
+            freed += _prune_dir(svc_dir, files_per_sec)
+            if catalog is not None:
+                catalog.remove_service(date_dir.name, svc_dir.name)
+            logger.info("retention_pruned", extra={"fields": {"partition": partition}})
+            pruned += 1
+        except Exception:
+            logger.exception("retention_prune_error", extra={"fields": {"partition": partition}})
+            errors += 1
+            remaining = True
+    if pruned and not dry_run and (date_dir / TRACE_INDEX_DIR).is_dir():
+        # Drop trace index entries that point into the pruned services.
+        rebuild_trace_index(date_dir)
+    return pruned, freed, errors, remaining
 
 
 def run_retention(
@@ -27,24 +154,48 @@ def run_retention(
     retention_days: int = DEFAULT_RETENTION_DAYS,
     dry_run: bool = False,
     now: datetime | None = None,
+    catalog: PartitionCatalog | None = None,
+    service_days: dict[str, int] | None = None,
+    max_bytes: int | None = None,
+    max_disk_pct: float | None = None,
+    delete_files_per_sec: float = 0,
+    raw_days: int | None = None,
 ) -> dict:
-    """Prune telemetry partitions older than retention_days.
+    """Prune telemetry partitions by age and disk usage.
 
     Args:
         base_dir: Root telemetry directory (e.g. data/telemetry/).
         retention_days: Number of days to retain. Partitions older than this are pruned.
         dry_run: If True, log what would be pruned without deleting.
         now: Override current time for deterministic testing.
+        catalog: Partition catalog to drop pruned dates and services from.
+        service_days: Per-service retention days overriding retention_days.
+        max_bytes: Prune the oldest dates while the tree is larger than this.
+        max_disk_pct: Prune the oldest dates while the disk is fuller than this.
+        delete_files_per_sec: Unlink rate limit for deletions; 0 for none.
+        raw_days: Downsample retained dates older than this; None keeps raw data.
 
     Returns:
-        Summary dict with scanned, pruned, skipped, and error counts.
+        Summary dict with scanned, pruned, skipped, and error counts. Dates
+        are counted; service prunes, downsampled partitions and bytes freed
+        are logged.
     """
     base = Path(base_dir)
     if now is None:
         now = datetime.now(timezone.utc)
     cutoff = (now - timedelta(days=retention_days)).date()
+    service_cutoffs = {
+        _safe_name(svc): (now - timedelta(days=days)).date()
+        for svc, days in (service_days or {}).items()
+    }
+    # Dates before every cutoff are removed whole; dates before some are
+    # pruned service by service.
+    date_cutoff = min([cutoff, *service_cutoffs.values()])
+    latest_cutoff = max([cutoff, *service_cutoffs.values()])
+    raw_cutoff = (now - timedelta(days=raw_days)).date() if raw_days is not None else None
 
     summary = {"scanned": 0, "pruned": 0, "skipped": 0, "errors": 0}
+    services_pruned = freed = quota_pruned = downsampled = 0
 
     if not base.is_dir():
         logger.info(
@@ -53,8 +204,12 @@ def run_retention(
         )
         return summary
 
+    if not dry_run:
+        _clear_leftovers(base, delete_files_per_sec)
+
+    kept: list[tuple[date, Path]] = []
     for entry in sorted(base.iterdir()):
-        if not entry.is_dir():
+        if not entry.is_dir() or entry.name.startswith(PRUNING_PREFIX):
             continue
         name = entry.name
         summary["scanned"] += 1
@@ -67,7 +222,20 @@ def run_retention(
             summary["skipped"] += 1
             continue
 
-        if partition_date < cutoff:
+        remaining = True
+        if date_cutoff <= partition_date < latest_cutoff:
+            pruned, date_freed, errors, remaining = _prune_services(
+                entry,
+                lambda svc: partition_date < service_cutoffs.get(svc, cutoff),
+                dry_run=dry_run,
+                catalog=catalog,
+                files_per_sec=delete_files_per_sec,
+            )
+            services_pruned += pruned
+            freed += date_freed
+            summary["errors"] += errors
+
+        if partition_date < date_cutoff or not remaining:
             if dry_run:
                 logger.info(
                     "retention_would_prune",
@@ -75,7 +243,9 @@ def run_retention(
                 )
             else:
                 try:
-                    shutil.rmtree(entry)
+                    freed += _prune_dir(entry, delete_files_per_sec)
+                    if catalog is not None:
+                        catalog.remove_date(name)
                     logger.info(
                         "retention_pruned",
                         extra={"fields": {"partition": name}},
@@ -89,7 +259,55 @@ def run_retention(
                     continue
             summary["pruned"] += 1
         else:
-            summary["skipped"] += 1
+            # Counted as skipped or pruned once the quota pass has run.
+            kept.append((partition_date, entry))
+            if raw_cutoff is not None and partition_date < raw_cutoff:
+                if dry_run:
+                    logger.info(
+                        "retention_would_downsample",
+                        extra={"fields": {"partition": name, "raw_cutoff": str(raw_cutoff)}},
+                    )
+                    continue
+                try:
+                    date_downsampled, date_freed = downsample_date(entry, partition_date)
+                except Exception:
+                    logger.exception(
+                        "retention_downsample_error",
+                        extra={"fields": {"partition": name}},
+                    )
+                    summary["errors"] += 1
+                    continue
+                downsampled += date_downsampled
+                freed += date_freed
+
+    if max_bytes is not None or max_disk_pct is not None:
+        tree_bytes = sum(_dir_size(path) for _d, path in kept) if max_bytes is not None else 0
+        disk = shutil.disk_usage(base) if max_disk_pct is not None else None
+        reclaimed = 0
+        for partition_date, entry in kept:
+            over_bytes = max_bytes is not None and tree_bytes - reclaimed > max_bytes
+            over_disk = disk is not None and (disk.used - reclaimed) * 100 > max_disk_pct * disk.total
+            if partition_date >= now.date() or not (over_bytes or over_disk):
+                break
+            name = entry.name
+            fields = {"partition": name, "reason": "bytes" if over_bytes else "disk"}
+            if dry_run:
+                reclaimed += _dir_size(entry)
+                logger.info("retention_would_prune", extra={"fields": fields})
+            else:
+                try:
+                    reclaimed += _prune_dir(entry, delete_files_per_sec)
+                    if catalog is not None:
+                        catalog.remove_date(name)
+                    logger.info("retention_pruned", extra={"fields": fields})
+                except Exception:
+                    logger.exception("retention_prune_error", extra={"fields": fields})
+                    summary["errors"] += 1
+                    continue
+            quota_pruned += 1
+        freed += reclaimed
+    summary["pruned"] += quota_pruned
+    summary["skipped"] += len(kept) - quota_pruned
 
     logger.info(
         "retention_complete",
@@ -98,6 +316,10 @@ def run_retention(
             "cutoff": str(cutoff),
             "dry_run": dry_run,
             **summary,
+            "services_pruned": services_pruned,
+            "quota_pruned": quota_pruned,
+            "downsampled": downsampled,
+            "freed_bytes": freed,
         }},
     )
     return summary
@@ -111,3 +333,114 @@ def get_retention_days() -> int:
         return max(1, days)
     except ValueError:
         return DEFAULT_RETENTION_DAYS
+
+
+def _env_float(name: str) -> float | None:
+    raw = os.getenv(name, "").strip()
+    if not raw:
+        return None
+    try:
+        value = float(raw)
+    except ValueError:
+        logger.warning("retention_config_invalid", extra={"fields": {"name": name, "value": raw}})
+        return None
+    return value if value > 0 else None
+
+
+def _parse_service_days(raw: str) -> dict[str, int]:
+    """Parse "svc=days,svc=days"; malformed entries are logged and skipped."""
+    overrides: dict[str, int] = {}
+    for item in raw.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        svc, sep, days = item.partition("=")
+        try:
+            if not sep or not svc.strip():
+                raise ValueError(item)
+            overrides[svc.strip()] = max(1, int(days))
+        except ValueError:
+            logger.warning(
+                "retention_config_invalid",
+                extra={"fields": {"name": "ARECIBO_RETENTION_SERVICE_DAYS", "value": item}},
+            )
+    return overrides
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    retention_days: int = DEFAULT_RETENTION_DAYS
+    service_days: dict[str, int] = field(default_factory=dict)
+    max_bytes: int | None = None
+    max_disk_pct: float | None = None
+    delete_files_per_sec: float = DEFAULT_DELETE_FILES_PER_SEC
+    raw_days: int | None = None
+    interval_sec: float = DEFAULT_RETENTION_INTERVAL_SEC
+
+    @classmethod
+    def from_env(cls) -> "RetentionPolicy":
+        max_gb = _env_float("ARECIBO_RETENTION_MAX_GB")
+        max_disk_pct = _env_float("ARECIBO_RETENTION_MAX_DISK_PCT")
+        rate_raw = os.getenv("ARECIBO_RETENTION_DELETE_RATE", "").strip()
+        try:
+            # An explicit 0 disables throttling.
+            rate = max(0.0, float(rate_raw)) if rate_raw else DEFAULT_DELETE_FILES_PER_SEC
+        except ValueError:
+            rate = DEFAULT_DELETE_FILES_PER_SEC
+        interval = _env_float("ARECIBO_RETENTION_INTERVAL_SEC")
+        raw_days = _env_float("ARECIBO_RETENTION_RAW_DAYS")
+        return cls(
+            retention_days=get_retention_days(),
+            service_days=_parse_service_days(os.getenv("ARECIBO_RETENTION_SERVICE_DAYS", "")),
+            max_bytes=int(max_gb * 1024 ** 3) if max_gb else None,
+            max_disk_pct=min(max_disk_pct, 100.0) if max_disk_pct else None,
+            delete_files_per_sec=rate,
+            raw_days=max(1, int(raw_days)) if raw_days else None,
+            interval_sec=max(60.0, interval) if interval else DEFAULT_RETENTION_INTERVAL_SEC,
+        )
+
+    def run(self, base_dir: str | Path, *, catalog: PartitionCatalog | None = None) -> dict:
+        return run_retention(
+            base_dir,
+            retention_days=self.retention_days,
+            catalog=catalog,
+            service_days=self.service_days,
+            max_bytes=self.max_bytes,
+            max_disk_pct=self.max_disk_pct,
+            delete_files_per_sec=self.delete_files_per_sec,
+            raw_days=self.raw_days,
+        )
+
+
+class RetentionScheduler:
+    """Runs a maintenance job at start() and then every ``interval_sec``.
+
+    The job runs on a daemon thread, so a slow prune never blocks the event
+    loop or shutdown; a failing run is logged and retried next interval.
+    """
+
+    def __init__(self, job: Callable[[], object], interval_sec: float) -> None:
+        self._job = job
+        self._interval = interval_sec
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="telemetry-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._job()
+            except Exception:
+                logger.exception("retention_run_error")
+            if self._stop.wait(self._interval):
+                return
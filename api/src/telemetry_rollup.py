@@ -0,0 +1,195 @@
+"""Telemetry downsampling module.
+
+Replaces a partition's raw JSONL files with a compact rollup.json once the
+partition is past the raw retention tier, so long windows stay queryable
+without keeping raw heartbeats:
+
+  {
+    "version": 1,
+    "instances": [{"i": <instanceId>, "first": <epoch>, "lastAnnouncedAt": <epoch|null>,
+                   "lastHeartbeatAt": <epoch|null>, "goDark": <bool|null>}, ...],
+    "heartbeats": [{"i": <instanceId>, "h": <hour epoch>, "n": <heartbeats>,
+                    "sums": {<field>: [<sum>, <samples>], ...},
+                    "sketches": {<field>: <DDSketch JSON>, ...}}, ...],
+    "events": [[<minute epoch>, <count>], ...]
+  }
+
+The instance inventory serves fleet-health, heartbeat-freshness and go-dark
+status; hourly heartbeat aggregates (with DDSketches for quantile stats)
+serve container metrics; per-minute counts serve event throughput. Recent
+events and trace lookups need raw batches and find nothing in a rolled-up
+partition. The rollups are built with the reader's own aggregators, so a
+rolled-up day answers the same as the raw day at hourly/minute resolution.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import shutil
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+
+from .telemetry_compaction import COMPACTION_MARKER
+from .telemetry_index import EVENTS_INDEX_FILE, TRACE_INDEX_DIR, evict_event_indexes
+from .telemetry_reader import (
+    ANNOUNCE_FILE,
+    EVENTS_FILE,
+    FLEET_SUMMARY_FILE,
+    HEARTBEAT_FILE,
+    ROLLUP_FILE,
+    ROLLUP_VERSION,
+    _ContainerMetricsAggregator,
+    _EventThroughputAggregator,
+    _GROUP_SAMPLE_FIELDS,
+    _parse_epoch,
+    _read_jsonl,
+)
+
+logger = logging.getLogger("arecibo.telemetry_rollup")
+
+# Raw files a rollup replaces, with the sidecars derived from them.
+_RAW_FILES = (
+    ANNOUNCE_FILE,
+    HEARTBEAT_FILE,
+    EVENTS_FILE,
+    EVENTS_INDEX_FILE,
+    FLEET_SUMMARY_FILE,
+    COMPACTION_MARKER,
+)
+
+_INSTANCE_FIELDS = (
+    "receivedAt",
+    "payload.sentAt",
+    "payload.identity.instanceId",
+    "payload.status.goDark",
+)
+
+
+def _instances(partition_dir: Path) -> list[dict]:
+    inventory: dict[str, dict] = {}
+    for source, field in ((ANNOUNCE_FILE, "lastAnnouncedAt"), (HEARTBEAT_FILE, "lastHeartbeatAt")):
+        for rec in _read_jsonl(partition_dir / source, _INSTANCE_FIELDS):
+            payload = rec.get("payload", {})
+            inst_id = payload.get("identity", {}).get("instanceId")
+            sent_at = payload.get("sentAt") or rec.get("receivedAt")
+            ts = _parse_epoch(sent_at) if sent_at else None
+            if not inst_id or ts is None:
+                continue
+            info = inventory.setdefault(inst_id, {
+                "i": inst_id, "first": ts,
+                "lastAnnouncedAt": None, "lastHeartbeatAt": None, "goDark": None,
+            })
+            info["first"] = min(info["first"], ts)
+            if info[field] is None or ts > info[field]:
+                info[field] = ts
+                if source == HEARTBEAT_FILE:
+                    info["goDark"] = payload.get("status", {}).get("goDark")
+    return [inventory[inst_id] for inst_id in sorted(inventory)]
+
+
+def build_rollup(partition_dir: Path, day: date) -> dict:
+    """Summarize a raw partition for ``day`` into the rollup format."""
+    # Records are filed by receive date; allow a day of clock skew either way.
+    start = datetime.combine(day - timedelta(days=1), time(), tzinfo=timezone.utc)
+    end = start + timedelta(days=3) - timedelta(microseconds=1)
+
+    metrics = _ContainerMetricsAggregator(start, end, bucket_width_sec=3600, sketches=True)
+    for rec in _read_jsonl(partition_dir / HEARTBEAT_FILE, metrics.fields):
+        metrics.feed(HEARTBEAT_FILE, "", "", rec)
+    groups = metrics._groups()
+    sketches = metrics._sketches()
+    heartbeats = []
+    for agg in sorted(groups, key=lambda g: (g["instanceId"], g["bucket"])):
+        key = (agg["bucket"], agg["serviceName"], agg["environment"], agg["instanceId"])
+        heartbeats.append({
+            "i": agg["instanceId"],
+            "h": int(agg["bucket"].timestamp()),
+            "n": agg["heartbeatCount"],
+            "sums": {
+                field: [agg[field], agg[samples]]
+                for field, samples in _GROUP_SAMPLE_FIELDS.items()
+                if agg[samples]
+            },
+            "sketches": {
+                field: sketch.to_json() for field, sketch in sketches.get(key, {}).items()
+            },
+        })
+
+    throughput = _EventThroughputAggregator(start, end, bucket_width_sec=60)
+    for rec in _read_jsonl(partition_dir / EVENTS_FILE, throughput.fields):
+        throughput.feed(EVENTS_FILE, "", "", rec)
+    throughput._flush()
+    start_ts = int(start.timestamp())
+    events = [
+        [start_ts + bucket_index * 60, count]
+        for bucket_index, count in sorted(throughput.buckets.items())
+    ]
+
+    return {
+        "version": ROLLUP_VERSION,
+        "instances": _instances(partition_dir),
+        "heartbeats": heartbeats,
+        "events": events,
+    }
+
+
+def _size(path: Path) -> int:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+
+def _has_raw_files(partition_dir: Path) -> bool:
+    return any((partition_dir / name).exists() for name in _RAW_FILES)
+
+
+def downsample_partition(partition_dir: Path, day: date) -> int:
+    """Write a partition's rollup, then delete its raw files; return bytes freed.
+
+    An existing rollup is kept, so a run interrupted after writing it only
+    finishes the deletes.
+    """
+    rollup_path = partition_dir / ROLLUP_FILE
+    freed = 0
+    if not rollup_path.exists():
+        rollup = build_rollup(partition_dir, day)
+        tmp = partition_dir / f".{ROLLUP_FILE}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(rollup, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, rollup_path)
+        freed -= _size(rollup_path)
+    for name in _RAW_FILES:
+        path = partition_dir / name
+        freed += _size(path)
+        path.unlink(missing_ok=True)
+    evict_event_indexes(partition_dir)
+    return max(freed, 0)
+
+
+def downsample_date(date_dir: Path, day: date) -> tuple[int, int]:
+    """Downsample every partition of a date; return (partitions, bytes freed).
+
+    The date's trace index is dropped with the raw batches it points into.
+    """
+    downsampled = freed = 0
+    for svc_dir in sorted(date_dir.iterdir()):
+        if svc_dir.name.startswith("@") or not svc_dir.is_dir():
+            continue
+        for partition_dir in sorted(svc_dir.iterdir()):
+            if not partition_dir.is_dir() or not _has_raw_files(partition_dir):
+                continue
+            freed += downsample_partition(partition_dir, day)
+            downsampled += 1
+            logger.info(
+                "rollup_written",
+                extra={"fields": {"partition": str(partition_dir.relative_to(date_dir.parent))}},
+            )
+    trace_dir = date_dir / TRACE_INDEX_DIR
+    if trace_dir.is_dir():
+        shutil.rmtree(trace_dir)
+    return downsampled, freed
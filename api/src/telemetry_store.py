@@ -7,6 +7,11 @@ Layout:
   data/telemetry/{YYYY-MM-DD}/{serviceName}/{environment}/announce.jsonl
   data/telemetry/{YYYY-MM-DD}/{serviceName}/{environment}/heartbeat.jsonl
   data/telemetry/{YYYY-MM-DD}/{serviceName}/{environment}/events.jsonl
+  data/telemetry/{YYYY-MM-DD}/{serviceName}/{environment}/events.idx.jsonl
+  data/telemetry/{YYYY-MM-DD}/@traces/{bucket}.jsonl
+
+events.idx.jsonl indexes event batches by type, severity and tag, and
+@traces/ maps traceIds to batches; see telemetry_index.py.
 """
 
 from __future__ import annotations
@@ -17,6 +22,18 @@ import os
 import re
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .telemetry_index import (
+    EVENTS_INDEX_FILE,
+    TRACE_INDEX_DIR,
+    index_entry,
+    trace_bucket,
+    trace_ids,
+)
+
+if TYPE_CHECKING:
+    from .telemetry_catalog import PartitionCatalog
 
 logger = logging.getLogger("arecibo.telemetry_store")
 
@@ -40,26 +57,41 @@ def _today_str() -> str:
 class TelemetryStore:
     """Append-only JSONL telemetry storage with date/service/env partitions."""
 
-    def __init__(self, base_dir: str | Path) -> None:
+    def __init__(self, base_dir: str | Path, catalog: PartitionCatalog | None = None) -> None:
         self._base = Path(base_dir)
         self._base.mkdir(parents=True, exist_ok=True)
+        self._catalog = catalog
 
     def _partition_dir(self, date_str: str, service_name: str, environment: str) -> Path:
         return self._base / date_str / _safe_name(service_name) / _safe_name(environment)
 
-    def _append(self, partition: Path, filename: str, record: dict) -> None:
-        """Append a single JSON line to a JSONL file. Failures are logged, not raised."""
+    def _append(self, partition: Path, filename: str, record: dict) -> tuple[int, int] | None:
+        """Append a record to a partition file and register the partition."""
+        span = self._append_line(partition, filename, record)
+        if span is not None and self._catalog is not None:
+            date_str, service_dir, env_dir = partition.parts[-3:]
+            self._catalog.add(date_str, service_dir, env_dir)
+        return span
+
+    def _append_line(self, partition: Path, filename: str, record: dict) -> tuple[int, int] | None:
+        """Append a single JSON line to a JSONL file. Failures are logged, not raised.
+
+        Returns the (start, end) byte offsets of the written line, or None on failure.
+        """
         try:
             partition.mkdir(parents=True, exist_ok=True)
             filepath = partition / filename
-            line = json.dumps(record, separators=(",", ":")) + "\n"
-            with open(filepath, "a", encoding="utf-8") as f:
+            line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+            with open(filepath, "ab") as f:
+                offset = f.tell()
                 f.write(line)
+            return offset, offset + len(line)
         except Exception:
             logger.exception(
                 "telemetry_write_failed",
                 extra={"fields": {"partition": str(partition), "filename": filename}},
             )
+            return None
 
     def store_announce(self, payload: dict) -> None:
         identity = payload.get("identity", {})
@@ -103,7 +135,18 @@ class TelemetryStore:
             "receivedAt": _utc_now_iso(),
             "payload": payload,
         }
-        self._append(partition, "events.jsonl", record)
+        span = self._append(partition, "events.jsonl", record)
+        if span is None:
+            return
+        self._append_line(partition, EVENTS_INDEX_FILE, index_entry(payload, *span))
+        trace_dir = self._base / date_str / TRACE_INDEX_DIR
+        for trace_id in trace_ids(payload):
+            self._append_line(trace_dir, trace_bucket(trace_id), {
+                "t": trace_id,
+                "s": partition.parent.name,
+                "e": partition.name,
+                "o": span[0],
+            })
 
     @property
     def base_dir(self) -> Path:
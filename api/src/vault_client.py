@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import os
+import threading
 from functools import lru_cache
 from typing import Any
 
@@ -19,6 +20,9 @@ class VaultClient:
         self._vault_addr: str | None = None
         self._role_id: str | None = None
         self._secret_id: str | None = None
+        # hvac clients are not thread-safe; the startup key fetch can still be
+        # running on its own thread when the key refresher starts reading.
+        self._lock = threading.Lock()
         self._init_client()
 
     def _init_client(self) -> None:
@@ -29,7 +33,7 @@ class VaultClient:
             logger.warning("Vault credentials not configured; runtime secret fetch disabled.")
             return
         self._vault_configured = True
-        self._authenticate()
+        # Login happens on first read, so constructing the client never waits on Vault.
 
     def _authenticate(self) -> bool:
         try:
@@ -58,20 +62,29 @@ class VaultClient:
         cache_key = f"{path}:{key}"
         if cache_key in self._cache:
             return self._cache[cache_key]
+        return self.read_secret(path, key)
 
-        if not self._ensure_authenticated():
-            return None
+    def read_secret(self, path: str, key: str) -> str | None:
+        """Read a secret from Vault, bypassing and then updating the cache.
 
-        try:
-            response = self.client.secrets.kv.v2.read_secret_version(path=path, mount_point="secret")
-            data = response["data"]["data"]
-            result = data.get(key)
-            if isinstance(result, str):
-                self._cache[cache_key] = result
-                return result
-        except Exception as exc:
-            logger.warning("Vault read failed for secret/%s key %s: %s", path, key, exc)
-        return None
+        Reads are serialized: a caller waits for any read in progress.
+        """
+        with self._lock:
+            if not self._ensure_authenticated():
+                return None
+
+            try:
+                response = self.client.secrets.kv.v2.read_secret_version(
+                    path=path, mount_point="secret",
+                )
+                data = response["data"]["data"]
+                result = data.get(key)
+                if isinstance(result, str):
+                    self._cache[f"{path}:{key}"] = result
+                    return result
+            except Exception as exc:
+                logger.warning("Vault read failed for secret/%s key %s: %s", path, key, exc)
+            return None
 
 
 @lru_cache(maxsize=1)
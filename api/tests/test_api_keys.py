@@ -0,0 +1,140 @@
+"""Tests for API key refresh and rotation."""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from types import SimpleNamespace
+
+
+def _import_src():
+    import sys
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+
+
+class TestStartupKeys:
+    def test_slow_vault_falls_back_to_cache_file(self, tmp_path):
+        _import_src()
+        from src.api_keys import load_startup_keys, write_key_cache
+
+        cache = tmp_path / "keys.cache"
+        write_key_cache(cache, {"cached-key"})
+        release = threading.Event()
+
+        def slow_fetch():
+            release.wait(5)
+            return frozenset({"vault-key"})
+
+        started = time.monotonic()
+        keys, from_cache = load_startup_keys(slow_fetch, str(cache), timeout_sec=0.1)
+        release.set()
+
+        assert time.monotonic() - started < 2
+        assert keys == {"cached-key"} and from_cache is True
+        assert os.stat(cache).st_mode & 0o777 == 0o600
+
+    def test_vault_keys_are_cached_for_next_start(self, tmp_path):
+        _import_src()
+        from src.api_keys import load_startup_keys, read_key_cache
+
+        cache = tmp_path / "keys.cache"
+        keys, from_cache = load_startup_keys(lambda: frozenset({"a", "b"}), str(cache))
+        assert keys == {"a", "b"} and from_cache is False
+        assert read_key_cache(cache) == {"a", "b"}
+
+        def failing_fetch():
+            raise ConnectionError("vault down")
+
+        assert load_startup_keys(failing_fetch, str(cache)) == ({"a", "b"}, True)
+        assert load_startup_keys(failing_fetch, None) == (frozenset(), False)
+
+
+    def test_refresh_waits_for_timed_out_startup_fetch(self, tmp_path, monkeypatch):
+        _import_src()
+        from src.api_keys import (
+            ApiKeyRefresher, ApiKeySet, load_startup_keys, vault_key_fetcher, write_key_cache,
+        )
+        from src.vault_client import VaultClient
+
+        active, overlaps = [], []
+        release = threading.Event()
+
+        def read_secret_version(path, mount_point):
+            overlaps.append(len(active))
+            active.append(path)
+            release.wait(5)
+            active.remove(path)
+            return {"data": {"data": {"api_keys": "vault-key"}}}
+
+        monkeypatch.delenv("VAULT_ADDR", raising=False)
+        vault = VaultClient()
+        vault._vault_configured = True
+        vault.client = SimpleNamespace(
+            is_authenticated=lambda: True,
+            secrets=SimpleNamespace(kv=SimpleNamespace(
+                v2=SimpleNamespace(read_secret_version=read_secret_version),
+            )),
+        )
+
+        cache = tmp_path / "keys.cache"
+        write_key_cache(cache, {"cached-key"})
+        fetch = vault_key_fetcher(vault, "arecibo", "api_keys")
+        keys, from_cache = load_startup_keys(fetch, str(cache), timeout_sec=0.1)
+        assert from_cache is True
+
+        key_set = ApiKeySet(keys)
+        refresher = ApiKeyRefresher(fetch, key_set, 60, refresh_now=True)
+        refresher.start()
+        time.sleep(0.2)
+        release.set()
+        deadline = time.monotonic() + 5
+        while "vault-key" not in key_set and time.monotonic() < deadline:
+            time.sleep(0.01)
+        refresher.stop()
+
+        assert "vault-key" in key_set
+        assert overlaps == [0, 0]
+
+
+class TestApiKeyRefresher:
+    def test_refresh_swaps_keys_and_backs_off_on_failure(self, tmp_path):
+        _import_src()
+        from src.api_keys import REFRESH_RETRY_SEC, ApiKeyRefresher, ApiKeySet, read_key_cache
+
+        responses = [frozenset({"new-key"}), ConnectionError("vault down"), frozenset()]
+
+        def fetch():
+            response = responses.pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        keys = ApiKeySet({"old-key"})
+        cache = tmp_path / "keys.cache"
+        refresher = ApiKeyRefresher(fetch, keys, 300, cache_file=str(cache))
+
+        assert refresher.refresh_once() is True
+        assert "new-key" in keys and "old-key" not in keys
+        assert read_key_cache(cache) == {"new-key"}
+
+        assert refresher.refresh_once() is False
+        assert refresher.refresh_once() is False
+        assert "new-key" in keys
+
+        first = refresher.next_delay(False)
+        second = refresher.next_delay(False)
+        assert 0.9 * REFRESH_RETRY_SEC <= first <= 1.1 * REFRESH_RETRY_SEC
+        assert 1.8 * REFRESH_RETRY_SEC <= second <= 2.2 * REFRESH_RETRY_SEC
+        assert 270 <= refresher.next_delay(True) <= 330
+
+
+def test_rotated_key_is_accepted_without_restart(client, auth_headers):
+    assert client.get("/stats", headers=auth_headers).status_code == 200
+
+    client.app.state.api_keys.replace({"rotated-key"})
+
+    assert client.get("/stats", headers=auth_headers).status_code == 401
+    assert client.get("/stats", headers={"X-API-Key": "rotated-key"}).status_code == 200
@@ -0,0 +1,182 @@
+"""Tests for server-side policy sampling of event batches."""
+
+from __future__ import annotations
+
+
+def _import_src():
+    import sys, os
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+
+
+def _policy(**overrides) -> dict:
+    return {
+        "policyVersion": "1.0.0",
+        "serviceName": "web",
+        "environment": "prod",
+        "enabled": True,
+        "defaultSampleRate": 1.0,
+        "heartbeatIntervalSec": 30,
+        **overrides,
+    }
+
+
+def _events(event_type: str, count: int, **fields) -> list[dict]:
+    return [
+        {"ts": "2026-03-01T10:00:00Z", "type": event_type, "payload": {}, **fields}
+        for _ in range(count)
+    ]
+
+
+class TestEventShedder:
+    def test_keep_all_policy_passes_batch_through(self):
+        _import_src()
+        from src.event_filter import EventFilter, EventShedder
+
+        shedder = EventShedder()
+        events = _events("request", 5)
+        assert shedder.filter_events("web", "prod", EventFilter(_policy()), events) is events
+        assert shedder.stats()["eventsAccepted"] == 5
+        assert shedder.stats()["eventsShed"] == 0
+
+    def test_disabled_drop_sample_and_rate_limit(self):
+        _import_src()
+        from src.event_filter import EventFilter, EventShedder
+
+        event_filter = EventFilter(_policy(
+            defaultSampleRate=0.5,
+            eventOverrides={
+                "debug": {"drop": True},
+                "request": {"sampleRate": 1.0, "maxPerMinute": 3},
+            },
+        ))
+        shedder = EventShedder()
+        events = (
+            _events("debug", 4)
+            + _events("request", 5)
+            + _events("trace", 100, traceId="t-1")
+        )
+
+        kept = shedder.filter_events("web", "prod", event_filter, events, now=600)
+        # A trace is sampled as a whole, so its 100 events share one outcome.
+        traced = [e for e in kept if e["type"] == "trace"]
+        assert len(traced) in (0, 100)
+        assert [e["type"] for e in kept if e["type"] != "trace"] == ["request"] * 3
+
+        again = shedder.filter_events("web", "prod", event_filter, _events("request", 2), now=660)
+        assert len(again) == 2
+
+        stats = shedder.stats()
+        assert stats["shedByReason"]["dropped"] == 4
+        assert stats["shedByReason"]["rateLimited"] == 2
+        assert stats["shedByReason"]["sampled"] == 100 - len(traced)
+        assert stats["eventsShed"] == stats["shedByPartition"]["web/prod"]
+        assert stats["eventsAccepted"] == len(kept) + 2
+
+        disabled = EventFilter(_policy(enabled=False))
+        assert shedder.filter_events("web", "prod", disabled, _events("request", 3)) == []
+        assert shedder.stats()["shedByReason"]["disabled"] == 3
+
+
+    def test_state_for_client_supplied_names_stays_bounded(self):
+        _import_src()
+        from src import event_filter as ef
+
+        drop_all = ef.EventFilter(_policy(enabled=False))
+        limited = ef.EventFilter(_policy(eventOverrides={"request": {"maxPerMinute": 1}}))
+        shedder = ef.EventShedder()
+        for i in range(ef.MAX_SHED_PARTITIONS + 5):
+            shedder.filter_events(f"svc-{i}", "prod", drop_all, _events("request", 1), now=600)
+            shedder.filter_events(f"svc-{i}", "prod", limited, _events("request", 1), now=600)
+        by_partition = shedder.stats()["shedByPartition"]
+        assert len(by_partition) == ef.MAX_SHED_PARTITIONS + 1
+        assert by_partition[ef.OTHER_PARTITION] == 5
+        assert len(shedder._windows) == ef.MAX_SHED_PARTITIONS + 5
+
+        # A new minute drops every finished window.
+        shedder.filter_events("svc-0", "prod", limited, _events("request", 2), now=660)
+        assert len(shedder._windows) == 1
+
+    def test_invalid_sampling_fields_are_rejected(self):
+        _import_src()
+        import pytest
+
+        from src.event_filter import EventFilter
+
+        for bad in (
+            {"eventOverrides": {"debug": "drop"}},
+            {"eventOverrides": {"debug": {"sampleRate": "half"}}},
+            {"eventOverrides": {"debug": {"maxPerMinute": 1.5}}},
+            {"defaultSampleRate": 2},
+            {"enabled": "no"},
+        ):
+            with pytest.raises(ValueError):
+                EventFilter(_policy(**bad))
+
+
+def _client(monkeypatch, tmp_path):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setenv("ARECIBO_TELEMETRY_ROOT", str(tmp_path / "telemetry"))
+    _import_src()
+    from src.app import create_app
+
+    return TestClient(create_app())
+
+
+def _stored_event_types(tmp_path) -> list[str]:
+    import json
+
+    [events_file] = (tmp_path / "telemetry").glob("*/web/prod/events.jsonl")
+    records = [json.loads(line) for line in events_file.read_text().splitlines()]
+    return [e["type"] for record in records for e in record["payload"]["events"]]
+
+
+def test_events_batch_fails_open_on_broken_policy(
+    monkeypatch, tmp_path, auth_headers, sample_events_batch,
+):
+    import json
+    import os
+
+    policy_dir = tmp_path / "policies" / "web"
+    policy_dir.mkdir(parents=True)
+    tags = {"serviceName": "web", "environment": "prod"}
+    sample_events_batch["events"] = _events("debug", 2, tags=tags)
+    with _client(monkeypatch, tmp_path) as client:
+        (policy_dir / "prod.json").write_text("{not json")
+        first = client.post("/events:batch", json=sample_events_batch, headers=auth_headers)
+        assert first.status_code == 202
+
+        bad = _policy(eventOverrides={"debug": {"drop": True, "maxPerMinute": "ten"}})
+        (policy_dir / "prod.json").write_text(json.dumps(bad))
+        os.utime(policy_dir / "prod.json", ns=(1, 1))
+        client.app.state.policy_store.check_interval_sec = 0
+        second = client.post("/events:batch", json=sample_events_batch, headers=auth_headers)
+        assert second.status_code == 202
+
+    [events_file] = (tmp_path / "telemetry").glob("*/web/prod/events.jsonl")
+    assert len(events_file.read_text().splitlines()) == 2
+    assert _stored_event_types(tmp_path) == ["debug", "debug", "debug", "debug"]
+
+
+def test_events_batch_applies_stored_policy(
+    monkeypatch, tmp_path, auth_headers, sample_events_batch,
+):
+    tags = {"serviceName": "web", "environment": "prod"}
+    sample_events_batch["events"] = (
+        _events("debug", 3, tags=tags) + _events("request", 2, tags=tags)
+    )
+    with _client(monkeypatch, tmp_path) as client:
+        client.put(
+            "/policy?serviceName=web&environment=prod",
+            headers=auth_headers,
+            json=_policy(eventOverrides={"debug": {"drop": True}}),
+        )
+        response = client.post("/events:batch", json=sample_events_batch, headers=auth_headers)
+        assert response.status_code == 202
+        stats = client.get("/stats", headers=auth_headers).json()["eventShedding"]
+
+    assert stats["shedByReason"]["dropped"] == 3
+    assert stats["shedByPartition"] == {"web/prod": 3}
+    assert _stored_event_types(tmp_path) == ["request", "request"]
@@ -33,6 +33,99 @@ def test_upsert_then_fetch_policy(client, auth_headers):
     assert body["policy"]["environment"] == "local"
 
 
+def test_policy_etag_revalidation(client, auth_headers):
+    url = "/policy?serviceName=demo-service&environment=local"
+    client.put(url, headers=auth_headers, json=_sample_policy())
+
+    first = client.get(url, headers=auth_headers)
+    etag = first.headers["ETag"]
+    assert etag.startswith('"') and etag.endswith('"')
+    assert first.headers["Cache-Control"] == f"private, max-age={first.json()['ttlSec']}"
+
+    unchanged = client.get(url, headers={**auth_headers, "If-None-Match": f'"other", {etag}'})
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["ETag"] == etag
+    assert unchanged.headers["Cache-Control"] == first.headers["Cache-Control"]
+
+    client.put(url, headers=auth_headers, json={**_sample_policy(), "defaultSampleRate": 0.5})
+    changed = client.get(url, headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.json()["policy"]["defaultSampleRate"] == 0.5
+
+
+def test_policy_long_poll_returns_on_change_or_timeout(client, auth_headers):
+    import threading
+    import time
+
+    url = "/policy?serviceName=demo-service&environment=local"
+    client.put(url, headers=auth_headers, json=_sample_policy())
+    etag = client.get(url, headers=auth_headers).headers["ETag"]
+    conditional = {**auth_headers, "If-None-Match": etag}
+
+    started = time.monotonic()
+    timed_out = client.get(f"{url}&waitSec=1", headers=conditional)
+    assert timed_out.status_code == 304
+    assert time.monotonic() - started >= 1
+
+    result = {}
+    waiter = threading.Thread(
+        target=lambda: result.update(response=client.get(f"{url}&waitSec=30", headers=conditional)),
+    )
+    started = time.monotonic()
+    waiter.start()
+    time.sleep(0.2)
+    client.put(url, headers=auth_headers, json={**_sample_policy(), "enabled": False})
+    waiter.join(timeout=10)
+
+    assert time.monotonic() - started < 5
+    assert result["response"].status_code == 200
+    assert result["response"].json()["policy"]["enabled"] is False
+
+
+def test_heartbeat_with_stale_policy_version_gets_policy_changed(
+    client, auth_headers, sample_heartbeat,
+):
+    client.put(
+        "/policy?serviceName=demo-service&environment=local",
+        headers=auth_headers,
+        json={**_sample_policy(), "policyVersion": "2.0.0"},
+    )
+
+    sample_heartbeat["status"]["policyVersion"] = "1.0.0"
+    stale = client.post("/heartbeat", json=sample_heartbeat, headers=auth_headers).json()
+    assert stale["result"]["status"] == "directive"
+    assert stale["result"]["directives"] == [{"type": "POLICY_CHANGED", "value": "2.0.0"}]
+
+    sample_heartbeat["status"]["policyVersion"] = "2.0.0"
+    current = client.post("/heartbeat", json=sample_heartbeat, headers=auth_headers).json()
+    assert current["result"]["status"] == "ok"
+    assert "directives" not in current["result"]
+
+
+def test_heartbeat_policy_check_tolerates_missing_version_and_bad_file(
+    client, auth_headers, sample_heartbeat,
+):
+    client.put(
+        "/policy?serviceName=demo-service&environment=local",
+        headers=auth_headers,
+        json=_sample_policy(),
+    )
+    assert "policyVersion" not in sample_heartbeat["status"]
+    body = client.post("/heartbeat", json=sample_heartbeat, headers=auth_headers).json()
+    assert body["result"]["status"] == "ok"
+
+    policy_root = client.app.state.policy_store.policy_root_dir
+    with open(f"{policy_root}/demo-service/local.json", "w", encoding="utf-8") as handle:
+        handle.write("{not json")
+    client.app.state.policy_store.check_interval_sec = 0
+    sample_heartbeat["status"]["policyVersion"] = "0.9.0"
+    response = client.post("/heartbeat", json=sample_heartbeat, headers=auth_headers)
+    assert response.status_code == 202
+    assert response.json()["result"]["status"] == "ok"
+
+
 def test_unknown_service_environment_returns_contract_error_result(client, auth_headers):
     response = client.get(
         "/policy?serviceName=unknown-service&environment=local",
@@ -76,3 +169,177 @@ def test_put_policy_rejects_mismatched_body_and_query(
     assert response.status_code == 400
     body = response.json()
     assert body["result"]["error"]["code"] == "policy_mismatch"
+
+
+def _policy_store(tmp_path, **kwargs):
+    import os, sys
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+    from src.policy_store import PolicyStore
+
+    return PolicyStore(60, str(tmp_path / "policies"), **kwargs)
+
+
+def test_policy_lookups_are_served_from_cache(tmp_path):
+    from unittest.mock import patch
+
+    store = _policy_store(tmp_path, check_interval_sec=60)
+    store.put_policy("demo-service", "local", _sample_policy())
+    first = store.get_cached("demo-service", "local")
+
+    with patch("src.policy_store.os.stat", side_effect=AssertionError("stat")), \
+            patch("pathlib.Path.open", side_effect=AssertionError("open")):
+        for _ in range(100):
+            assert store.get_cached("demo-service", "local") is first
+    assert first.response["policy"] == _sample_policy()
+    assert first.response["transponderSessionId"] == store.get_session_id("demo-service", "local")
+
+
+def test_policy_cache_notices_external_edits(tmp_path):
+    import json
+
+    store = _policy_store(tmp_path, check_interval_sec=0)
+    store.put_policy("demo-service", "local", _sample_policy())
+    before = store.get_cached("demo-service", "local")
+    assert store.get_cached("demo-service", "local") is before
+
+    edited = {**_sample_policy(), "defaultSampleRate": 0.5}
+    path = tmp_path / "policies" / "demo-service" / "local.json"
+    tmp = path.with_suffix(".edit")
+    tmp.write_text(json.dumps(edited))
+    tmp.replace(path)
+    after = store.get_cached("demo-service", "local")
+    assert after.policy["defaultSampleRate"] == 0.5
+    assert after.version != before.version
+
+    path.unlink()
+    assert store.lookup_policy("demo-service", "local") is None
+
+    store.put_policy("demo-service", "local", _sample_policy())
+    assert store.get_cached("demo-service", "local").version == before.version
+    assert store.delete_policy("demo-service", "local")
+    assert store.lookup_policy("demo-service", "local") is None
+
+
+def test_bulk_write_then_list_policies(client, auth_headers):
+    policies = [
+        _sample_policy("web", "prod"),
+        _sample_policy("web", "staging"),
+        _sample_policy("api", "prod"),
+    ]
+    response = client.put("/policies", headers=auth_headers, json={"policies": policies})
+    assert response.status_code == 200
+    assert response.json()["result"]["status"] == "ok"
+
+    listing = client.get("/policies", headers=auth_headers).json()
+    assert [(p["serviceName"], p["environment"]) for p in listing["policies"]] == [
+        ("api", "prod"), ("web", "prod"), ("web", "staging"),
+    ]
+    single = client.get("/policy?serviceName=web&environment=prod", headers=auth_headers)
+    assert listing["policies"][1]["etag"] == single.headers["ETag"]
+
+    web = client.get("/policies?serviceName=web", headers=auth_headers).json()
+    assert [p["environment"] for p in web["policies"]] == ["prod", "staging"]
+    assert client.get("/policies?serviceName=none", headers=auth_headers).json()["policies"] == []
+
+
+def test_bulk_write_rejects_whole_batch(client, auth_headers):
+    invalid = {**_sample_policy("web", "staging"), "defaultSampleRate": "all"}
+    response = client.put(
+        "/policies",
+        headers=auth_headers,
+        json={"policies": [_sample_policy("web", "prod"), invalid]},
+    )
+    assert response.status_code == 400
+
+    response = client.put(
+        "/policies",
+        headers=auth_headers,
+        json={"policies": [_sample_policy("web", "prod"), _sample_policy("web", "prod")]},
+    )
+    assert response.status_code == 400
+    assert response.json()["result"]["error"]["code"] == "duplicate_policy"
+    assert client.get("/policies", headers=auth_headers).json()["policies"] == []
+
+
+def test_bulk_write_failure_leaves_policies_untouched(tmp_path):
+    import json
+    from unittest.mock import patch
+
+    import pytest
+
+    store = _policy_store(tmp_path)
+    store.put_policy("web", "prod", _sample_policy("web", "prod"))
+    real_dumps = json.dumps
+    calls = []
+
+    def failing_dumps(value, **kwargs):
+        calls.append(value)
+        if len(calls) == 2:
+            raise OSError("disk full")
+        return real_dumps(value, **kwargs)
+
+    changed = {**_sample_policy("web", "prod"), "enabled": False}
+    with pytest.raises(OSError), \
+            patch("src.policy_store.json.dumps", side_effect=failing_dumps):
+        store.put_policies([
+            ("web", "prod", changed),
+            ("web", "staging", _sample_policy("web", "staging")),
+        ])
+
+    assert [(svc, env) for svc, env, _ in store.list_policies()] == [("web", "prod")]
+    assert store.get_cached("web", "prod").policy["enabled"] is True
+    assert not list((tmp_path / "policies").rglob("*.tmp"))
+
+
+def test_bulk_write_rename_failure_keeps_earlier_policies(tmp_path):
+    from pathlib import Path
+    from unittest.mock import patch
+
+    import pytest
+
+    store = _policy_store(tmp_path)
+    real_replace = Path.replace
+    calls = []
+
+    def failing_replace(self, target):
+        calls.append(target)
+        if len(calls) == 2:
+            raise OSError("rename failed")
+        return real_replace(self, target)
+
+    with pytest.raises(OSError), patch.object(Path, "replace", failing_replace):
+        store.put_policies([
+            ("web", "prod", _sample_policy("web", "prod")),
+            ("web", "staging", _sample_policy("web", "staging")),
+        ])
+
+    assert [(svc, env) for svc, env, _ in store.list_policies()] == [("web", "prod")]
+    assert store.get_cached("web", "prod") is not None
+    assert store.get_cached("web", "staging") is None
+    assert not list((tmp_path / "policies").rglob("*.tmp"))
+
+
+def test_policy_waiters_notice_external_edits(tmp_path):
+    import asyncio
+    import json
+
+    store = _policy_store(tmp_path, check_interval_sec=0.05)
+    store.put_policy("demo-service", "local", _sample_policy())
+    etag = store.get_cached("demo-service", "local").etag
+
+    async def edit_then_wait():
+        async def edit():
+            await asyncio.sleep(0.1)
+            path = tmp_path / "policies" / "demo-service" / "local.json"
+            path.write_text(json.dumps({**_sample_policy(), "enabled": False}))
+
+        task = asyncio.create_task(edit())
+        changed = await store.wait_for_change("demo-service", "local", etag, 5)
+        await task
+        return changed
+
+    changed = asyncio.run(edit_then_wait())
+    assert changed.policy["enabled"] is False
+    assert store._watchers == {}
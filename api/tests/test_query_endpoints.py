@@ -102,9 +102,10 @@ def _seed_heartbeat(
 def _seed_events(
     tel_dir: Path, date: str, svc: str, env: str,
     events: list[dict], batch_id: str = "b-001", session_id: str = "s-001",
+    received_at: str | None = None,
 ):
     _write_jsonl(tel_dir / date / svc / env / "events.jsonl", [{
-        "receivedAt": f"{date}T12:00:00Z",
+        "receivedAt": received_at or f"{date}T12:00:00Z",
         "payload": {
             "transponderSessionId": session_id,
             "batchId": batch_id,
@@ -788,3 +789,1046 @@ class TestCrossPartition:
         body = resp.json()
         assert len(body["data"]) == 1
         assert body["data"][0]["type"] == "late"
+
+
+# ---- Batch queries ----
+
+class TestQueryBatch:
+    def _seed_metrics(self, tel_dir):
+        for i, ts in enumerate(("2026-03-03T12:00:10Z", "2026-03-03T12:00:20Z")):
+            _seed_heartbeat(
+                tel_dir, "2026-03-03", "svc", "prod", f"i-{i}", ts,
+                status_overrides={
+                    "containerRxBytesSinceLastHeartbeat": 100,
+                    "containerTxBytesSinceLastHeartbeat": 50,
+                },
+            )
+
+    def test_results_match_individual_queries(self, query_client, auth):
+        client, tel_dir = query_client
+        self._seed_metrics(tel_dir)
+        params = {
+            "start": "2026-03-03T12:00:00Z",
+            "end": "2026-03-03T12:01:00Z",
+            "bucketWidthSec": 30,
+        }
+        resp = client.post(
+            "/query/batch",
+            headers=auth,
+            json={
+                "start": params["start"],
+                "end": params["end"],
+                "queries": [
+                    {"id": "container", "query": "container-metrics",
+                     "params": {"bucketWidthSec": 30}},
+                    {"id": "fleet", "query": "container-metrics",
+                     "params": {"bucketWidthSec": 30, "rollup": "fleet"}},
+                    {"id": "dark", "query": "go-dark-status"},
+                ],
+            },
+        )
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["meta"]["totalQueries"] == 3
+        by_id = {r["id"]: r for r in body["results"]}
+
+        single = client.get("/query/container-metrics", headers=auth, params=params).json()
+        assert by_id["container"]["data"] == single["data"]
+        fleet = client.get(
+            "/query/container-metrics", headers=auth, params={**params, "rollup": "fleet"},
+        ).json()
+        assert by_id["fleet"]["data"] == fleet["data"]
+        assert by_id["fleet"]["meta"]["rollup"] == "fleet"
+        assert by_id["dark"]["meta"]["totalRows"] == 2
+
+    def test_reads_each_partition_file_once(self, query_client, auth):
+        client, tel_dir = query_client
+        self._seed_metrics(tel_dir)
+        from src.telemetry_reader import TelemetryReader
+
+        reads: list[str] = []
+        original = TelemetryReader._read_jsonl
+
+        def counting_read(self, filepath, fields=None):
+            reads.append(str(filepath))
+            return original(self, filepath, fields)
+
+        queries = [
+            {"id": f"q{i}", "query": "container-metrics",
+             "params": {"rollup": rollup}, "fields": ["bucket", "networkRxBytes"]}
+            for i, rollup in enumerate(("container", "container", "service", "fleet"))
+        ]
+        with patch.object(TelemetryReader, "_read_jsonl", counting_read):
+            resp = client.post(
+                "/query/batch",
+                headers=auth,
+                json={
+                    "start": "2026-03-03T12:00:00Z",
+                    "end": "2026-03-03T12:01:00Z",
+                    "queries": queries,
+                },
+            )
+        assert resp.status_code == 200
+        assert len(reads) == len(set(reads)) == 1
+        rows = resp.json()["results"][0]["data"]
+        assert rows and all(set(row) <= {"bucket", "networkRxBytes"} for row in rows)
+
+    def test_rejects_param_not_valid_for_query(self, query_client, auth):
+        client, _ = query_client
+        resp = client.post(
+            "/query/batch",
+            headers=auth,
+            json={"queries": [
+                {"id": "a", "query": "fleet-health", "params": {"rollup": "fleet"}},
+            ]},
+        )
+        assert resp.status_code == 400
+        assert resp.json()["result"]["error"]["code"] == "validation_error"
+
+    def test_rejects_duplicate_ids(self, query_client, auth):
+        client, _ = query_client
+        resp = client.post(
+            "/query/batch",
+            headers=auth,
+            json={"queries": [
+                {"id": "a", "query": "fleet-health"},
+                {"id": "a", "query": "go-dark-status"},
+            ]},
+        )
+        assert resp.status_code == 400
+
+
+# ---- Parallel partition scan ----
+
+class TestParallelScan:
+    def _seed(self, tel_dir):
+        for day in ("2026-03-01", "2026-03-02", "2026-03-03"):
+            for svc in ("svc-a", "svc-b"):
+                for minute in range(3):
+                    for inst in ("i-1", "i-2"):
+                        _seed_heartbeat(
+                            tel_dir, day, svc, "prod", f"{svc}-{inst}",
+                            f"{day}T12:{minute:02d}:{10 if inst == 'i-1' else 40}Z",
+                            go_dark=(minute == 2 and inst == "i-2"),
+                            status_overrides={
+                                "containerRxBytesSinceLastHeartbeat": 100 + minute,
+                                "containerMemoryCurrentBytes": 1000 * (minute + 1),
+                                "transponderCpuUserSec": 1.0 + minute,
+                                "transponderCpuSystemSec": 0.5 + minute,
+                            },
+                        )
+                _seed_announce(tel_dir, day, svc, "prod", f"{svc}-i-1", f"{day}T11:59:00Z")
+                _seed_events(tel_dir, day, svc, "prod", [
+                    {"ts": f"{day}T12:0{i}:00Z", "type": "t", "severity": "info",
+                     "payload": {}, "tags": {"serviceName": svc, "environment": "prod"}}
+                    for i in range(4)
+                ])
+
+    def test_parallel_results_match_serial(self, telemetry_dir):
+        from src.telemetry_reader import TelemetryReader
+
+        self._seed(telemetry_dir)
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 3, 23, 59, 59, tzinfo=timezone.utc)
+        queries = [
+            ("fleet_health", {"start": start, "end": end}),
+            ("heartbeat_freshness", {"start": start, "end": end}),
+            ("event_throughput", {"start": start, "end": end, "bucket_width_sec": 3600}),
+            ("container_metrics", {"start": start, "end": end, "bucket_width_sec": 60}),
+            ("container_metrics", {
+                "start": start, "end": end, "bucket_width_sec": 60, "rollup": "fleet",
+            }),
+            ("go_dark_status", {}),
+            ("recent_events", {"start": start, "end": end, "max_rows": 50}),
+        ]
+
+        serial = TelemetryReader(telemetry_dir).query_batch(queries)
+        parallel_reader = TelemetryReader(telemetry_dir, scan_workers=2)
+        try:
+            parallel = parallel_reader.query_batch(queries)
+            assert parallel_reader._pool is not None
+        finally:
+            parallel_reader.close()
+
+        for s_result, p_result in zip(serial, parallel):
+            for row in s_result["data"] + p_result["data"]:
+                row.pop("staleSec", None)
+            assert p_result == s_result
+        assert serial[3]["data"]
+
+    def test_recent_events_partial_pickles_without_warnings(self):
+        import pickle
+        import warnings
+
+        from src.telemetry_reader import _RecentEventsAggregator
+
+        agg = _RecentEventsAggregator(
+            datetime(2026, 3, 1, tzinfo=timezone.utc),
+            datetime(2026, 3, 1, 23, 59, 59, tzinfo=timezone.utc),
+            include_total=True,
+        )
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            partial = pickle.loads(pickle.dumps(agg.spawn()))
+        assert partial.top == [] and partial.matched == 0
+
+    def test_container_metrics_partials_hold_cells_and_bridge_cpu(self, telemetry_dir):
+        from src.telemetry_reader import (
+            TelemetryReader,
+            _ContainerMetricsAggregator,
+            _scan_partition,
+        )
+
+        for day, sent_at, cpu in (
+            ("2026-03-02", "2026-03-02T23:59:00Z", 1.0),
+            ("2026-03-03", "2026-03-03T00:00:00Z", 1.6),
+            ("2026-03-03", "2026-03-03T00:01:00Z", 2.2),
+        ):
+            _seed_heartbeat(
+                telemetry_dir, day, "svc", "prod", "i-1", sent_at,
+                status_overrides={"transponderCpuUserSec": cpu, "transponderCpuSystemSec": 0.0},
+            )
+        start = datetime(2026, 3, 2, 23, 0, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 3, 0, 59, 59, tzinfo=timezone.utc)
+        agg = _ContainerMetricsAggregator(start, end, bucket_width_sec=3600)
+
+        partition_dir = telemetry_dir / "2026-03-03" / "svc" / "prod"
+        [partial] = _scan_partition(partition_dir, "svc", "prod", [agg.spawn()])
+        assert partial.pending == {}
+        [(key, cell)] = partial.cells.items()
+        assert key == ("svc", "prod", "i-1", 1)
+        assert cell[0] == 2
+
+        result = TelemetryReader(telemetry_dir).query_container_metrics(
+            start=start, end=end, bucket_width_sec=3600,
+        )
+        # The first 2026-03-03 heartbeat takes its CPU% from the 2026-03-02 one.
+        assert [(row["heartbeatCount"], row["cpuPct"]) for row in result["data"]] == [
+            (1, None), (2, 1.0),
+        ]
+
+
+# ---- Streaming response formats ----
+
+class TestStreamingFormats:
+    _RANGE = {"start": "2026-03-03T00:00:00Z", "end": "2026-03-03T23:59:59Z"}
+
+    def _seed(self, tel_dir):
+        for minute in range(5):
+            _seed_heartbeat(
+                tel_dir, "2026-03-03", "svc", "prod", "i-1",
+                f"2026-03-03T12:{minute:02d}:10Z",
+                status_overrides={"containerMemoryCurrentBytes": 1000 + minute},
+            )
+        _seed_events(tel_dir, "2026-03-03", "svc", "prod", [
+            {"ts": f"2026-03-03T12:00:{i:02d}Z", "type": "t", "severity": "info",
+             "payload": {}, "tags": {"serviceName": "svc", "environment": "prod"}}
+            for i in range(10)
+        ])
+
+    @pytest.mark.parametrize("path", ["/query/container-metrics", "/query/recent-events"])
+    def test_json_stream_matches_json(self, query_client, auth, path):
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+
+        plain = client.get(path, headers=auth, params=self._RANGE)
+        streamed = client.get(path, headers=auth, params={**self._RANGE, "format": "json-stream"})
+        assert streamed.status_code == 200
+        assert streamed.headers["content-type"] == "application/json"
+        assert streamed.json() == plain.json()
+        assert plain.json()["data"]
+
+    def test_ndjson_rows_and_headers(self, query_client, auth):
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+
+        resp = client.get(
+            "/query/recent-events",
+            headers=auth,
+            params={**self._RANGE, "maxRows": 4, "format": "ndjson"},
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in resp.text.splitlines()]
+        assert len(rows) == 4
+        assert rows[0]["ts"] == "2026-03-03T12:00:09Z"
+        assert resp.headers["X-Total-Rows"] == "10"
+
+        page2 = client.get(
+            "/query/recent-events",
+            headers=auth,
+            params={**self._RANGE, "maxRows": 4, "cursor": resp.headers["X-Next-Cursor"]},
+        )
+        assert page2.json()["data"][0]["ts"] == "2026-03-03T12:00:05Z"
+
+    def test_unknown_format_rejected(self, query_client, auth):
+        client, _ = query_client
+        resp = client.get("/query/recent-events", headers=auth, params={"format": "csv"})
+        assert resp.status_code == 422
+
+    def test_container_metrics_rows_stream_bucket_by_bucket(self, telemetry_dir):
+        from src.telemetry_reader import TelemetryReader, _ContainerMetricsAggregator
+
+        self._seed(telemetry_dir)
+        kwargs = {
+            "start": datetime(2026, 3, 3, tzinfo=timezone.utc),
+            "end": datetime(2026, 3, 3, 23, 59, 59, tzinfo=timezone.utc),
+            "bucket_width_sec": 60,
+        }
+        expected = TelemetryReader(telemetry_dir).query_container_metrics(**kwargs)
+
+        agg = _ContainerMetricsAggregator(**kwargs, max_rows=4)
+        TelemetryReader(telemetry_dir)._scan([agg])
+        assert len(agg.cells) == 5
+        meta, rows = agg.stream()
+        assert meta["totalRows"] == 4
+        first = next(rows)
+        # Only the first bucket has been rolled up and released.
+        assert len(agg.cells) == 4
+        assert [first, *rows] == expected["data"][:4]
+
+
+# ---- Newest-first recent events ----
+
+class TestRecentEventsNewestFirst:
+    _RANGE = {"start": "2026-03-01T00:00:00Z", "end": "2026-03-03T23:59:59Z"}
+
+    def _seed(self, tel_dir):
+        for day in ("2026-03-01", "2026-03-02", "2026-03-03"):
+            for svc in ("svc-a", "svc-b"):
+                for hour in range(10, 14):
+                    _seed_events(tel_dir, day, svc, "prod", [
+                        {"ts": f"{day}T{hour}:{minute:02d}:00Z", "type": f"{svc}-{minute % 3}",
+                         "severity": "warn" if minute % 4 == 0 else "info", "payload": {},
+                         "tags": {"serviceName": svc, "environment": "prod"}}
+                        for minute in range(0, 50, 7)
+                    ] + [
+                        # Same ts in both services: tie order must be stable.
+                        {"ts": f"{day}T{hour}:55:00Z", "type": "tie", "severity": "info",
+                         "payload": {}, "tags": {"serviceName": svc, "environment": "prod"}},
+                    ], batch_id=f"b-{hour}", received_at=f"{day}T{hour}:59:00Z")
+
+    def _pages(self, client, auth, params):
+        pages, cursor = [], None
+        while True:
+            page_params = {**self._RANGE, **params, "maxRows": 7}
+            if cursor:
+                page_params["cursor"] = cursor
+            body = client.get("/query/recent-events", headers=auth, params=page_params).json()
+            pages.append(body)
+            cursor = body["meta"]["cursor"]
+            if not cursor:
+                return pages
+
+    @pytest.mark.parametrize("filters", [{}, {"severity": "warn"}, {"serviceName": "svc-b"}])
+    def test_pages_match_full_scan(self, query_client, auth, filters):
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+
+        full = self._pages(client, auth, filters)
+        fast = self._pages(client, auth, {**filters, "includeTotal": "false"})
+        assert [p["data"] for p in fast] == [p["data"] for p in full]
+        assert "totalRowsExact" not in full[0]["meta"]
+        assert fast[-1]["meta"]["totalRowsExact"] is True
+        assert fast[-1]["meta"]["totalRows"] == full[0]["meta"]["totalRows"]
+
+    def test_stops_before_older_dates(self, query_client, auth):
+        from src import telemetry_reader
+
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+        read_paths = []
+        real = telemetry_reader._iter_lines_reverse
+
+        def tracking(path):
+            read_paths.append(path)
+            return real(path)
+
+        with patch.object(telemetry_reader, "_iter_lines_reverse", tracking):
+            resp = client.get(
+                "/query/recent-events",
+                headers=auth,
+                params={**self._RANGE, "maxRows": 5, "includeTotal": "false"},
+            )
+        body = resp.json()
+        assert [row["ts"] for row in body["data"]] == [
+            "2026-03-03T13:55:00Z", "2026-03-03T13:55:00Z",
+            "2026-03-03T13:49:00Z", "2026-03-03T13:49:00Z", "2026-03-03T13:42:00Z",
+        ]
+        # Tied rows follow the keyset key: service descending.
+        assert [row["serviceName"] for row in body["data"][:2]] == ["svc-b", "svc-a"]
+        assert body["meta"]["totalRowsExact"] is False
+        assert body["meta"]["cursor"] is not None
+        assert {p.parent.parent.parent.name for p in read_paths} == {"2026-03-03"}
+
+    def test_reverse_line_reader_across_blocks(self, tmp_path, monkeypatch):
+        from src import telemetry_reader
+
+        monkeypatch.setattr(telemetry_reader, "_REVERSE_BLOCK_SIZE", 7)
+        path = tmp_path / "events.jsonl"
+        lines = [b'{"a":1}', b'{"bbbbbbbbbbbbbbbb":2}', b"", b'{"c":3}']
+        path.write_bytes(b"\n".join(lines) + b"\n")
+
+        got = list(telemetry_reader._iter_lines_reverse(path))
+        assert [line for _, line in got] == [lines[3], lines[1], lines[0]]
+        data = path.read_bytes()
+        for offset, line in got:
+            assert data[offset:offset + len(line)] == line
+        assert list(telemetry_reader._iter_lines_reverse(tmp_path / "missing.jsonl")) == []
+
+
+# ---- Keyset cursors ----
+
+class TestKeysetCursors:
+    def test_recent_events_pages_stable_under_new_data(self, query_client, auth):
+        client, tel_dir = query_client
+        _seed_events(tel_dir, "2026-03-03", "svc", "prod", [
+            {"ts": f"2026-03-03T12:00:{i:02d}Z", "type": "old", "severity": "info",
+             "payload": {}, "tags": {"serviceName": "svc", "environment": "prod"}}
+            for i in range(6)
+        ])
+        params = {"start": "2026-03-03T00:00:00Z", "end": "2026-03-03T23:59:59Z", "maxRows": 3}
+        page1 = client.get("/query/recent-events", headers=auth, params=params).json()
+        assert [r["ts"][-3:] for r in page1["data"]] == ["05Z", "04Z", "03Z"]
+
+        # Newer events arrive between page requests.
+        _seed_events(tel_dir, "2026-03-03", "svc", "prod", [
+            {"ts": "2026-03-03T12:30:00Z", "type": "new", "severity": "info",
+             "payload": {}, "tags": {"serviceName": "svc", "environment": "prod"}},
+        ], batch_id="b-002", received_at="2026-03-03T12:30:01Z")
+        page2 = client.get(
+            "/query/recent-events",
+            headers=auth,
+            params={**params, "cursor": page1["meta"]["cursor"]},
+        ).json()
+        assert [r["ts"][-3:] for r in page2["data"]] == ["02Z", "01Z", "00Z"]
+        assert page2["meta"]["totalRows"] == 6
+        assert page2["meta"]["cursor"] is None
+
+    def test_recent_events_page_boundary_between_duplicate_batches(self, query_client, auth):
+        client, tel_dir = query_client
+        events = [
+            {"ts": "2026-03-03T12:00:00Z", "type": "retried", "severity": "info",
+             "payload": {}, "tags": {"serviceName": "svc", "environment": "prod"}},
+        ]
+        # A retried batch stored twice: same receivedAt, batchId and event.
+        for _ in range(2):
+            _seed_events(
+                tel_dir, "2026-03-03", "svc", "prod", events,
+                batch_id="b-dup", received_at="2026-03-03T12:00:01Z",
+            )
+        params = {"start": "2026-03-03T00:00:00Z", "end": "2026-03-03T23:59:59Z", "maxRows": 1}
+        page1 = client.get("/query/recent-events", headers=auth, params=params).json()
+        assert len(page1["data"]) == 1
+        assert page1["meta"]["totalRows"] == 2
+        page2 = client.get(
+            "/query/recent-events",
+            headers=auth,
+            params={**params, "cursor": page1["meta"]["cursor"]},
+        ).json()
+        assert [r["batchId"] for r in page2["data"]] == ["b-dup"]
+        assert page2["meta"]["cursor"] is None
+
+    def test_heartbeat_freshness_seeks_past_earlier_partitions(self, query_client, auth):
+        from src.telemetry_reader import TelemetryReader
+
+        client, tel_dir = query_client
+        for svc in ("svc-a", "svc-b", "svc-c", "svc-d", "svc-e"):
+            for inst in ("i-1", "i-2"):
+                _seed_heartbeat(
+                    tel_dir, "2026-03-03", svc, "prod", f"{svc}-{inst}", "2026-03-03T12:00:10Z",
+                )
+        params = {"start": "2026-03-03T00:00:00Z", "end": "2026-03-03T23:59:59Z", "maxRows": 3}
+        page1 = client.get("/query/heartbeat-freshness", headers=auth, params=params).json()
+        assert page1["meta"]["totalRows"] == 10
+
+        reads: list[str] = []
+        original = TelemetryReader._read_jsonl
+
+        def counting_read(self, filepath, fields=None):
+            reads.append(Path(filepath).parent.parent.name)
+            return original(self, filepath, fields)
+
+        with patch.object(TelemetryReader, "_read_jsonl", counting_read):
+            page2 = client.get(
+                "/query/heartbeat-freshness",
+                headers=auth,
+                params={**params, "cursor": page1["meta"]["cursor"]},
+            ).json()
+        assert [r["instanceId"] for r in page2["data"]] == [
+            "svc-b-i-2", "svc-c-i-1", "svc-c-i-2",
+        ]
+        assert page2["meta"]["totalRows"] == 10
+        # svc-a sorts before the cursor; svc-d supplies the look-ahead row
+        # that proves a next page exists, after which svc-e is never read.
+        assert reads == ["svc-b", "svc-c", "svc-d"]
+
+        page3 = client.get(
+            "/query/heartbeat-freshness",
+            headers=auth,
+            params={**params, "cursor": page2["meta"]["cursor"]},
+        ).json()
+        assert [r["instanceId"] for r in page3["data"]] == [
+            "svc-d-i-1", "svc-d-i-2", "svc-e-i-1",
+        ]
+        assert page3["meta"]["cursor"] is not None
+
+    def test_malformed_cursor_starts_from_first_page(self, query_client, auth):
+        client, tel_dir = query_client
+        _seed_events(tel_dir, "2026-03-03", "svc", "prod", [
+            {"ts": "2026-03-03T12:00:00Z", "type": "t", "severity": "info",
+             "payload": {}, "tags": {"serviceName": "svc", "environment": "prod"}},
+        ])
+        resp = client.get(
+            "/query/recent-events",
+            headers=auth,
+            params={"start": "2026-03-03T00:00:00Z", "end": "2026-03-03T23:59:59Z",
+                    "cursor": "not-a-cursor"},
+        )
+        assert resp.status_code == 200
+        assert len(resp.json()["data"]) == 1
+
+    def test_heartbeat_freshness_cursor_without_total_counts_all_rows(self, query_client, auth):
+        import base64
+        import json
+
+        client, tel_dir = query_client
+        for inst in ("i-1", "i-2", "i-3"):
+            _seed_heartbeat(tel_dir, "2026-03-03", "svc", "prod", inst, "2026-03-03T12:00:10Z")
+        cursor = base64.urlsafe_b64encode(
+            json.dumps({"k": ["svc", "prod", "i-1"]}).encode()
+        ).decode()
+        body = client.get(
+            "/query/heartbeat-freshness",
+            headers=auth,
+            params={"start": "2026-03-03T00:00:00Z", "end": "2026-03-03T23:59:59Z",
+                    "maxRows": 1, "cursor": cursor},
+        ).json()
+        assert [r["instanceId"] for r in body["data"]] == ["i-2"]
+        assert body["meta"]["totalRows"] == 3
+        assert body["meta"]["cursor"] is not None
+
+    def test_cursor_with_wrong_key_types_starts_from_first_page(self, query_client, auth):
+        import base64
+        import json
+
+        client, tel_dir = query_client
+        _seed_heartbeat(tel_dir, "2026-03-03", "svc", "prod", "i-1", "2026-03-03T12:00:10Z")
+        _seed_events(tel_dir, "2026-03-03", "svc", "prod", [
+            {"ts": "2026-03-03T12:00:00Z", "type": "t", "severity": "info",
+             "payload": {}, "tags": {"serviceName": "svc", "environment": "prod"}},
+        ])
+        params = {"start": "2026-03-03T00:00:00Z", "end": "2026-03-03T23:59:59Z"}
+        for path, key in (
+            ("/query/heartbeat-freshness", [1, 2, 3]),
+            ("/query/heartbeat-freshness", ["svc", "prod"]),
+            ("/query/recent-events", [1, "svc", "prod", 4, "b", 0]),
+            ("/query/recent-events", [True, "svc", "prod", "", "b", 0]),
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps({"k": key, "t": 5}).encode()).decode()
+            resp = client.get(path, headers=auth, params={**params, "cursor": cursor})
+            assert resp.status_code == 200, (path, key)
+            body = resp.json()
+            assert len(body["data"]) == 1
+            assert body["meta"]["totalRows"] == 1
+
+
+# ---- Vectorized bucketing ----
+
+class TestVectorizedBucketing:
+    def _seed(self, tel_dir):
+        import random
+
+        rng = random.Random(7)
+        for day in ("2026-03-02", "2026-03-03"):
+            for svc in ("svc-a", "svc-b"):
+                for env in ("prod", "staging"):
+                    for inst in ("i-1", "i-2", "i-3"):
+                        cpu_user, cpu_sys = 1.0, 0.5
+                        for n in range(rng.randint(3, 12)):
+                            cpu_user += rng.choice([0.25, 0.5, -0.1])
+                            cpu_sys += rng.random()
+                            overrides = {
+                                "containerRxBytesSinceLastHeartbeat": rng.randint(-5, 500),
+                                "containerTxBytesSinceLastHeartbeat": rng.choice([None, 40]),
+                                "containerMemoryCurrentBytes": rng.randint(1, 10**10),
+                                "transponderRssBytes": rng.choice([None, 12345]),
+                                "transponderCpuUserSec": cpu_user,
+                                "transponderCpuSystemSec": rng.choice([None, cpu_sys]),
+                                "transponderUptimeSec": n * 15,
+                            }
+                            _seed_heartbeat(
+                                tel_dir, day, svc, env, f"{svc}-{env}-{inst}",
+                                f"{day}T12:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z",
+                                status_overrides={k: v for k, v in overrides.items() if v is not None},
+                            )
+                    _seed_events(tel_dir, day, svc, env, [
+                        {"ts": f"{day}T12:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z",
+                         "type": "t", "severity": "info", "payload": {},
+                         "tags": {"serviceName": svc, "environment": env}}
+                        for _ in range(40)
+                    ])
+
+    @pytest.mark.parametrize("rollup", ["container", "service", "fleet"])
+    def test_container_metrics_match_pure_python(self, telemetry_dir, monkeypatch, rollup):
+        pytest.importorskip("numpy")
+        from src import telemetry_reader
+
+        self._seed(telemetry_dir)
+        reader = telemetry_reader.TelemetryReader(telemetry_dir)
+        kwargs = {
+            "start": datetime(2026, 3, 2, tzinfo=timezone.utc),
+            "end": datetime(2026, 3, 3, 23, 59, 59, tzinfo=timezone.utc),
+            "bucket_width_sec": 600,
+            "rollup": rollup,
+        }
+        vectorized = reader.query_container_metrics(**kwargs)
+        monkeypatch.setattr(telemetry_reader, "np", None)
+        pure = reader.query_container_metrics(**kwargs)
+        assert vectorized == pure
+        assert any(row["cpuPct"] is not None for row in pure["data"])
+
+    def test_event_throughput_matches_pure_python(self, telemetry_dir, monkeypatch):
+        pytest.importorskip("numpy")
+        from src import telemetry_reader
+
+        self._seed(telemetry_dir)
+        monkeypatch.setattr(telemetry_reader, "_VECTOR_FLUSH_EVENTS", 50)
+        reader = telemetry_reader.TelemetryReader(telemetry_dir)
+        kwargs = {
+            "start": datetime(2026, 3, 2, 12, 0, 0, tzinfo=timezone.utc),
+            "end": datetime(2026, 3, 3, 13, 0, 0, tzinfo=timezone.utc),
+            "bucket_width_sec": 300,
+        }
+        vectorized = reader.query_event_throughput(**kwargs)
+        monkeypatch.setattr(telemetry_reader, "np", None)
+        pure = reader.query_event_throughput(**kwargs)
+        assert vectorized == pure
+        assert sum(row["count"] for row in pure["data"]) == 320
+
+
+# ---- Timestamp parsing ----
+
+class TestParseEpoch:
+    @pytest.mark.parametrize("value", [
+        "2026-03-03T12:00:10Z",
+        "1970-01-01T00:00:00Z",
+        "2024-02-29T23:59:59Z",
+        "2026-03-03T12:00:10.250Z",
+        "2026-03-03T14:00:10+02:00",
+    ])
+    def test_matches_fromisoformat(self, value):
+        from src.telemetry_reader import _parse_epoch
+
+        expected = datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        assert _parse_epoch(value) == expected
+        # Memoized result is identical.
+        assert _parse_epoch(value) == expected
+
+    def test_fixed_format_is_integer(self):
+        from src.telemetry_reader import _parse_epoch
+
+        assert isinstance(_parse_epoch("2026-03-03T12:00:10Z"), int)
+
+    @pytest.mark.parametrize("value", [
+        "2026-02-30T12:00:00Z",
+        "2026-03-03T24:00:00Z",
+        "2026-03-03T12:00:60Z",
+        "2026-0a-03T12:00:00Z",
+        "2026-03-03T12:00:00",
+        "not-a-timestamp",
+        None,
+        12345,
+        ["2026-03-03T12:00:10Z"],
+    ])
+    def test_rejects_invalid(self, value):
+        from src.telemetry_reader import _parse_epoch
+
+        assert _parse_epoch(value) is None
+
+
+# ---- Projected record decoding ----
+
+class TestProjectedDecoding:
+    _RECORD = {
+        "receivedAt": "2026-03-03T12:00:00Z",
+        "payload": {
+            "batchId": "b-1",
+            "identity": {"serviceName": "svc", "instanceId": "i-1", "repository": "r"},
+            "events": [
+                {"ts": "2026-03-03T12:00:01Z", "type": "a", "payload": {"big": ["x" * 50, {"n": [1, 2]}]}},
+                {"ts": "2026-03-03T12:00:02Z", "tags": {"k": "v"}, "payload": "s\"t,r]"},
+            ],
+            "status": {"goDark": False, "nested": {"deep": [True, None, 1.5]}},
+        },
+    }
+    _FIELDS = (
+        "receivedAt",
+        "payload.identity.instanceId",
+        "payload.events[].ts",
+        "payload.events[].tags",
+        "payload.status",
+        "payload.status.goDark",
+    )
+    _EXPECTED = {
+        "receivedAt": "2026-03-03T12:00:00Z",
+        "payload": {
+            "identity": {"instanceId": "i-1"},
+            "events": [{"ts": "2026-03-03T12:00:01Z"}, {"ts": "2026-03-03T12:00:02Z", "tags": {"k": "v"}}],
+            "status": {"goDark": False, "nested": {"deep": [True, None, 1.5]}},
+        },
+    }
+
+    @pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+    def test_streaming_and_post_decode_projection_agree(self, monkeypatch, separators):
+        from src import telemetry_reader
+
+        line = json.dumps(self._RECORD, separators=separators)
+        tree = telemetry_reader._compile_projection(self._FIELDS)
+        assert telemetry_reader._decode_line(line, tree) == self._EXPECTED
+        monkeypatch.setattr(telemetry_reader, "_STREAM_DECODE_MIN_CHARS", 0)
+        assert telemetry_reader._decode_line(line, tree) == self._EXPECTED
+        assert telemetry_reader._decode_line(line, None) == self._RECORD
+
+    def test_read_jsonl_is_lazy_and_skips_bad_lines(self, tmp_path, monkeypatch):
+        from src import telemetry_reader
+
+        monkeypatch.setattr(telemetry_reader, "_STREAM_DECODE_MIN_CHARS", 0)
+        path = tmp_path / "events.jsonl"
+        path.write_text(
+            json.dumps(self._RECORD) + "\n{not json\n\n[1, 2]\n" + json.dumps(self._RECORD) + "\n",
+            encoding="utf-8",
+        )
+        records = telemetry_reader._read_jsonl(path, self._FIELDS)
+        assert not isinstance(records, list)
+        assert list(records) == [self._EXPECTED, self._EXPECTED]
+        assert list(telemetry_reader._read_jsonl(tmp_path / "missing.jsonl")) == []
+
+
+# ---- Event index ----
+
+class TestEventIndex:
+    _RANGE = {"start": "2026-03-03T00:00:00Z", "end": "2026-03-03T23:59:59Z"}
+
+    def _seed(self, tel_dir):
+        from src.telemetry_store import TelemetryStore
+
+        store = TelemetryStore(tel_dir)
+        with patch("src.telemetry_store._today_str", return_value="2026-03-03"):
+            for i in range(60):
+                region = "eu" if i % 2 else "us"
+                severity = "error" if i in (7, 31, 52) else "info"
+                with patch("src.telemetry_store._utc_now_iso",
+                           return_value=f"2026-03-03T12:{i:02d}:30Z"):
+                    store.store_events_batch({
+                        "transponderSessionId": "s-1",
+                        "batchId": f"b-{i}",
+                        "events": [
+                            {"ts": f"2026-03-03T12:{i:02d}:{sec:02d}Z", "type": "request",
+                             "severity": severity if sec == 10 else "info", "payload": {},
+                             "tags": {"serviceName": "web", "environment": "prod",
+                                      "region": region}}
+                            for sec in (0, 10, 20)
+                        ],
+                    })
+        # Written without the store: past the end of the index, scanned as a tail.
+        _seed_events(tel_dir, "2026-03-03", "web", "prod", [
+            {"ts": "2026-03-03T13:05:00Z", "type": "request", "severity": "error", "payload": {},
+             "tags": {"serviceName": "web", "environment": "prod", "region": "eu"}},
+        ], batch_id="b-tail", received_at="2026-03-03T13:05:30Z")
+        return tel_dir / "2026-03-03" / "web" / "prod"
+
+    def _get(self, client, auth, params):
+        resp = client.get("/query/recent-events", headers=auth, params={**self._RANGE, **params})
+        assert resp.status_code == 200
+        return resp.json()
+
+    @pytest.mark.parametrize("include_total", ["true", "false"])
+    @pytest.mark.parametrize("filters", [
+        {"severity": "error"},
+        {"severity": "error", "tag": ["region=eu"]},
+        {"type": "request", "tag": ["region=us", "serviceName=web"]},
+    ])
+    def test_indexed_reads_match_full_scan(self, query_client, auth, filters, include_total):
+        from src import telemetry_reader
+
+        client, tel_dir = query_client
+        partition = self._seed(tel_dir)
+        params = {**filters, "includeTotal": include_total, "maxRows": 1000}
+
+        decoded = []
+        real = telemetry_reader._decode_line
+
+        def counting(line, tree):
+            decoded.append(line)
+            return real(line, tree)
+
+        with patch.object(telemetry_reader, "_decode_line", counting):
+            indexed = self._get(client, auth, params)
+        (partition / "events.idx.jsonl").unlink()
+        full = self._get(client, auth, params)
+
+        assert indexed == full
+        assert full["data"]
+        if filters == {"severity": "error"}:
+            # Three indexed error batches plus the unindexed tail batch.
+            assert len(decoded) == 4
+
+    def test_tag_filter(self, query_client, auth):
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+
+        body = self._get(client, auth, {"severity": "error", "tag": "region=eu"})
+        assert [(row["batchId"], row["tags"]["region"]) for row in body["data"]] == [
+            ("b-tail", "eu"), ("b-31", "eu"), ("b-7", "eu"),
+        ]
+        assert self._get(client, auth, {"tag": "region=apac"})["data"] == []
+
+        resp = client.get("/query/recent-events", headers=auth, params={"tag": "region"})
+        assert resp.status_code == 400
+        assert resp.json()["result"]["error"]["code"] == "validation_error"
+
+    def test_batch_tag_param(self, query_client, auth):
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+        resp = client.post("/query/batch", headers=auth, json={
+            **self._RANGE,
+            "queries": [{"id": "errors", "query": "recent-events",
+                         "params": {"severity": "error", "tag": ["region=us"]}}],
+        })
+        assert resp.status_code == 200
+        assert [row["batchId"] for row in resp.json()["results"][0]["data"]] == ["b-52"]
+
+    def test_index_stops_at_broken_chain(self, tmp_path):
+        from src.telemetry_index import load_event_index
+
+        events = tmp_path / "events.jsonl"
+        events.write_bytes(b"x" * 300)
+        (tmp_path / "events.idx.jsonl").write_text(
+            '{"o":0,"e":100,"type":["a"],"severity":["info"],"tag":[]}\n'
+            '{"o":100,"e":200,"type":["b"],"severity":["error"],"tag":["k=v"]}\n'
+            '{"o":250,"e":300,"type":["a"],"severity":["error"],"tag":[]}\n'
+        )
+        index = load_event_index(events)
+        assert index.covered == 200
+        assert index.lookup([(("severity", "error"),)]) == ([100], 200)
+        assert index.lookup([(("type", "a"),), (("tag", "k=v"),)]) == ([0, 100], 200)
+        assert index.lookup([(("type", "a"), ("severity", "error"))]) == ([], 200)
+        assert load_event_index(tmp_path / "missing.jsonl") is None
+
+
+# ---- Trace events ----
+
+class TestTraceEvents:
+    def _store(self, tel_dir, day, received, svc, events, batch_id):
+        from src.telemetry_store import TelemetryStore
+
+        for event in events:
+            event.setdefault("payload", {"secret": "x"})
+            event.setdefault("tags", {})
+            event["tags"].update({"serviceName": svc, "environment": "prod"})
+        with patch("src.telemetry_store._today_str", return_value=day), \
+                patch("src.telemetry_store._utc_now_iso", return_value=received):
+            TelemetryStore(tel_dir).store_events_batch({
+                "transponderSessionId": f"s-{svc}", "batchId": batch_id, "events": events,
+            })
+
+    def _seed(self, tel_dir):
+        self._store(tel_dir, "2026-03-02", "2026-03-02T23:59:50Z", "gateway", [
+            {"ts": "2026-03-02T23:59:58Z", "type": "request", "traceId": "t-1", "spanId": "a"},
+            {"ts": "2026-03-02T23:59:58Z", "type": "request", "traceId": "t-2"},
+        ], "b-1")
+        self._store(tel_dir, "2026-03-03", "2026-03-03T00:00:05Z", "billing", [
+            {"ts": "2026-03-03T00:00:01Z", "type": "charge", "severity": "error",
+             "traceId": "t-1", "spanId": "c"},
+            {"ts": "2026-03-02T23:59:59Z", "type": "lookup", "traceId": "t-1", "spanId": "b"},
+            {"ts": "2026-03-03T00:00:02Z", "type": "noise"},
+        ], "b-2")
+
+    def test_returns_trace_across_services_and_dates(self, query_client, auth):
+        from src.schemas import schema_registry
+
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+        resp = client.get("/query/trace-events", headers=auth, params={"traceId": "t-1"})
+        assert resp.status_code == 200
+        body = resp.json()
+        assert schema_registry.validate("query_trace_events", body) == []
+        assert [(r["serviceName"], r["spanId"], r["ts"]) for r in body["data"]] == [
+            ("gateway", "a", "2026-03-02T23:59:58Z"),
+            ("billing", "b", "2026-03-02T23:59:59Z"),
+            ("billing", "c", "2026-03-03T00:00:01Z"),
+        ]
+        assert "payload" not in body["data"][0]
+        assert body["meta"] == {"totalRows": 3, "traceId": "t-1"}
+
+        limited = client.get(
+            "/query/trace-events", headers=auth, params={"traceId": "t-1", "maxRows": 1},
+        ).json()
+        assert len(limited["data"]) == 1 and limited["meta"]["totalRows"] == 3
+        missing = client.get("/query/trace-events", headers=auth, params={"traceId": "nope"})
+        assert missing.json() == {"data": [], "meta": {"totalRows": 0, "traceId": "nope"}}
+        assert client.get("/query/trace-events", headers=auth).status_code == 422
+
+    def test_reads_only_indexed_batches(self, query_client, auth):
+        from src import telemetry_reader
+
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+        for i in range(20):
+            self._store(tel_dir, "2026-03-03", "2026-03-03T01:00:00Z", "billing", [
+                {"ts": "2026-03-03T01:00:00Z", "type": "other", "traceId": f"x-{i}"},
+            ], f"b-x{i}")
+
+        decoded = []
+        real = telemetry_reader._decode_line
+
+        def counting(line, tree):
+            decoded.append(line)
+            return real(line, tree)
+
+        with patch.object(telemetry_reader, "_decode_line", counting):
+            body = client.get("/query/trace-events", headers=auth, params={"traceId": "t-2"}).json()
+        assert [r["batchId"] for r in body["data"]] == ["b-1"]
+        assert len([line for line in decoded if line.startswith('{"receivedAt"')]) == 1
+
+    def test_trace_index_is_not_a_partition(self, query_client, auth):
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+        assert (tel_dir / "2026-03-03" / "@traces").is_dir()
+        body = client.get("/query/recent-events", headers=auth, params={
+            "start": "2026-03-02T00:00:00Z", "end": "2026-03-03T23:59:59Z",
+        }).json()
+        assert {row["serviceName"] for row in body["data"]} == {"gateway", "billing"}
+
+
+# ---- Approximate fleet health ----
+
+class TestFleetHealthApproximate:
+    _RANGE = {"start": "2026-02-01T00:00:00Z", "end": "2026-03-02T23:59:59Z"}
+
+    def _seed(self, tel_dir):
+        for day in range(1, 29):
+            date = f"2026-02-{day:02d}"
+            for svc in ("api", "web"):
+                # Autoscaled workers: a fresh set of instance ids every day.
+                for worker in range(3):
+                    ts = f"{date}T{10 + worker}:00:00Z"
+                    _seed_heartbeat(tel_dir, date, svc, "prod", f"{svc}-{day}-{worker}", ts)
+                _seed_announce(tel_dir, date, svc, "prod", f"{svc}-{day}-0", f"{date}T09:00:00Z")
+
+    def test_matches_exact_counts(self, query_client, auth):
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+
+        exact = client.get("/query/fleet-health", headers=auth,
+                           params={**self._RANGE, "approximate": "false"}).json()
+        approx = client.get("/query/fleet-health", headers=auth, params=self._RANGE).json()
+        assert exact["meta"]["instanceCountApproximate"] is False
+        assert approx["meta"]["instanceCountApproximate"] is True
+        assert [row["instanceCount"] for row in exact["data"]] == [84, 84]
+        for row_exact, row_approx in zip(exact["data"], approx["data"]):
+            assert abs(row_approx.pop("instanceCount") - row_exact.pop("instanceCount")) <= 2
+            assert row_approx == row_exact
+
+        short = client.get("/query/fleet-health", headers=auth, params={
+            "start": "2026-02-10T00:00:00Z", "end": "2026-02-11T00:00:00Z",
+        }).json()
+        assert short["meta"]["instanceCountApproximate"] is False
+
+    def test_interior_days_use_persisted_summaries(self, query_client, auth):
+        from src.telemetry_reader import TelemetryReader
+
+        from src.telemetry_compaction import run_compaction
+
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+        # Queries never write summaries; compaction of sealed days does.
+        client.get("/query/fleet-health", headers=auth, params=self._RANGE)
+        assert not list(tel_dir.rglob("fleet.summary.json"))
+        run_compaction(tel_dir, grace_sec=0)
+        summaries = sorted(p.parent.parent.parent.name for p in tel_dir.rglob("fleet.summary.json"))
+        assert summaries == sorted(
+            f"2026-02-{day:02d}" for day in range(1, 29) for _svc in ("api", "web")
+        )
+
+        read_paths = []
+        original = TelemetryReader._read_jsonl
+
+        def counting_read(self, filepath, fields=None):
+            read_paths.append(filepath)
+            return original(self, filepath, fields)
+
+        with patch.object(TelemetryReader, "_read_jsonl", counting_read):
+            body = client.get("/query/fleet-health", headers=auth, params=self._RANGE).json()
+        # The first day is a window boundary; every other seeded day is interior.
+        assert {p.parent.parent.parent.name for p in read_paths} == {"2026-02-01"}
+
+        # New data in a summarized day makes its summary stale.
+        _seed_heartbeat(tel_dir, "2026-02-15", "api", "prod", "late-joiner", "2026-02-15T23:00:00Z")
+        again = client.get("/query/fleet-health", headers=auth, params=self._RANGE).json()
+        api_before = next(r for r in body["data"] if r["serviceName"] == "api")["instanceCount"]
+        api_after = next(r for r in again["data"] if r["serviceName"] == "api")["instanceCount"]
+        assert api_after == api_before + 1
+
+
+# ---- Container metric percentiles ----
+
+class TestContainerMetricStats:
+    _PARAMS = {"start": "2026-03-03T12:00:00Z", "end": "2026-03-03T12:09:59Z",
+               "bucketWidthSec": 600, "serviceName": "svc"}
+
+    def _seed(self, tel_dir):
+        # 3 containers x 10 heartbeats; one container runs much hotter.
+        for c in range(3):
+            for i in range(10):
+                _seed_heartbeat(
+                    tel_dir, "2026-03-03", "svc", "prod", f"i-{c}",
+                    f"2026-03-03T12:0{i}:00Z",
+                    status_overrides={
+                        "containerMemoryCurrentBytes": (c + 1) * 1_000_000 + i * 1000,
+                        "transponderRssBytes": 50_000_000,
+                        "transponderCpuUserSec": i * 6.0 * (10 if c == 2 else 1),
+                        "transponderCpuSystemSec": 0.0,
+                    },
+                )
+
+    def test_percentiles_merge_across_containers(self, query_client, auth):
+        from src.schemas import schema_registry
+
+        client, tel_dir = query_client
+        self._seed(tel_dir)
+
+        def row(stat, rollup="service"):
+            resp = client.get("/query/container-metrics", headers=auth,
+                              params={**self._PARAMS, "rollup": rollup, "stat": stat})
+            assert resp.status_code == 200
+            body = resp.json()
+            assert schema_registry.validate("query_container_metrics", body) == []
+            assert body["meta"]["stat"] == stat
+            assert len(body["data"]) == 1
+            return body["data"][0]
+
+        summed = row("sum")
+        p50, p95, top = row("p50"), row("p95"), row("max")
+        # Only the sketched fields change.
+        assert p95["heartbeatCount"] == summed["heartbeatCount"] == 30
+        assert p95["containerCount"] == 3
+        assert summed["containerMemoryCurrentBytes"] == sum(
+            (c + 1) * 1_000_000 + i * 1000 for c in range(3) for i in range(10)
+        )
+        assert top["containerMemoryCurrentBytes"] == 3_009_000
+        assert abs(p50["containerMemoryCurrentBytes"] - 2_004_000) <= 0.01 * 2_004_000
+        assert abs(p95["containerMemoryCurrentBytes"] - 3_008_000) <= 0.01 * 3_008_000
+        assert abs(p95["transponderRssBytes"] - 50_000_000) <= 500_000
+        # CPU%: 10% for two containers, 100% for the hot one.
+        assert abs(p50["cpuPct"] - 10.0) <= 0.1
+        assert abs(p95["cpuPct"] - 100.0) <= 1.0
+        assert top["cpuPct"] == 100.0
+        assert p95["primaryAppRssBytes"] is None
+        assert row("p99", rollup="fleet")["containerCount"] == 3
+
+    def test_rejects_unknown_stat(self, query_client, auth):
+        client, _ = query_client
+        resp = client.get("/query/container-metrics", headers=auth, params={"stat": "p42"})
+        assert resp.status_code == 422
@@ -0,0 +1,141 @@
+"""Tests for the bounded query worker pool."""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+
+def _import_executor():
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+    from src import query_executor
+    return query_executor
+
+
+class TestQueryExecutor:
+    def test_runs_callable_off_event_loop(self):
+        qe = _import_executor()
+        executor = qe.QueryExecutor(max_workers=2, timeout_sec=5)
+
+        async def main():
+            return await executor.run(threading.current_thread)
+
+        try:
+            worker = asyncio.run(main())
+        finally:
+            executor.shutdown()
+        assert worker is not threading.main_thread()
+        assert worker.name.startswith("arecibo-query")
+
+    def test_timeout_raises_and_is_counted(self):
+        qe = _import_executor()
+        executor = qe.QueryExecutor(max_workers=1, timeout_sec=0.05)
+
+        async def main():
+            await executor.run(time.sleep, 0.5)
+
+        try:
+            with pytest.raises(qe.QueryTimeoutError):
+                asyncio.run(main())
+            stats = executor.stats()
+        finally:
+            executor.shutdown()
+        assert stats["timedOut"] == 1
+        assert stats["completed"] == 0
+
+    def test_rejects_when_queue_full(self):
+        qe = _import_executor()
+        executor = qe.QueryExecutor(max_workers=1, timeout_sec=5, max_queued=1)
+        release = threading.Event()
+
+        async def main():
+            first = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            second = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            with pytest.raises(qe.QueryQueueFullError):
+                await executor.run(release.wait)
+            assert executor.stats()["queued"] == 1
+            release.set()
+            await asyncio.gather(first, second)
+
+        try:
+            asyncio.run(main())
+            stats = executor.stats()
+        finally:
+            executor.shutdown()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 2
+        assert stats["queued"] == 0
+        assert stats["running"] == 0
+
+
+    def test_idle_pool_serves_queries_with_no_wait_queue(self):
+        qe = _import_executor()
+        executor = qe.QueryExecutor(max_workers=2, timeout_sec=5, max_queued=0)
+        release = threading.Event()
+
+        async def main():
+            assert await executor.run(lambda: "ok") == "ok"
+            first = asyncio.ensure_future(executor.run(release.wait))
+            second = asyncio.ensure_future(executor.run(release.wait))
+            await asyncio.sleep(0.05)
+            with pytest.raises(qe.QueryQueueFullError):
+                await executor.run(release.wait)
+            release.set()
+            await asyncio.gather(first, second)
+
+        try:
+            asyncio.run(main())
+            stats = executor.stats()
+        finally:
+            executor.shutdown()
+        assert stats["completed"] == 3
+        assert stats["rejected"] == 1
+
+
+def test_heartbeat_ingest_not_blocked_by_slow_query(client, auth_headers, sample_heartbeat):
+    reader = client.app.state.telemetry_reader
+    started = threading.Event()
+
+    def slow_query(**_kwargs):
+        started.set()
+        time.sleep(1.0)
+        return {"data": [], "meta": {"totalRows": 0}}
+
+    reader.query_fleet_health = slow_query
+    query_thread = threading.Thread(
+        target=lambda: client.get("/query/fleet-health", headers=auth_headers),
+    )
+    query_thread.start()
+    try:
+        assert started.wait(timeout=5)
+        t0 = time.monotonic()
+        response = client.post("/heartbeat", json=sample_heartbeat, headers=auth_headers)
+        elapsed = time.monotonic() - t0
+    finally:
+        query_thread.join()
+    assert response.status_code == 202
+    assert elapsed < 0.5
+
+
+def test_query_timeout_returns_retryable_result(client, auth_headers):
+    client.app.state.query_executor.timeout_sec = 0.05
+    client.app.state.telemetry_reader.query_go_dark_status = (
+        lambda **_kwargs: time.sleep(0.5)
+    )
+    response = client.get("/query/go-dark-status", headers=auth_headers)
+    assert response.status_code == 504
+    body = response.json()
+    assert body["result"]["status"] == "retryable"
+    assert body["result"]["error"]["code"] == "query_timeout"
+
+    stats = client.get("/stats", headers=auth_headers).json()
+    assert stats["queryExecutor"]["timedOut"] == 1
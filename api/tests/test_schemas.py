@@ -0,0 +1,64 @@
+"""Tests for the precompiled schema bundle."""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from unittest.mock import patch
+
+
+def _import_src():
+    import sys, os
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+
+
+def _invalid_heartbeat() -> dict:
+    return {"schemaVersion": "1.0.0", "eventType": "heartbeat"}
+
+
+class TestSchemaBundle:
+    def test_registry_loads_from_current_bundle(self, tmp_path):
+        _import_src()
+        from src.schemas import SchemaRegistry, write_bundle
+
+        bundle = tmp_path / "schemas.bundle.json"
+        write_bundle(bundle)
+        expected = SchemaRegistry(bundle_path=None).validate("heartbeat", _invalid_heartbeat())
+
+        opened = []
+        real_open = Path.open
+
+        def recording_open(self, *args, **kwargs):
+            opened.append(self)
+            return real_open(self, *args, **kwargs)
+
+        registry = SchemaRegistry(bundle_path=bundle)
+        with patch("src.schemas._load_schema", side_effect=AssertionError("read schema file")), \
+                patch.object(Path, "open", recording_open):
+            assert registry.validate("heartbeat", _invalid_heartbeat()) == expected
+            assert registry.validate("policy_response", {}) != []
+        assert opened == [bundle]
+
+    def test_stale_bundle_falls_back_to_schema_files(self, tmp_path):
+        _import_src()
+        from src.schemas import SchemaRegistry, build_bundle
+
+        bundle = build_bundle()
+        rel = next(iter(bundle["files"]))
+        bundle["files"][rel] = [0, 0]
+        bundle["schemas"] = {}
+        path = tmp_path / "schemas.bundle.json"
+        path.write_text(json.dumps(bundle))
+
+        registry = SchemaRegistry(bundle_path=path)
+        assert registry.validate("heartbeat", _invalid_heartbeat()) != []
+
+    def test_validators_are_built_on_first_use(self):
+        _import_src()
+        from src.schemas import SchemaRegistry
+
+        with patch("src.schemas._schema_files", side_effect=AssertionError("scanned")):
+            registry = SchemaRegistry(bundle_path=None)
+        assert registry._store is None
@@ -0,0 +1,117 @@
+"""Tests for mergeable approximate sketches."""
+
+from __future__ import annotations
+
+import pytest
+
+
+def _import_src():
+    import sys, os
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+
+
+class TestHyperLogLog:
+    def test_small_counts_are_exact(self):
+        _import_src()
+        from src.sketches import HyperLogLog
+
+        hll = HyperLogLog()
+        assert hll.count() == 0
+        for value in ("a", "b", "c", "a", "b"):
+            hll.add(value)
+        assert hll.count() == 3
+
+    def test_large_count_within_error(self):
+        _import_src()
+        from src.sketches import HyperLogLog
+
+        hll = HyperLogLog()
+        for i in range(50_000):
+            hll.add(f"instance-{i}")
+        assert abs(hll.count() - 50_000) / 50_000 < 0.05
+
+    def test_merge_equals_union(self):
+        _import_src()
+        from src.sketches import HyperLogLog
+
+        left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for i in range(3000):
+            (left if i % 2 else right).add(str(i))
+            union.add(str(i))
+        for i in range(1000):
+            left.add(str(i))
+        left.merge(right)
+        assert left.registers == union.registers
+
+        with pytest.raises(ValueError):
+            left.merge(HyperLogLog(precision=10))
+
+    def test_json_round_trip(self):
+        _import_src()
+        from src.sketches import HyperLogLog
+
+        hll = HyperLogLog(precision=8)
+        for i in range(100):
+            hll.add(str(i))
+        restored = HyperLogLog.from_json(hll.to_json())
+        assert restored.precision == 8
+        assert restored.registers == hll.registers
+        with pytest.raises(ValueError):
+            HyperLogLog.from_json({"p": 8, "r": "AAAA"})
+        with pytest.raises(ValueError):
+            HyperLogLog.from_json({"r": ""})
+
+
+class TestDDSketch:
+    def test_quantiles_within_relative_accuracy(self):
+        _import_src()
+        from src.sketches import DDSketch
+
+        sketch = DDSketch()
+        values = [i * 1.5 for i in range(1, 10_001)]
+        for value in values:
+            sketch.add(value)
+        assert sketch.count == 10_000
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * (len(values) - 1))]
+            assert abs(sketch.quantile(q) - exact) <= 0.01 * exact
+        assert sketch.quantile(1.0) == values[-1]
+        assert sketch.quantile(0.0) == values[0]
+        assert DDSketch().quantile(0.5) is None
+
+    def test_zero_and_merge(self):
+        _import_src()
+        from src.sketches import DDSketch
+
+        left, right, union = DDSketch(), DDSketch(), DDSketch()
+        for i in range(200):
+            value = float(i % 50)
+            (left if i % 3 else right).add(value)
+            union.add(value)
+        left.merge(right)
+        assert left.bins == union.bins
+        assert left.zero_count == union.zero_count == 4
+        assert (left.min, left.max) == (0.0, 49.0)
+        assert left.quantile(0.01) == 0.0
+
+        with pytest.raises(ValueError):
+            left.merge(DDSketch(relative_accuracy=0.02))
+        with pytest.raises(ValueError):
+            left.add(-1)
+
+    def test_json_round_trip(self):
+        _import_src()
+        from src.sketches import DDSketch
+
+        sketch = DDSketch()
+        for value in (0, 3, 1e9, 42.5):
+            sketch.add(value)
+        restored = DDSketch.from_json(sketch.to_json())
+        assert restored.bins == sketch.bins
+        assert restored.zero_count == 1
+        assert (restored.min, restored.max) == (0, 1e9)
+        assert DDSketch.from_json(DDSketch().to_json()).count == 0
+        with pytest.raises(ValueError):
+            DDSketch.from_json({"a": 0.01, "z": 0, "b": {"x": 1}})
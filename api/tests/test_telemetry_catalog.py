@@ -0,0 +1,101 @@
+"""Tests for the in-memory telemetry partition catalog."""
+
+from __future__ import annotations
+
+import json
+from datetime import date, datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+
+def _import_src():
+    import sys, os
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+
+
+def _create_partition(base: Path, date_str: str, svc: str = "svc", env: str = "prod"):
+    partition = base / date_str / svc / env
+    partition.mkdir(parents=True, exist_ok=True)
+    (partition / "heartbeat.jsonl").write_text(
+        json.dumps({
+            "receivedAt": f"{date_str}T12:00:00Z",
+            "payload": {
+                "sentAt": f"{date_str}T12:00:00Z",
+                "identity": {"serviceName": svc, "environment": env, "instanceId": f"{svc}-1"},
+                "status": {"goDark": False},
+            },
+        }) + "\n"
+    )
+    return partition
+
+
+class TestPartitionCatalog:
+    def test_refresh_indexes_date_partitions(self, tmp_path):
+        _import_src()
+        from src.telemetry_catalog import PartitionCatalog
+
+        base = tmp_path / "telemetry"
+        _create_partition(base, "2026-03-02", "web", "prod")
+        _create_partition(base, "2026-03-01", "web", "prod")
+        _create_partition(base, "2026-03-01", "api", "staging")
+        (base / "not-a-date").mkdir()
+        (base / "2026-13-01").mkdir()
+        (base / "README.md").write_text("x")
+
+        catalog = PartitionCatalog(base)
+        catalog.refresh()
+
+        assert catalog.dates() == ["2026-03-01", "2026-03-02"]
+        assert catalog.dates(date(2026, 3, 2), date(2026, 3, 9)) == ["2026-03-02"]
+        assert [(s, e) for s, e, _ in catalog.partitions("2026-03-01")] == [
+            ("api", "staging"), ("web", "prod"),
+        ]
+        assert catalog.partitions("2026-03-01", service_filter="web") == [
+            ("web", "prod", base / "2026-03-01" / "web" / "prod"),
+        ]
+        assert catalog.stats() == {"dates": 2, "partitions": 3}
+
+    def test_store_registers_and_retention_removes(self, tmp_path):
+        _import_src()
+        from src.telemetry_catalog import PartitionCatalog
+        from src.telemetry_retention import run_retention
+        from src.telemetry_store import TelemetryStore
+
+        base = tmp_path / "telemetry"
+        _create_partition(base, "2025-01-01")
+        catalog = PartitionCatalog(base)
+        catalog.refresh()
+        store = TelemetryStore(base, catalog=catalog)
+        with patch("src.telemetry_store._today_str", return_value="2026-03-03"):
+            store.store_heartbeat({"identity": {"serviceName": "web app", "environment": "prod"}})
+
+        assert catalog.dates() == ["2025-01-01", "2026-03-03"]
+        assert [(s, e) for s, e, _ in catalog.partitions("2026-03-03")] == [("web_app", "prod")]
+
+        run_retention(
+            base, retention_days=180, now=datetime(2026, 3, 3, tzinfo=timezone.utc), catalog=catalog,
+        )
+        assert catalog.dates() == ["2026-03-03"]
+
+    def test_reader_plans_from_catalog_without_listing_dirs(self, tmp_path):
+        _import_src()
+        from src.telemetry_catalog import PartitionCatalog
+        from src.telemetry_reader import TelemetryReader
+
+        base = tmp_path / "telemetry"
+        for day in ("2026-03-01", "2026-03-02"):
+            for svc in ("api", "web"):
+                _create_partition(base, day, svc)
+        catalog = PartitionCatalog(base)
+        catalog.refresh()
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 2, 23, 59, 59, tzinfo=timezone.utc)
+
+        expected = TelemetryReader(base).query_fleet_health(start, end)
+        with patch.object(Path, "iterdir", side_effect=AssertionError("directory listed")):
+            cataloged = TelemetryReader(base, catalog=catalog).query_fleet_health(start, end)
+            dark = TelemetryReader(base, catalog=catalog).query_go_dark_status(service_name="web")
+        assert cataloged == expected
+        assert [row["serviceName"] for row in dark["data"]] == ["web"]
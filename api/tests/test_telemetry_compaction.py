@@ -0,0 +1,183 @@
+"""Tests for sealed telemetry partition compaction."""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from unittest.mock import patch
+
+
+def _import_src():
+    import sys, os
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+
+
+NOW = datetime(2026, 3, 4, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _heartbeat(inst: str, sent_at: str) -> dict:
+    return {
+        "receivedAt": sent_at,
+        "payload": {
+            "sentAt": sent_at,
+            "identity": {"serviceName": "web", "environment": "prod", "instanceId": inst},
+            "status": {"goDark": False},
+        },
+    }
+
+
+def _write_lines(path: Path, records: list) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write((record if isinstance(record, str) else json.dumps(record)) + "\n")
+
+
+def _age(partition: Path, seconds: int = 3600) -> None:
+    stamp = NOW.timestamp() - seconds
+    for child in partition.iterdir():
+        os.utime(child, (stamp, stamp))
+
+
+def _store_batch(base: Path, day: str, received: str, batch_id: str, events: list[dict]) -> None:
+    from src.telemetry_store import TelemetryStore
+
+    for event in events:
+        event["tags"] = {"serviceName": "web", "environment": "prod"}
+    with patch("src.telemetry_store._today_str", return_value=day), \
+            patch("src.telemetry_store._utc_now_iso", return_value=received):
+        TelemetryStore(base).store_events_batch({
+            "transponderSessionId": "s-1", "batchId": batch_id, "events": events,
+        })
+
+
+class TestRunCompaction:
+    def test_sorts_dedupes_and_skips_unsealed(self, tmp_path):
+        _import_src()
+        from src.telemetry_compaction import COMPACTION_MARKER, run_compaction
+
+        base = tmp_path / "telemetry"
+        sealed = base / "2026-03-03" / "web" / "prod"
+        _write_lines(sealed / "heartbeat.jsonl", [
+            _heartbeat("web-2", "2026-03-03T10:00:00Z"),
+            _heartbeat("web-1", "2026-03-03T10:00:00Z"),
+            _heartbeat("web-1", "2026-03-03T09:00:00Z"),
+            _heartbeat("web-2", "2026-03-03T10:00:00Z"),
+            "{not json",
+        ])
+        _age(sealed)
+        recent = base / "2026-03-03" / "api" / "prod"
+        _write_lines(recent / "heartbeat.jsonl", [
+            _heartbeat("api-1", "2026-03-03T10:00:00Z"),
+            _heartbeat("api-1", "2026-03-03T10:00:00Z"),
+        ])
+        _age(recent, seconds=10)
+        today = base / "2026-03-04" / "web" / "prod"
+        _write_lines(today / "heartbeat.jsonl", [_heartbeat("web-1", "2026-03-04T10:00:00Z")] * 2)
+        _age(today)
+
+        summary = run_compaction(base, now=NOW)
+
+        assert summary == {"scanned": 2, "compacted": 1, "skipped": 1, "duplicates": 1, "errors": 0}
+        records = [json.loads(line) for line in (sealed / "heartbeat.jsonl").read_text().splitlines()]
+        assert [
+            (r["payload"]["sentAt"], r["payload"]["identity"]["instanceId"]) for r in records
+        ] == [
+            ("2026-03-03T09:00:00Z", "web-1"),
+            ("2026-03-03T10:00:00Z", "web-1"),
+            ("2026-03-03T10:00:00Z", "web-2"),
+        ]
+        assert len((recent / "heartbeat.jsonl").read_text().splitlines()) == 2
+        assert len((today / "heartbeat.jsonl").read_text().splitlines()) == 2
+        assert (sealed / COMPACTION_MARKER).is_file()
+        assert not list(sealed.glob(".*.compact"))
+
+        # The marker matches, so the partition is not rewritten again.
+        mtime = os.stat(sealed / "heartbeat.jsonl").st_mtime_ns
+        again = run_compaction(base, now=NOW)
+        assert again["compacted"] == 0 and again["skipped"] == 2
+        assert os.stat(sealed / "heartbeat.jsonl").st_mtime_ns == mtime
+
+    def test_rebuilds_event_and_trace_indexes(self, tmp_path):
+        _import_src()
+        from src.telemetry_compaction import run_compaction
+        from src.telemetry_reader import TelemetryReader
+
+        base = tmp_path / "telemetry"
+        day = "2026-03-03"
+        _store_batch(base, day, "2026-03-03T10:00:05Z", "b-2", [
+            {"ts": "2026-03-03T10:00:04Z", "type": "charge", "severity": "error", "traceId": "t-1"},
+        ])
+        _store_batch(base, day, "2026-03-03T10:00:01Z", "b-1", [
+            {"ts": "2026-03-03T10:00:00Z", "type": "request", "traceId": "t-1"},
+            {"ts": "2026-03-03T10:00:00Z", "type": "request", "traceId": "t-2"},
+        ])
+        _store_batch(base, day, "2026-03-03T10:00:05Z", "b-2", [
+            {"ts": "2026-03-03T10:00:04Z", "type": "charge", "severity": "error", "traceId": "t-1"},
+        ])
+        partition = base / day / "web" / "prod"
+        _age(partition)
+
+        start = datetime(2026, 3, 3, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 3, 23, 59, 59, tzinfo=timezone.utc)
+        assert TelemetryReader(base).query_trace_events("t-1")["meta"]["totalRows"] == 3
+
+        summary = run_compaction(base, now=NOW)
+        assert summary["compacted"] == 1 and summary["duplicates"] == 1
+
+        batches = [json.loads(line) for line in (partition / "events.jsonl").read_text().splitlines()]
+        assert [b["payload"]["batchId"] for b in batches] == ["b-1", "b-2"]
+        index = [json.loads(line) for line in (partition / "events.idx.jsonl").read_text().splitlines()]
+        assert [entry["type"] for entry in index] == [["request"], ["charge"]]
+        assert index[0]["o"] == 0 and index[1]["o"] == index[0]["e"]
+
+        reader = TelemetryReader(base)
+        trace = reader.query_trace_events("t-1")
+        assert [row["type"] for row in trace["data"]] == ["request", "charge"]
+        assert reader.query_trace_events("t-2")["meta"]["totalRows"] == 1
+        errors = reader.query_recent_events(start, end, severity="error")
+        assert [row["type"] for row in errors["data"]] == ["charge"]
+
+    def test_cached_event_index_is_not_used_across_the_swap(self, tmp_path):
+        _import_src()
+        from src import telemetry_compaction
+        from src.telemetry_index import load_event_index
+
+        base = tmp_path / "telemetry"
+        day = "2026-03-03"
+        # Same-sized batches stored out of receivedAt order: the rewrite
+        # reorders them without changing the file size.
+        _store_batch(base, day, "2026-03-03T10:00:05Z", "b-2", [
+            {"ts": "2026-03-03T10:00:04Z", "type": "charge"},
+        ])
+        _store_batch(base, day, "2026-03-03T10:00:01Z", "b-1", [
+            {"ts": "2026-03-03T10:00:00Z", "type": "reqst"},
+        ])
+        partition = base / day / "web" / "prod"
+        events = partition / "events.jsonl"
+        _age(partition)
+        size = events.stat().st_size
+        assert load_event_index(events) is not None
+
+        seen_after_swap = []
+        write_sorted = telemetry_compaction._write_sorted
+
+        def swap_and_check(filepath, entries):
+            written = write_sorted(filepath, entries)
+            if filepath == events:
+                seen_after_swap.append(load_event_index(events))
+            return written
+
+        with patch.object(telemetry_compaction, "_write_sorted", swap_and_check):
+            assert telemetry_compaction.run_compaction(base, now=NOW)["compacted"] == 1
+
+        assert events.stat().st_size == size
+        assert seen_after_swap == [None]
+        offsets, _covered = load_event_index(events).lookup([(("type", "charge"),)])
+        with open(events, "rb") as f:
+            f.seek(offsets[0])
+            assert json.loads(f.readline())["payload"]["batchId"] == "b-2"
@@ -129,3 +129,129 @@ class TestGetRetentionDays:
         _, get_retention_days = _import_retention()
         monkeypatch.setenv("ARECIBO_RETENTION_DAYS", "not-a-number")
         assert get_retention_days() == 180
+
+
+class TestRetentionEngine:
+    def test_service_overrides_prune_within_dates(self, tmp_path):
+        _import_retention()
+        from src.telemetry_catalog import PartitionCatalog
+        from src.telemetry_retention import run_retention
+
+        base = tmp_path / "telemetry"
+        for day in ("2026-02-01", "2026-03-01"):
+            for svc in ("web", "audit", "debug"):
+                _create_partition(base, day, svc)
+        catalog = PartitionCatalog(base)
+        catalog.refresh()
+
+        now = datetime(2026, 3, 3, tzinfo=timezone.utc)
+        result = run_retention(
+            base, retention_days=14, now=now, catalog=catalog,
+            service_days={"audit": 365, "debug": 1},
+        )
+
+        assert result == {"scanned": 2, "pruned": 0, "skipped": 2, "errors": 0}
+        assert sorted(p.name for p in (base / "2026-02-01").iterdir()) == ["audit"]
+        assert sorted(p.name for p in (base / "2026-03-01").iterdir()) == ["audit", "web"]
+        assert [s for s, _e, _p in catalog.partitions("2026-02-01")] == ["audit"]
+
+        # Once the longest override lapses the date goes as a whole.
+        later = datetime(2027, 3, 3, tzinfo=timezone.utc)
+        result = run_retention(base, retention_days=14, now=later, service_days={"audit": 365})
+        assert result["pruned"] == 2
+        assert list(base.iterdir()) == []
+
+    def test_byte_quota_prunes_oldest_but_never_today(self, tmp_path):
+        _import_retention()
+        from src.telemetry_catalog import PartitionCatalog
+        from src.telemetry_retention import run_retention
+
+        base = tmp_path / "telemetry"
+        for day in ("2026-03-01", "2026-03-02", "2026-03-03"):
+            partition = _create_partition(base, day)
+            (partition / "events.jsonl").write_bytes(b"x" * 1000)
+        catalog = PartitionCatalog(base)
+        catalog.refresh()
+        now = datetime(2026, 3, 3, tzinfo=timezone.utc)
+
+        dry = run_retention(base, now=now, max_bytes=1500, dry_run=True)
+        assert dry["pruned"] == 2
+        assert len(list(base.iterdir())) == 3
+
+        result = run_retention(base, now=now, max_bytes=1500, catalog=catalog, delete_files_per_sec=1000)
+        assert result == {"scanned": 3, "pruned": 2, "skipped": 1, "errors": 0}
+        assert [p.name for p in base.iterdir()] == ["2026-03-03"]
+        assert catalog.dates() == ["2026-03-03"]
+
+    def test_disk_watermark_and_interrupted_deletes(self, tmp_path):
+        _import_retention()
+        from collections import namedtuple
+        from unittest.mock import patch
+        from src.telemetry_retention import PRUNING_PREFIX, run_retention
+
+        base = tmp_path / "telemetry"
+        _create_partition(base, "2026-03-01")
+        _create_partition(base, "2026-03-02")
+        leftover = base / f"{PRUNING_PREFIX}2025-01-01" / "svc"
+        leftover.mkdir(parents=True)
+        (leftover / "heartbeat.jsonl").write_text("{}\n")
+
+        usage = namedtuple("usage", "total used free")(10000, 9500, 500)
+        with patch("src.telemetry_retention.shutil.disk_usage", return_value=usage):
+            result = run_retention(
+                base, now=datetime(2026, 3, 3, tzinfo=timezone.utc), max_disk_pct=90,
+            )
+
+        # Freed bytes are tiny, so every past date goes; the leftover is finished.
+        assert result["pruned"] == 2
+        assert list(base.iterdir()) == []
+
+
+class TestRetentionPolicy:
+    def test_from_env(self, monkeypatch):
+        _import_retention()
+        from src.telemetry_retention import DEFAULT_DELETE_FILES_PER_SEC, RetentionPolicy
+
+        for name in ("ARECIBO_RETENTION_MAX_GB", "ARECIBO_RETENTION_MAX_DISK_PCT",
+                     "ARECIBO_RETENTION_DELETE_RATE", "ARECIBO_RETENTION_INTERVAL_SEC"):
+            monkeypatch.delenv(name, raising=False)
+        monkeypatch.setenv("ARECIBO_RETENTION_DAYS", "30")
+        monkeypatch.setenv("ARECIBO_RETENTION_SERVICE_DAYS", "audit=365, debug=0, broken")
+        default = RetentionPolicy.from_env()
+        assert default.retention_days == 30
+        assert default.service_days == {"audit": 365, "debug": 1}
+        assert default.max_bytes is None and default.max_disk_pct is None
+        assert default.delete_files_per_sec == DEFAULT_DELETE_FILES_PER_SEC
+
+        monkeypatch.setenv("ARECIBO_RETENTION_MAX_GB", "1.5")
+        monkeypatch.setenv("ARECIBO_RETENTION_MAX_DISK_PCT", "85")
+        monkeypatch.setenv("ARECIBO_RETENTION_DELETE_RATE", "0")
+        monkeypatch.setenv("ARECIBO_RETENTION_INTERVAL_SEC", "5")
+        policy = RetentionPolicy.from_env()
+        assert policy.max_bytes == int(1.5 * 1024 ** 3)
+        assert policy.max_disk_pct == 85
+        assert policy.delete_files_per_sec == 0
+        assert policy.interval_sec == 60
+
+    def test_scheduler_repeats_until_stopped(self):
+        _import_retention()
+        import threading
+        from src.telemetry_retention import RetentionScheduler
+
+        runs = []
+        third = threading.Event()
+
+        def job():
+            runs.append(1)
+            if len(runs) == 2:
+                raise RuntimeError("disk hiccup")
+            if len(runs) >= 3:
+                third.set()
+
+        scheduler = RetentionScheduler(job, interval_sec=0.01)
+        scheduler.start()
+        assert third.wait(5)
+        scheduler.stop()
+        count = len(runs)
+        assert not scheduler._thread.is_alive()
+        assert len(runs) == count
@@ -0,0 +1,156 @@
+"""Tests for downsampling raw partitions into rollups."""
+
+from __future__ import annotations
+
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+def _import_src():
+    import sys, os
+    api_root = os.path.dirname(os.path.dirname(__file__))
+    if api_root not in sys.path:
+        sys.path.insert(0, api_root)
+
+
+DAY = "2026-03-01"
+
+
+def _write_jsonl(path: Path, records: list[dict]) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def _seed(base: Path) -> Path:
+    partition = base / DAY / "web" / "prod"
+    heartbeats = []
+    for inst, offset in (("web-1", 0), ("web-2", 7)):
+        for minute in range(0, 180, 20):
+            ts = f"{DAY}T{10 + minute // 60:02d}:{minute % 60 + offset:02d}:00Z"
+            heartbeats.append({"receivedAt": ts, "payload": {
+                "sentAt": ts,
+                "identity": {"serviceName": "web", "environment": "prod", "instanceId": inst},
+                "status": {
+                    "goDark": inst == "web-2",
+                    "containerRxBytesSinceLastHeartbeat": 100 + minute,
+                    "containerTxBytesSinceLastHeartbeat": 50,
+                    "containerMemoryCurrentBytes": 1000 * (minute + 1),
+                    "containerMemoryMaxBytes": 500000,
+                    "transponderRssBytes": 2000 + minute,
+                    "transponderCpuUserSec": minute * 0.5,
+                    "transponderCpuSystemSec": minute * 0.1,
+                    "transponderUptimeSec": minute * 60,
+                },
+            }})
+    _write_jsonl(partition / "heartbeat.jsonl", heartbeats)
+    _write_jsonl(partition / "announce.jsonl", [{
+        "receivedAt": f"{DAY}T09:59:00Z",
+        "payload": {
+            "sentAt": f"{DAY}T09:59:00Z",
+            "identity": {"serviceName": "web", "environment": "prod", "instanceId": "web-1"},
+        },
+    }])
+    _write_jsonl(partition / "events.jsonl", [{
+        "receivedAt": f"{DAY}T11:00:00Z",
+        "payload": {"transponderSessionId": "s-1", "batchId": f"b-{i}", "events": [
+            {"ts": f"{DAY}T10:{i:02d}:30Z", "type": "request"},
+            {"ts": f"{DAY}T11:{i:02d}:10Z", "type": "request"},
+        ]},
+    } for i in range(0, 50, 7)])
+    return partition
+
+
+def _queries(reader) -> dict:
+    start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    end = datetime(2026, 3, 1, 23, 59, 59, tzinfo=timezone.utc)
+    results = {
+        "fleet": reader.query_fleet_health(start, end),
+        "freshness": reader.query_heartbeat_freshness(start, end),
+        "goDark": reader.query_go_dark_status(),
+        "throughput": reader.query_event_throughput(start, end, bucket_width_sec=3600),
+    }
+    for rollup in ("container", "service"):
+        for stat in ("sum", "p95"):
+            results[f"{rollup}-{stat}"] = reader.query_container_metrics(
+                start, end, bucket_width_sec=3600, rollup=rollup, stat=stat,
+            )
+    for result in results.values():
+        result["meta"].pop("downsampled", None)
+        for row in result["data"]:
+            row.pop("staleSec", None)
+    return results
+
+
+class TestRollups:
+    def test_downsampled_partition_answers_like_raw(self, tmp_path):
+        _import_src()
+        from src.telemetry_reader import ROLLUP_FILE, TelemetryReader
+        from src.telemetry_retention import run_retention
+
+        base = tmp_path / "telemetry"
+        partition = _seed(base)
+        (base / DAY / "@traces").mkdir()
+        raw = _queries(TelemetryReader(base))
+
+        result = run_retention(
+            base, retention_days=365, raw_days=7,
+            now=datetime(2026, 3, 20, tzinfo=timezone.utc),
+        )
+
+        assert result["pruned"] == 0
+        assert sorted(p.name for p in partition.iterdir()) == [ROLLUP_FILE]
+        assert not (base / DAY / "@traces").exists()
+        reader = TelemetryReader(base)
+        assert _queries(reader) == raw
+        start = datetime(2026, 3, 1, tzinfo=timezone.utc)
+        end = datetime(2026, 3, 1, 23, 59, 59, tzinfo=timezone.utc)
+        meta = reader.query_event_throughput(start, end, bucket_width_sec=3600)["meta"]
+        assert meta["downsampled"] is True
+        assert reader.query_recent_events(start, end)["data"] == []
+
+    def test_recent_days_stay_raw(self, tmp_path):
+        _import_src()
+        from src.telemetry_retention import run_retention
+
+        base = tmp_path / "telemetry"
+        partition = _seed(base)
+        run_retention(
+            base, retention_days=365, raw_days=30,
+            now=datetime(2026, 3, 20, tzinfo=timezone.utc),
+        )
+        assert (partition / "heartbeat.jsonl").is_file()
+        assert not (partition / "rollup.json").exists()
+
+    def test_bucket_spanning_raw_and_rolled_days_counts_containers_once(self, tmp_path):
+        _import_src()
+        from src.telemetry_reader import TelemetryReader
+        from src.telemetry_retention import run_retention
+
+        base = tmp_path / "telemetry"
+        _seed(base)
+        run_retention(
+            base, retention_days=365, raw_days=7,
+            now=datetime(2026, 3, 20, tzinfo=timezone.utc),
+        )
+        _write_jsonl(base / "2026-03-18" / "web" / "prod" / "heartbeat.jsonl", [{
+            "receivedAt": "2026-03-18T10:00:00Z",
+            "payload": {
+                "sentAt": "2026-03-18T10:00:00Z",
+                "identity": {"serviceName": "web", "environment": "prod", "instanceId": "web-1"},
+                "status": {"containerMemoryCurrentBytes": 5000},
+            },
+        }])
+
+        result = TelemetryReader(base).query_container_metrics(
+            datetime(2026, 3, 1, tzinfo=timezone.utc),
+            datetime(2026, 3, 20, tzinfo=timezone.utc),
+            bucket_width_sec=30 * 86400, rollup="service",
+        )
+
+        assert result["meta"]["downsampled"] is True
+        [row] = result["data"]
+        assert row["containerCount"] == 2
+        assert row["heartbeatCount"] == 19
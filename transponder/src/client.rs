@@ -42,6 +42,19 @@ impl CollectorClient {
         payload: Option<&Value>,
         query: Option<&[(&str, &str)]>,
     ) -> (u16, Option<Value>) {
+        let (status, body, _) = self.exchange(method, path, payload, query, &[]);
+        (status, body)
+    }
+
+    /// Like `request`, with extra request headers; also returns the ETag.
+    fn exchange(
+        &self,
+        method: &str,
+        path: &str,
+        payload: Option<&Value>,
+        query: Option<&[(&str, &str)]>,
+        headers: &[(&str, &str)],
+    ) -> (u16, Option<Value>, Option<String>) {
         let mut url = format!("{}{}", self.base_url, path);
         if let Some(params) = query {
             let qs: Vec<String> = params
@@ -54,11 +67,14 @@ impl CollectorClient {
         }
 
         let req = self.agent.request(method, &url).set("Accept", "application/json");
-        let req = if !self.api_key.is_empty() {
+        let mut req = if !self.api_key.is_empty() {
             req.set("X-API-Key", &self.api_key)
         } else {
             req
         };
+        for (name, value) in headers {
+            req = req.set(name, value);
+        }
 
         let result = if let Some(body) = payload {
             req.send_json(body)
@@ -69,13 +85,14 @@ impl CollectorClient {
         match result {
             Ok(resp) => {
                 let status = resp.status();
+                let etag = resp.header("ETag").map(|v| v.to_string());
                 let body_str = resp.into_string().unwrap_or_default();
                 let body = if body_str.trim().is_empty() {
                     None
                 } else {
                     serde_json::from_str(&body_str).ok()
                 };
-                (status, body)
+                (status, body, etag)
             }
             Err(ureq::Error::Status(code, resp)) => {
                 let body_str = resp.into_string().unwrap_or_default();
@@ -84,9 +101,9 @@ impl CollectorClient {
                 } else {
                     serde_json::from_str(&body_str).ok()
                 };
-                (code, body)
+                (code, body, None)
             }
-            Err(_) => (0, None),
+            Err(_) => (0, None, None),
         }
     }
 
@@ -98,12 +115,21 @@ impl CollectorClient {
         self.request("POST", "/announce", Some(payload), None)
     }
 
-    pub fn policy(&self, service_name: &str, environment: &str) -> (u16, Option<Value>) {
-        self.request(
+    /// Fetch the policy, revalidating `etag` if given. A 304 means the
+    /// policy is unchanged; the returned ETag is the one to send next time.
+    pub fn policy(
+        &self,
+        service_name: &str,
+        environment: &str,
+        etag: Option<&str>,
+    ) -> (u16, Option<Value>, Option<String>) {
+        let headers: Vec<(&str, &str)> = etag.map(|e| ("If-None-Match", e)).into_iter().collect();
+        self.exchange(
             "GET",
             "/policy",
             None,
             Some(&[("serviceName", service_name), ("environment", environment)]),
+            &headers,
         )
     }
 
@@ -15,6 +15,8 @@ pub struct PolicyState {
     pub max_batch_size: i64,
     pub max_transponder_silence_sec: i64,
     pub ttl_sec: i64,
+    /// ETag of the last policy response, sent back as If-None-Match.
+    pub etag: Option<String>,
 }
 
 impl Default for PolicyState {
@@ -27,6 +29,7 @@ impl Default for PolicyState {
             max_batch_size: 1000,
             max_transponder_silence_sec: 0,
             ttl_sec: 60,
+            etag: None,
         }
     }
 }
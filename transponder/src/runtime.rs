@@ -272,8 +272,19 @@ impl TransponderRuntime {
             Some(c) if !self.go_dark => c,
             _ => return,
         };
-        let (status, body) = client.policy(&self.config.service_name, &self.config.environment);
+        let (status, body, etag) = client.policy(
+            &self.config.service_name,
+            &self.config.environment,
+            self.policy.etag.as_deref(),
+        );
+        if status == 304 {
+            // Unchanged: keep the current policy; the caller schedules the
+            // next refresh a full ttl_sec from now.
+            log::debug!("policy unchanged version={}", self.policy.policy_version);
+            return;
+        }
         if status == 200 {
+            self.policy.etag = etag;
             if let Some(Value::Object(map)) = body {
                 let policy_obj = map.get("policy").and_then(|v| v.as_object());
 
@@ -573,6 +584,14 @@ impl TransponderRuntime {
                     log::info!("received REFRESH_POLICY directive");
                     self.refresh_policy();
                 }
+                "POLICY_CHANGED" => {
+                    log::info!(
+                        "received POLICY_CHANGED directive version={:?} current={}",
+                        directive.value,
+                        self.policy.policy_version
+                    );
+                    self.refresh_policy();
+                }
                 "SET_HEARTBEAT_INTERVAL" => {
                     if let Some(ref val) = directive.value {
                         match val.as_i64().or_else(|| {